@@ -1,6 +1,10 @@
-__version__ = "0.10.4"
+__version__ = "0.11.0"
+
+import sys
+import importlib
 
 from .single_domain import (
+    Domain,
     SingleDomainComparator,
     TimeDomainComparator,
     FrequencyDomainComparator
@@ -9,10 +13,6 @@ from .multi_domain import (
     MultiDomainComparator,
     TimeFreqDomainComparator
 )
-from .util import (
-    plot_operator_result,
-    NumpyEncoder
-)
 from .product_result import (
     ComparatorProductResult
 )
@@ -21,7 +21,17 @@ from .operator_result import (
     ComparatorOperatorResult
 )
 
+from .operators import (
+    Operator,
+    Product
+)
+
+from . import reducers
+
+from .spec import from_spec
+
 __all__ = [
+    "Domain",
     "SingleDomainComparator",
     "TimeDomainComparator",
     "FrequencyDomainComparator",
@@ -29,6 +39,51 @@ __all__ = [
     "TimeFreqDomainComparator",
     "plot_operator_result",
     "NumpyEncoder",
+    "StreamingEncoder",
+    "dump_results",
     "ComparatorProductResult",
-    "ComparatorOperatorResult"
+    "ComparatorOperatorResult",
+    "Operator",
+    "Product",
+    "reducers",
+    "from_spec",
+    "load_array",
+    "array_from_buffer",
+    "save_results",
+    "load_results"
 ]
+
+# attributes that get imported from submodules the first time they're used,
+# so that ``import comparator`` stays fast in processes that never plot or
+# save results
+_lazy_attributes = {
+    "plot_operator_result": "util",
+    "NumpyEncoder": "util",
+    "StreamingEncoder": "util",
+    "dump_results": "util",
+    "load_array": "io",
+    "array_from_buffer": "io",
+    "save_results": "io",
+    "load_results": "io"
+}
+
+
+def __getattr__(name):
+    if name not in _lazy_attributes:
+        raise AttributeError(
+            f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f".{_lazy_attributes[name]}", __name__)
+    val = getattr(module, name)
+    globals()[name] = val
+    return val
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attributes))
+
+
+if sys.version_info < (3, 7):
+    # module level __getattr__ needs Python 3.7; util and io are cheap to
+    # import, as long as matplotlib isn't
+    for _name in _lazy_attributes:
+        __getattr__(_name)
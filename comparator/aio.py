@@ -0,0 +1,65 @@
+import asyncio
+import logging
+import typing
+import functools
+import threading
+import concurrent.futures
+
+from .parallel import check_cancel
+
+__all__ = [
+    "run_cancellable",
+    "azip",
+    "check_cancel"
+]
+
+module_logger = logging.getLogger(__name__)
+
+
+async def run_cancellable(
+    func: typing.Callable,
+    *args: tuple,
+    loop_executor: concurrent.futures.Executor = None,
+    **kwargs: dict
+) -> typing.Any:
+    """
+    Run ``func(*args, cancel=event, **kwargs)`` on ``loop_executor`` (the
+    event loop's default executor if None) without blocking the event loop.
+    If the awaiting task gets cancelled, ``event`` gets set, so ``func``
+    stops at the next point where it checks for cancellation, instead of
+    running to completion in the background.
+    """
+    cancel = threading.Event()
+    # inside a coroutine, this is the running loop; get_running_loop needs
+    # Python 3.7
+    loop = asyncio.get_event_loop()
+    future = loop.run_in_executor(
+        loop_executor, functools.partial(func, *args, cancel=cancel, **kwargs))
+    try:
+        return await future
+    except asyncio.CancelledError:
+        cancel.set()
+        raise
+
+
+async def azip(*iterables: typing.Tuple[typing.Any]) -> typing.AsyncIterator:
+    """
+    Like ``zip``, for async iterables. Plain iterables work too.
+    """
+    iterators = []
+    for iterable in iterables:
+        if hasattr(iterable, "__aiter__"):
+            iterators.append(iterable.__aiter__())
+        else:
+            iterators.append(_as_async(iter(iterable)))
+    while True:
+        try:
+            items = [await it.__anext__() for it in iterators]
+        except StopAsyncIteration:
+            return
+        yield tuple(items)
+
+
+async def _as_async(iterator: typing.Iterator) -> typing.AsyncIterator:
+    for item in iterator:
+        yield item
@@ -0,0 +1,212 @@
+import logging
+import typing
+
+import numpy as np
+
+from .fft import FFTBackend, get_backend
+
+__all__ = [
+    "get_time_delays"
+]
+
+module_logger = logging.getLogger(__name__)
+
+methods = ("auto", "direct", "fft")
+
+# rough cost, in multiply-adds, of the Python overhead of each lag of a
+# direct cross correlation
+_direct_lag_overhead = 1000
+
+
+def _offset_shift(size_ref: int, size: int) -> int:
+    """
+    The difference between the delay reported for a cross correlation lag,
+    and the lag itself. This is zero for arrays of the same size.
+    """
+    return (size - 1) - (size_ref + size - 1) // 2
+
+
+def _lag_window(size_ref: int, size: int, max_lag: int) -> tuple:
+    """
+    Get the first and last cross correlation lag to search.
+    """
+    first, last = -(size - 1), size_ref - 1
+    if max_lag is not None:
+        shift = _offset_shift(size_ref, size)
+        first, last = max(first, -max_lag - shift), min(last, max_lag - shift)
+    return first, last
+
+
+def _xcorr_direct(ref: np.ndarray,
+                  stack: np.ndarray,
+                  lags: np.ndarray) -> np.ndarray:
+    """
+    Compute ``sum(ref[m + k] * conj(b[m]))`` for each lag ``k`` in ``lags``
+    and each row ``b`` of ``stack``, one dot product per lag.
+    """
+    size_ref, size = ref.shape[0], stack.shape[1]
+    ref_conj = np.conj(ref) if np.iscomplexobj(ref) else ref
+    dtype = np.result_type(ref, stack)
+    xcorr = np.zeros((stack.shape[0], lags.shape[0]), dtype=dtype)
+    for i, k in enumerate(lags):
+        start, stop = max(0, -k), min(size, size_ref - k)
+        if start >= stop:
+            continue
+        xcorr[:, i] = np.conj(stack[:, start:stop] @ ref_conj[start+k:stop+k])
+    return xcorr
+
+
+def _xcorr_fft(ref: np.ndarray,
+               stack: np.ndarray,
+               lags: np.ndarray,
+               backend: FFTBackend) -> np.ndarray:
+    """
+    Like ``_xcorr_direct``, but computing every lag with FFTs, and only
+    keeping ``lags``.
+    """
+    n = backend.next_fast_len(ref.shape[0] + stack.shape[1] - 1)
+    if np.iscomplexobj(ref) or np.iscomplexobj(stack):
+        spec = backend.fft(ref, n=n) * np.conj(backend.fft(stack, n=n))
+        xcorr = backend.ifft(spec, n=n)
+    else:
+        spec = backend.rfft(ref, n=n) * np.conj(backend.rfft(stack, n=n))
+        xcorr = backend.irfft(spec, n=n)
+    # circular cross correlation: negative lags wrap around
+    return xcorr[:, lags % n]
+
+
+def _use_direct(method: str, size_ref: int, size: int, n_lags: int) -> bool:
+    if method != "auto":
+        return method == "direct"
+    n = size_ref + size - 1
+    cost_direct = n_lags * (min(size_ref, size) + _direct_lag_overhead)
+    cost_fft = 3 * n * np.log2(n)
+    return cost_direct < cost_fft
+
+
+def _decimate(a: np.ndarray, factor: int) -> np.ndarray:
+    """
+    Average non-overlapping blocks of ``factor`` samples along the last axis.
+    """
+    size = (a.shape[-1] // factor) * factor
+    return a[..., :size].reshape(a.shape[:-1] + (-1, factor)).mean(axis=-1)
+
+
+def _get_lags(ref: np.ndarray,
+              stack: np.ndarray,
+              max_lag: int,
+              method: str,
+              backend: FFTBackend) -> np.ndarray:
+    """
+    Get the lag of the maximum of the cross correlation of ``ref`` and each
+    row of ``stack``, searching lags that correspond to delays of at most
+    ``max_lag``.
+    """
+    first, last = _lag_window(ref.shape[0], stack.shape[1], max_lag)
+    lags = np.arange(first, last + 1)
+    if lags.shape[0] == 0:
+        msg = (f"_get_lags: no lags within max_lag={max_lag} for arrays "
+               f"of size {ref.shape[0]} and {stack.shape[1]}")
+        module_logger.error(msg)
+        raise RuntimeError(msg)
+    if _use_direct(method, ref.shape[0], stack.shape[1], lags.shape[0]):
+        xcorr = _xcorr_direct(ref, stack, lags)
+    else:
+        xcorr = _xcorr_fft(ref, stack, lags, backend)
+    return lags[np.argmax(xcorr, axis=-1)]
+
+
+def _refine_lags(ref: np.ndarray,
+                 stack: np.ndarray,
+                 lags: np.ndarray,
+                 radius: int,
+                 max_lag: int) -> np.ndarray:
+    """
+    Search lags within ``radius`` of a first estimate, one row at a time.
+    """
+    first, last = _lag_window(ref.shape[0], stack.shape[1], max_lag)
+    lags = np.clip(lags, first, last)
+    refined = np.empty_like(lags)
+    for i, lag in enumerate(lags):
+        window = np.arange(max(lag - radius, first),
+                           min(lag + radius, last) + 1)
+        xcorr = _xcorr_direct(ref, stack[i:i+1], window)
+        refined[i] = window[np.argmax(xcorr[0])]
+    return refined
+
+
+def get_time_delays(
+    ref: np.ndarray,
+    arrays: typing.Sequence[np.ndarray],
+    backend: typing.Union[str, FFTBackend] = "scipy",
+    max_lag: int = None,
+    decimate: int = None,
+    method: str = "auto"
+) -> np.ndarray:
+    """
+    Get the number of units of delay between ``ref`` and each of ``arrays``.
+
+    The delay is the position of the maximum of the full cross correlation
+    of ``ref`` and an array, relative to the middle of the cross
+    correlation, like ``TimeDomainComparator.get_time_delay``. Instead of
+    computing each cross correlation separately, the spectrum of ``ref`` is
+    multiplied with a single batched FFT of all the arrays of the same size.
+    The position of the maximum doesn't change when inputs are scaled by a
+    positive factor, so inputs don't get normalized.
+
+    When the delay is known to be small, ``max_lag`` restricts the search
+    to delays between ``-max_lag`` and ``max_lag``. Short windows are
+    searched by computing the cross correlation directly, which takes
+    ``O(max_lag*N)`` time and no extra memory, instead of ``O(N log N)``
+    time and ``O(N)`` memory for FFTs; ``method`` picks one or the other
+    based on their cost, unless set to ``"direct"`` or ``"fft"``.
+
+    For long inputs, ``decimate`` does a coarse to fine search: delays are
+    first estimated on inputs averaged over blocks of ``decimate`` samples,
+    then refined by searching the full rate cross correlation around the
+    coarse estimate.
+
+    Args:
+        ref (np.ndarray): reference array
+        arrays (list): arrays to compare to ``ref``
+        backend (str, FFTBackend): FFT backend to use
+        max_lag (int): maximum absolute delay to search
+        decimate (int): decimation factor for coarse to fine search
+        method (str): one of ``"auto"``, ``"direct"`` or ``"fft"``
+    Returns:
+        np.ndarray: delay of each of ``arrays``
+    """
+    if method not in methods:
+        msg = (f"get_time_delays: unknown method {method}, "
+               f"expected one of {methods}")
+        module_logger.error(msg)
+        raise RuntimeError(msg)
+    backend = get_backend(backend)
+    delays = np.zeros(len(arrays), dtype=int)
+    sizes = np.array([arr.shape[0] for arr in arrays], dtype=int)
+    size_ref = ref.shape[0]
+
+    for size in np.unique(sizes):
+        idx = np.flatnonzero(sizes == size)
+        stack = np.stack([arrays[i] for i in idx])
+        shift = _offset_shift(size_ref, size)
+        if decimate is not None and decimate > 1:
+            coarse_max_lag = None
+            if max_lag is not None:
+                coarse_max_lag = max_lag // decimate + 1
+            ref_coarse = _decimate(ref, decimate)
+            stack_coarse = _decimate(stack, decimate)
+            coarse_shift = _offset_shift(
+                ref_coarse.shape[0], stack_coarse.shape[1])
+            lags = _get_lags(ref_coarse, stack_coarse, coarse_max_lag,
+                             method, backend)
+            # coarse lag -> coarse delay -> full rate lag
+            lags = (lags + coarse_shift) * decimate - shift
+            lags = _refine_lags(ref, stack, lags, 2 * decimate, max_lag)
+        else:
+            lags = _get_lags(ref, stack, max_lag, method, backend)
+        delays[idx] = lags + shift
+        module_logger.debug(
+            f"get_time_delays: delays for arrays of size {size}: "
+            f"{delays[idx]}")
+    return delays
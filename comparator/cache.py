@@ -0,0 +1,80 @@
+import logging
+import typing
+import threading
+
+import numpy as np
+
+__all__ = [
+    "TransformCache"
+]
+
+module_logger = logging.getLogger(__name__)
+
+
+class TransformCache:
+    """
+    Holds intermediate results of transforming a set of inputs, so that the
+    domains of a MultiDomainComparator can share work, like time aligning
+    inputs or computing FFTs with identical parameters.
+
+    Entries are keyed by the name of the transform, the identity of the
+    inputs, and any parameters the transform depends on. Inputs are
+    identified by ``id``; the cache holds a reference to every input it has
+    made a key for, so an id can't be reused by another array while the
+    cache is alive. This means a cache keeps its inputs alive too; a
+    MultiDomainComparator creates a new one for every call.
+
+    A cache can be shared by comparators running in different threads. Each
+    entry only gets computed once: threads asking for an entry that is being
+    computed wait for it, while entries with different keys get computed
+    concurrently.
+    """
+    def __init__(self):
+        self._entries = {}
+        self._hits = 0
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._inputs = {}
+
+    def key(self,
+            name: str,
+            arrays: typing.Sequence[np.ndarray],
+            *params: typing.Tuple[typing.Hashable]) -> tuple:
+        with self._lock:
+            for arr in arrays:
+                self._inputs.setdefault(id(arr), arr)
+        return (name, tuple(id(arr) for arr in arrays)) + params
+
+    def get(self, key: tuple, func: typing.Callable) -> typing.Any:
+        """
+        Get the entry for ``key``, calling ``func`` to compute it if it isn't
+        in the cache yet.
+        """
+        with self._lock:
+            if key in self._entries:
+                return self._hit(key)
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                if key in self._entries:
+                    return self._hit(key)
+            val = func()
+            with self._lock:
+                self._entries[key] = val
+                del self._key_locks[key]
+        return val
+
+    def _hit(self, key: tuple) -> typing.Any:
+        module_logger.debug(f"TransformCache.get: hit for {key[0]}")
+        self._hits += 1
+        return self._entries[key]
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hits(self) -> int:
+        return self._hits
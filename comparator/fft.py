@@ -0,0 +1,234 @@
+import os
+import logging
+import typing
+import threading
+
+import numpy as np
+
+__all__ = [
+    "FFTBackend",
+    "NumpyFFTBackend",
+    "ScipyFFTBackend",
+    "PyFFTWBackend",
+    "backends",
+    "get_backend"
+]
+
+module_logger = logging.getLogger(__name__)
+
+
+class _FFTPack:
+    """
+    The parts of ``scipy.fft`` backends use, for scipy before 1.4, which
+    added it: ``scipy.fftpack`` for complex transforms, and ``numpy.fft``
+    for real ones, as ``scipy.fftpack.rfft`` lays out its output
+    differently. ``workers`` is ignored.
+    """
+    def __init__(self):
+        import scipy.fftpack
+        self._fftpack = scipy.fftpack
+
+    def fft(self, a, n=None, axis=-1, workers=None):
+        return self._fftpack.fft(a, n=n, axis=axis)
+
+    def ifft(self, a, n=None, axis=-1, workers=None):
+        return self._fftpack.ifft(a, n=n, axis=axis)
+
+    def rfft(self, a, n=None, axis=-1, workers=None):
+        return np.fft.rfft(a, n=n, axis=axis)
+
+    def irfft(self, a, n=None, axis=-1, workers=None):
+        return np.fft.irfft(a, n=n, axis=axis)
+
+    def next_fast_len(self, n):
+        return self._fftpack.next_fast_len(n)
+
+
+def _scipy_fft() -> typing.Any:
+    try:
+        import scipy.fft
+    except ImportError:
+        module_logger.debug(
+            "_scipy_fft: scipy.fft isn't available, using scipy.fftpack")
+        return _FFTPack()
+    return scipy.fft
+
+
+class FFTBackend:
+    """
+    A common interface for FFT libraries. Every transform works along one
+    axis of an N dimensional array, so a stack of inputs gets transformed in
+    a single call.
+    """
+    name = None
+
+    def __init__(self, workers: int = None):
+        self._workers = workers
+
+    def fft(self,
+            a: np.ndarray,
+            n: int = None,
+            axis: int = -1) -> np.ndarray:
+        raise NotImplementedError()
+
+    def ifft(self,
+             a: np.ndarray,
+             n: int = None,
+             axis: int = -1) -> np.ndarray:
+        raise NotImplementedError()
+
+    def rfft(self,
+             a: np.ndarray,
+             n: int = None,
+             axis: int = -1) -> np.ndarray:
+        raise NotImplementedError()
+
+    def irfft(self,
+              a: np.ndarray,
+              n: int = None,
+              axis: int = -1) -> np.ndarray:
+        raise NotImplementedError()
+
+    def next_fast_len(self, n: int) -> int:
+        return _scipy_fft().next_fast_len(n)
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(workers={self._workers})"
+
+
+class NumpyFFTBackend(FFTBackend):
+    """
+    ``numpy.fft``. Single threaded; ``workers`` is ignored.
+    """
+    name = "numpy"
+
+    def fft(self, a, n=None, axis=-1):
+        return np.fft.fft(a, n=n, axis=axis)
+
+    def ifft(self, a, n=None, axis=-1):
+        return np.fft.ifft(a, n=n, axis=axis)
+
+    def rfft(self, a, n=None, axis=-1):
+        return np.fft.rfft(a, n=n, axis=axis)
+
+    def irfft(self, a, n=None, axis=-1):
+        return np.fft.irfft(a, n=n, axis=axis)
+
+
+class ScipyFFTBackend(FFTBackend):
+    """
+    ``scipy.fft``, which can split a stack of transforms over ``workers``
+    threads. Negative values of ``workers`` count back from the number of
+    CPUs, so ``workers=-1`` uses all of them. With scipy before 1.4, this
+    falls back to ``scipy.fftpack``, and ``workers`` is ignored.
+    """
+    name = "scipy"
+
+    def __init__(self, workers: int = None):
+        super(ScipyFFTBackend, self).__init__(workers)
+        self._fft = _scipy_fft()
+
+    def fft(self, a, n=None, axis=-1):
+        return self._fft.fft(a, n=n, axis=axis, workers=self._workers)
+
+    def ifft(self, a, n=None, axis=-1):
+        return self._fft.ifft(a, n=n, axis=axis, workers=self._workers)
+
+    def rfft(self, a, n=None, axis=-1):
+        return self._fft.rfft(a, n=n, axis=axis, workers=self._workers)
+
+    def irfft(self, a, n=None, axis=-1):
+        return self._fft.irfft(a, n=n, axis=axis, workers=self._workers)
+
+    def next_fast_len(self, n):
+        return self._fft.next_fast_len(n)
+
+
+class PyFFTWBackend(FFTBackend):
+    """
+    ``pyfftw``, if it is installed. FFTW plans get cached by transform, input
+    shape and dtype, so repeated comparisons of same sized inputs only pay
+    for planning once.
+
+    Plans reuse their input and output buffers, so each one runs a single
+    transform at a time; a backend can be shared by threads, but threads
+    transforming same sized inputs wait for each other.
+    """
+    name = "pyfftw"
+
+    def __init__(self, workers: int = None,
+                 planner_effort: str = "FFTW_ESTIMATE"):
+        super(PyFFTWBackend, self).__init__(workers)
+        try:
+            import pyfftw.builders
+        except ImportError as err:
+            msg = f"PyFFTWBackend: pyfftw isn't installed: {err}"
+            module_logger.error(msg)
+            raise RuntimeError(msg)
+        self._builders = pyfftw.builders
+        self._planner_effort = planner_effort
+        self._plans = {}
+        self._lock = threading.Lock()
+
+    def _plan(self, kind: str, a: np.ndarray, n: int, axis: int) -> tuple:
+        """
+        Get the plan for a transform, and the lock to hold while running it.
+        """
+        key = (kind, a.shape, a.dtype, n, axis)
+        with self._lock:
+            if key not in self._plans:
+                module_logger.debug(f"PyFFTWBackend._plan: planning {key}")
+                threads = self._workers
+                if threads is None:
+                    threads = 1
+                elif threads < 0:
+                    threads = max(os.cpu_count() + 1 + threads, 1)
+                plan = getattr(self._builders, kind)(
+                    a, n=n, axis=axis, threads=threads,
+                    planner_effort=self._planner_effort)
+                self._plans[key] = (plan, threading.Lock())
+            return self._plans[key]
+
+    def _execute(self, kind, a, n, axis):
+        plan, lock = self._plan(kind, a, n, axis)
+        # the plan's input and output buffers get reused by the next call
+        with lock:
+            return plan(a).copy()
+
+    def fft(self, a, n=None, axis=-1):
+        return self._execute("fft", a, n, axis)
+
+    def ifft(self, a, n=None, axis=-1):
+        return self._execute("ifft", a, n, axis)
+
+    def rfft(self, a, n=None, axis=-1):
+        return self._execute("rfft", a, n, axis)
+
+    def irfft(self, a, n=None, axis=-1):
+        return self._execute("irfft", a, n, axis)
+
+
+backends = {
+    NumpyFFTBackend.name: NumpyFFTBackend,
+    ScipyFFTBackend.name: ScipyFFTBackend,
+    PyFFTWBackend.name: PyFFTWBackend
+}
+
+
+def get_backend(backend: typing.Union[str, FFTBackend] = "scipy",
+                workers: int = None) -> FFTBackend:
+    """
+    Get an FFT backend by name. FFTBackend objects are returned as is.
+    """
+    if isinstance(backend, FFTBackend):
+        return backend
+    if backend not in backends:
+        msg = (f"get_backend: unknown FFT backend {backend}, "
+               f"expected one of {list(backends.keys())}")
+        module_logger.error(msg)
+        raise RuntimeError(msg)
+    return backends[backend](workers=workers)
@@ -0,0 +1,341 @@
+import os
+import json
+import logging
+import typing
+
+import numpy as np
+
+from .plan import _nest, _flatten, _pack
+from .operator_result import ComparatorOperatorResult
+from .product_result import ComparatorProductResult
+from .spec import _path
+
+__all__ = [
+    "load_array",
+    "array_from_buffer",
+    "save_results",
+    "load_results"
+]
+
+module_logger = logging.getLogger(__name__)
+
+_complex_dtypes = {
+    np.dtype(np.float32): np.dtype(np.complex64),
+    np.dtype(np.float64): np.dtype(np.complex128)
+}
+
+
+def _as_complex(arr: np.ndarray) -> np.ndarray:
+    """
+    View an array of interleaved real and imaginary components as a complex
+    array, without copying.
+    """
+    dtype = _complex_dtypes.get(arr.dtype.newbyteorder("="))
+    if dtype is None:
+        msg = (f"_as_complex: can't view {arr.dtype} data as complex; "
+               f"interleaved complex data has to be one of "
+               f"{[str(d) for d in _complex_dtypes]}")
+        module_logger.error(msg)
+        raise RuntimeError(msg)
+    arr = arr.view(dtype.newbyteorder(arr.dtype.byteorder))
+    if arr.ndim > 1 and arr.shape[-1] == 1:
+        arr = arr[..., 0]
+    return arr
+
+
+def load_array(
+    file_path: str,
+    dtype: typing.Any = None,
+    offset: int = 0,
+    complex_interleaved: bool = False,
+    n_channels: int = None,
+    mode: str = "r"
+) -> np.ndarray:
+    """
+    Memory map an array stored in a ``.npy`` file or a raw binary file.
+    Nothing gets read from disk until the array is sliced and used, so
+    passing the result to a comparator only reads the parts of the file that
+    fall in the operation domain.
+
+    Examples:
+
+    .. code-block:: python
+
+        >>> a = load_array("a.npy")
+        >>> b = load_array("b.dump", dtype=np.float32, offset=4096,
+                           complex_interleaved=True)
+        >>> comp.domain = [0, 2**20]
+        >>> res_op, res_prod = comp(a, b)
+
+    Args:
+        file_path (str): path to ``.npy`` or raw binary file
+        dtype (type): dtype of data in raw binary files. Ignored for ``.npy``
+            files, which carry their own dtype.
+        offset (int): size in bytes of the header of raw binary files.
+        complex_interleaved (bool): whether the data are interleaved real
+            and imaginary components. If so, they get viewed as complex data.
+        n_channels (int): number of interleaved channels. If given, the
+            result has shape ``(n_samples, n_channels)``, and ``arr[:, i]``
+            is a view of the ``i``-th channel.
+        mode (str): passed to ``np.memmap``
+    Returns:
+        np.ndarray: memory mapped array
+    """
+    if os.path.splitext(file_path)[1] == ".npy":
+        arr = np.load(file_path, mmap_mode=mode)
+    else:
+        if dtype is None:
+            msg = f"load_array: need a dtype to load raw file {file_path}"
+            module_logger.error(msg)
+            raise RuntimeError(msg)
+        arr = np.memmap(file_path, dtype=dtype, mode=mode, offset=offset)
+    return _reshape(arr, complex_interleaved, n_channels)
+
+
+def array_from_buffer(
+    buffer: typing.Any,
+    dtype: typing.Any,
+    offset: int = 0,
+    complex_interleaved: bool = False,
+    n_channels: int = None
+) -> np.ndarray:
+    """
+    Like ``load_array``, but for an object exposing the buffer protocol,
+    like a ``bytes`` or ``mmap.mmap`` object.
+    """
+    arr = np.frombuffer(buffer, dtype=dtype, offset=offset)
+    return _reshape(arr, complex_interleaved, n_channels)
+
+
+def _reshape(arr: np.ndarray,
+             complex_interleaved: bool,
+             n_channels: int) -> np.ndarray:
+    if complex_interleaved:
+        arr = _as_complex(arr)
+    if n_channels is not None:
+        arr = arr.reshape((-1, n_channels))
+    return arr
+
+
+def _nested_shape(result: typing.Any) -> tuple:
+    """
+    Get the number of elements at each level of nested lists of operator
+    results.
+    """
+    shape = []
+    node = result
+    while node is not None and not isinstance(node, np.ndarray) and \
+            hasattr(node, "__len__"):
+        shape.append(len(node))
+        node = next((sub for sub in node if sub is not None), None)
+    return tuple(shape)
+
+
+def _save_operator_result(res_op: ComparatorOperatorResult,
+                          key: str,
+                          arrays: dict) -> dict:
+    """
+    Add the arrays an operator result is saved as to ``arrays``, and get
+    what's needed to load it again. Results that all have the same shape
+    are saved as a single ``(n, [n, ]L)`` array. Otherwise they're raveled
+    and concatenated into a single 1D array, and the offset and shape of
+    each result are saved.
+    """
+    result = res_op.result
+    entry = {"key": key, "name": res_op.name, "labels": _labels(res_op)}
+    if isinstance(result, np.ndarray):
+        arrays[key] = result
+        entry["layout"] = "array"
+        return entry
+    shape = _nested_shape(result)
+    block = _pack(result, shape)
+    if block is not None:
+        arrays[key] = block
+        entry["layout"] = "array"
+        return entry
+    flat = [None if res is None else np.asarray(res)
+            for res in _flatten(result, len(shape))]
+    present = [res for res in flat if res is not None]
+    offsets = np.cumsum([0] + [res.size for res in present])
+    arrays[key] = np.concatenate([res.ravel() for res in present]) \
+        if present else np.empty(0)
+    offsets = iter(offsets.tolist())
+    entry["layout"] = "flat"
+    entry["shape"] = list(shape)
+    entry["entries"] = [None if res is None else
+                        [next(offsets), list(res.shape)] for res in flat]
+    return entry
+
+
+def _load_operator_result(entry: dict,
+                          arr: np.ndarray) -> ComparatorOperatorResult:
+    result = arr
+    if entry["layout"] == "flat":
+        flat = [None if e is None else
+                arr[e[0]:e[0] + int(np.prod(e[1]))].reshape(e[1])
+                for e in entry["entries"]]
+        shape = entry["shape"]
+        result = _nest(flat, shape[0], len(shape))
+    return ComparatorOperatorResult(
+        result=result, labels=entry["labels"], name=entry["name"])
+
+
+def _labels(res: typing.Any) -> typing.Optional[list]:
+    labels = res._labels
+    if labels is None:
+        return None
+    return list(labels)
+
+
+def _describe(comparator: typing.Any) -> dict:
+    """
+    Describe a comparator whose spec can't be encoded: its type, name,
+    domain, and operator and product names. Unlike a spec, the description
+    can't be passed to ``spec.from_spec``.
+    """
+    cls = type(comparator)
+    domain = getattr(comparator, "domain", None)
+    desc = {
+        "type": _path(cls) or f"{cls.__module__}:{cls.__qualname__}",
+        "name": getattr(comparator, "name", None),
+        "domain": domain.to_spec() if hasattr(domain, "to_spec") else None,
+        "operators": list(getattr(comparator, "operators", [])),
+        "products": list(getattr(comparator, "products", [])),
+        "partial": True
+    }
+    domains = getattr(comparator, "_domains", None)
+    if domains is not None:
+        desc["domains"] = {name: _describe(domain)
+                           for name, domain in domains.items()}
+    return desc
+
+
+def _spec(comparator: typing.Any) -> typing.Optional[dict]:
+    """
+    Get the spec of ``comparator`` to save with its results, falling back
+    to ``_describe`` if it can't be encoded, e.g. because the comparator
+    has lambda operators.
+    """
+    if comparator is None:
+        return None
+    try:
+        return comparator.to_spec()
+    except RuntimeError as err:
+        module_logger.warning(
+            f"save_results: can't save the spec of the comparator ({err}); "
+            "saving its type, domain, operator and product names instead")
+        return _describe(comparator)
+
+
+def save_results(path: str,
+                 res_op: dict = None,
+                 res_prod: dict = None,
+                 comparator: typing.Any = None) -> None:
+    """
+    Save the results of a comparison in numpy's binary format, along with
+    labels, operator names and the spec of the comparator that produced
+    them. Unlike encoding results as JSON with ``NumpyEncoder``, arrays are
+    written as they are, without converting them to lists.
+
+    If ``path`` ends with ``.npz``, everything goes in a single ``.npz``
+    file. Otherwise, ``path`` is a directory with a ``.npy`` file for each
+    operator and product result, and a ``meta.json`` file; ``load_results``
+    memory maps these files, so results can be reloaded without copying,
+    and only the parts that are used get read from disk.
+
+    Examples:
+
+    .. code-block:: python
+
+        >>> res_op, res_prod = comp(*arrays, labels=labels)
+        >>> save_results("results", res_op, res_prod, comparator=comp)
+        >>> res_op, res_prod, spec = load_results("results")
+        >>> res_op["diff"]["a"]  # only reads the results for "a"
+
+    Args:
+        path (str): ``.npz`` file or directory to save to
+        res_op (dict): ComparatorOperatorResult objects, keyed by operator
+            name
+        res_prod (dict): ComparatorProductResult objects, keyed by
+            operator name
+        comparator: comparator that produced the results; its spec gets
+            saved. If the spec can't be encoded, e.g. because the
+            comparator has lambda operators, a warning is logged and only
+            its type, name, domain, and operator and product names get
+            saved, with ``"partial": True``.
+    """
+    arrays = {}
+    meta = {
+        "version": 1,
+        "operators": {},
+        "products": {},
+        "spec": _spec(comparator)
+    }
+    if res_op is not None:
+        for i, (name, res) in enumerate(res_op.items()):
+            meta["operators"][name] = _save_operator_result(
+                res, f"op_{i}", arrays)
+    if res_prod is not None:
+        for i, (name, res) in enumerate(res_prod.items()):
+            data = res.array
+            if data.dtype.hasobject:
+                msg = (f"save_results: can't save {name} products; "
+                       "products that are stored as objects can't be saved")
+                module_logger.error(msg)
+                raise RuntimeError(msg)
+            key = f"prod_{i}"
+            arrays[key] = data
+            arrays[f"{key}_valid"] = res.valid
+            meta["products"][name] = {"key": key, "labels": _labels(res)}
+
+    module_logger.debug(
+        f"save_results: saving {len(arrays)} arrays to {path}")
+    if path.endswith(".npz"):
+        np.savez(path, meta=np.array(json.dumps(meta)), **arrays)
+        return
+    os.makedirs(path, exist_ok=True)
+    for key, arr in arrays.items():
+        np.save(os.path.join(path, f"{key}.npy"), arr)
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+
+def load_results(path: str,
+                 mmap_mode: str = "r") -> typing.Tuple[dict, dict, dict]:
+    """
+    Load results saved with ``save_results``. Results saved to a directory
+    are memory mapped, with ``mmap_mode``; arrays in ``.npz`` files are
+    read into memory.
+
+    Args:
+        path (str): ``.npz`` file or directory to load from
+        mmap_mode (str): passed to ``np.load``
+    Returns:
+        tuple: dicts of ComparatorOperatorResult and
+            ComparatorProductResult objects, keyed by operator name, and
+            the spec of the comparator that produced them, or None. See
+            ``save_results`` for partial specs.
+    """
+    if path.endswith(".npz"):
+        npz = np.load(path)
+        meta = json.loads(str(npz["meta"]))
+
+        def get(key):
+            return npz[key]
+    else:
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            meta = json.load(f)
+
+        def get(key):
+            return np.load(os.path.join(path, f"{key}.npy"),
+                           mmap_mode=mmap_mode)
+
+    res_op = {name: _load_operator_result(entry, get(entry["key"]))
+              for name, entry in meta["operators"].items()}
+    res_prod = {
+        name: ComparatorProductResult.from_array(
+            get(entry["key"]), get(f"{entry['key']}_valid"),
+            labels=entry["labels"])
+        for name, entry in meta["products"].items()
+    }
+    return res_op, res_prod, meta["spec"]
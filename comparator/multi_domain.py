@@ -1,4 +1,11 @@
 # multi_domain.py
+import typing
+import concurrent.futures
+
+from .trackable import deleted
+from .cache import TransformCache
+from .parallel import get_executor, check_cancel
+from .spec import encode_callable, decode_callable, from_spec
 from .single_domain import (
     SingleDomainComparator,
     FrequencyDomainComparator,
@@ -37,7 +44,11 @@ class MultiDomainComparator(SingleDomainComparator):
                 item, val = args
                 for domain_name in self._domains:
                     domain = self._domains[domain_name]
-                    getattr(domain, name)[item] = val
+                    if val is deleted:
+                        if item in getattr(domain, name):
+                            del getattr(domain, name)[item]
+                    else:
+                        getattr(domain, name)[item] = val
 
             elif len(args) == 1:
                 # means we're getting
@@ -45,16 +56,93 @@ class MultiDomainComparator(SingleDomainComparator):
 
         return _on_change
 
-    def __call__(self, *args, **kwargs):
-        ret = []
-        for domain_name in self._domains:
-            domain = self._domains[domain_name]
-            ret.append(domain(*args, **kwargs))
-        return ret
+    def __call__(self, *args, cache: TransformCache = None,
+                 executor=None, n_workers: int = None,
+                 domain_executor=None, n_domain_workers: int = None,
+                 **kwargs):
+        """
+        Call each domain. The domains share a TransformCache, so
+        intermediate results, like time aligned inputs or FFTs with the same
+        parameters, only get computed once. If ``n_workers`` is given, the
+        domains share a single thread pool for their work items.
+
+        Domains are independent, so they can be called concurrently, on a
+        ``domain_executor`` or on a thread pool of ``n_domain_workers``
+        threads created for the call. Results are returned in the same
+        order as the domains either way. With a thread pool, the domains
+        still share the TransformCache. A
+        ``concurrent.futures.ProcessPoolExecutor`` works too, as long as
+        the comparator can be pickled; each process then transforms inputs
+        itself, and uses its own thread pool of ``n_workers`` threads.
+
+        ``domain_executor`` shouldn't be the same as ``executor``: a domain
+        waits for its work items, and could end up waiting for threads that
+        are all busy running domains.
+        """
+        if cache is None:
+            cache = TransformCache()
+        with get_executor(executor, n_workers) as _executor, \
+                get_executor(domain_executor, n_domain_workers) \
+                as _domain_executor:
+            if _domain_executor is None:
+                ret = []
+                for domain in self._domains.values():
+                    check_cancel(kwargs.get("cancel"))
+                    ret.append(domain(*args, cache=cache, executor=_executor,
+                                      **kwargs))
+                return ret
+            if isinstance(_domain_executor,
+                          concurrent.futures.ProcessPoolExecutor):
+                # events can't be sent to other processes
+                kwargs.pop("cancel", None)
+                futures = [
+                    _domain_executor.submit(
+                        domain, *args, n_workers=n_workers, **kwargs)
+                    for domain in self._domains.values()
+                ]
+            else:
+                futures = [
+                    _domain_executor.submit(
+                        domain, *args, cache=cache, executor=_executor,
+                        **kwargs)
+                    for domain in self._domains.values()
+                ]
+            return [future.result() for future in futures]
 
     def __getattr__(self, attr: str) -> SingleDomainComparator:
-        if attr in self._domains:
+        # private attributes don't exist yet while unpickling, and looking up
+        # self._domains here would recurse
+        if not attr.startswith("_") and attr in self._domains:
             return self._domains[attr]
+        raise AttributeError(
+            f"{self.__class__.__name__} object has no attribute {attr}")
+
+    def spec_params(self) -> dict:
+        return {"name": self._name}
+
+    def to_spec(self,
+                encode: typing.Callable = encode_callable) -> dict:
+        """
+        Describe this comparator and each of its domains. See
+        ``SingleDomainComparator.to_spec``.
+        """
+        spec = super(MultiDomainComparator, self).to_spec(encode=encode)
+        spec["domains"] = {name: domain.to_spec(encode=encode)
+                           for name, domain in self._domains.items()}
+        return spec
+
+    @classmethod
+    def from_spec(cls,
+                  spec: dict,
+                  decode: typing.Callable = decode_callable
+                  ) -> "MultiDomainComparator":
+        comp = cls(**spec["params"])
+        comp.load_spec(spec, decode=decode)
+        # domains may have settings of their own, so they get rebuilt after
+        # the shared operators, products and domain are set
+        comp._domains = {name: from_spec(domain_spec, decode=decode)
+                         for name, domain_spec in spec["domains"].items()}
+        return comp
 
     @property
     def domain(self):
@@ -69,11 +157,19 @@ class MultiDomainComparator(SingleDomainComparator):
 
 
 class TimeFreqDomainComparator(MultiDomainComparator):
-
-    def __init__(self):
+    """
+    Compares inputs in the time and frequency domains. If ``align_freq`` is
+    True, inputs get time aligned before being transformed to the frequency
+    domain, reusing the time domain's alignment.
+    """
+    def __init__(self, align_freq: bool = False):
+        self._align_freq = align_freq
         domains = {
             "time": TimeDomainComparator("time"),
-            "freq": FrequencyDomainComparator("freq")
+            "freq": FrequencyDomainComparator("freq", align=align_freq)
         }
 
         super(TimeFreqDomainComparator, self).__init__(domains=domains)
+
+    def spec_params(self) -> dict:
+        return {"align_freq": self._align_freq}
@@ -1,23 +1,112 @@
 import logging
+import typing
+import threading
+import collections
+
+import numpy as np
 
 __all__ = [
-    "ComparatorOperatorResult"
+    "ComparatorOperatorResult",
+    "LazyResult"
 ]
 
 module_logger = logging.getLogger(__name__)
 
 
+class _LRUCache:
+    """
+    Computes entries on demand, keeping the ``size`` most recently used.
+    """
+    def __init__(self, compute: typing.Callable, size: int = 0):
+        self._compute = compute
+        self._size = size
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> typing.Any:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        val = self._compute(key)
+        if self._size > 0:
+            with self._lock:
+                self._entries[key] = val
+                while len(self._entries) > self._size:
+                    self._entries.popitem(last=False)
+        return val
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class LazyResult:
+    """
+    Looks like the nested lists of operator results a comparator returns,
+    but computes each operator result when it gets indexed, instead of
+    holding all of them in memory.
+
+    Args:
+        compute (callable): computes the operator result at an index tuple
+        shape (tuple): number of elements at each level of nesting
+        cache_size (int): number of computed results to keep
+    """
+    def __init__(self,
+                 compute: typing.Callable,
+                 shape: tuple,
+                 cache_size: int = 0,
+                 _prefix: tuple = (),
+                 _cache: _LRUCache = None):
+        if _cache is None:
+            _cache = _LRUCache(compute, cache_size)
+        self._shape = shape
+        self._prefix = _prefix
+        self._cache = _cache
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self[i] for i in range(len(self))[item]]
+        # normalizes negative indices, and raises IndexError
+        idx = self._prefix + (range(self._shape[0])[item], )
+        if len(self._shape) > 1:
+            return LazyResult(None, self._shape[1:],
+                              _prefix=idx, _cache=self._cache)
+        return self._cache.get(idx)
+
+    def __len__(self):
+        return self._shape[0]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __str__(self):
+        return list(self).__str__()
+
+
 class ComparatorOperatorResult:
     """
     A convenient represention for the data returned
     by calling operators on data in a SingleDomainComparator object.
+
+    Results over a comparator's memory budget are read only
+    ``np.memmap`` arrays backed by files in ``store``'s directory; the
+    files stay around as long as the store does.
+
+    ``result`` is either nested lists of operator results, or a single
+    ``(n, [n, ]L)`` array holding operator results that all have the same
+    shape. Tuple indexing an array backed result is plain numpy indexing, so
+    ``res_op[:, j]`` gets every result with ``j`` as its second argument as
+    a single view.
     """
-    def __init__(self, result=None, labels=None, name=None):
+    def __init__(self, result=None, labels=None, name=None, store=None):
         if result is None:
             result = []
         self._result = result
         self._labels = labels
+        self._label_index = _index(labels)
         self._name = name
+        self._store = store
 
     def __getitem__(self, item):
         """
@@ -40,16 +129,16 @@ class ComparatorOperatorResult:
             list, np.ndarray, or number
         """
         if hasattr(item, "format"):  # str object
-            if self._labels is not None:
-                if item in self._labels:
-                    idx = self._labels.index(item)
-                    return self.__getitem__(idx)
+            if item in self._label_index:
+                return self.__getitem__(self._label_index[item])
             msg = ("ComparatorOperatorResult.__getitem__: "
                    f"cannot find {item} in labels")
             module_logger.error(msg)
             raise RuntimeError(msg)
 
         elif hasattr(item, "index"):  # tuple object
+            if isinstance(self._result, np.ndarray):
+                return self._result[item]
             res = self._result[item[0]]
             for i in item[1:]:
                 if hasattr(res, "__getitem__"):
@@ -94,9 +183,11 @@ class ComparatorOperatorResult:
         msg = None
         if labels is None:
             self._labels = labels
+            self._label_index = {}
         elif hasattr(labels, "__iter__") and not hasattr(labels, "format"):
             if len(labels) == len(self):
                 self._labels = labels
+                self._label_index = _index(labels)
             else:
                 msg = (f"OperatorResult.labels: "
                        f"Can't set labels attribute with {labels}: "
@@ -113,3 +204,15 @@ class ComparatorOperatorResult:
     @property
     def result(self):
         return self._result
+
+    @property
+    def store(self):
+        return self._store
+
+
+def _index(labels: list) -> dict:
+    index = {}
+    if labels is not None:
+        for i, label in enumerate(labels):
+            index.setdefault(label, i)
+    return index
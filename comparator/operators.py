@@ -0,0 +1,160 @@
+import logging
+import typing
+import inspect
+
+import numpy as np
+
+__all__ = [
+    "Operator",
+    "Product",
+    "symmetries"
+]
+
+module_logger = logging.getLogger(__name__)
+
+
+def _identity(a):
+    return a
+
+
+def count_args(func: typing.Callable,
+               signature: inspect.Signature = None) -> int:
+    """
+    Count the arrays an operator takes. numpy ufuncs, like ``np.subtract``,
+    take ``func.nin`` arrays. Other callables take one array per parameter
+    in their signature; a variadic ``*args`` parameter counts as one, so
+    variadic operators get called on each array.
+    """
+    if isinstance(func, np.ufunc):
+        return func.nin
+    if signature is None:
+        signature = inspect.signature(func)
+    n_args = len(signature.parameters)
+    if n_args == 0:
+        msg = f"count_args: {func!r} doesn't take any arguments"
+        module_logger.error(msg)
+        raise RuntimeError(msg)
+    return n_args
+
+
+# maps op(a, b) to op(b, a) for two argument operators. These are module
+# level functions so that operators can be pickled.
+symmetries = {
+    "symmetric": _identity,
+    "antisymmetric": np.negative,
+    "conjugate": np.conj
+}
+
+
+class Operator:
+    """
+    Wraps a callable that gets registered in a comparator's ``operators``,
+    carrying some meta data about how the comparator should evaluate it.
+
+    An operator that declares itself ``broadcast`` capable gets called once
+    with all the input arrays stacked into a single array, instead of once
+    per combination of input arrays. For an operator that takes ``k``
+    arguments, argument ``i`` has shape ``(1, ..., n_arrays, ..., 1, size)``,
+    with ``n_arrays`` in the ``i``-th position. Most elementwise operators
+    work out of the box:
+
+    .. code-block:: python
+
+        >>> comp.operators["diff"] = Operator(
+                lambda a, b: a - b, broadcast=True)
+
+    Here ``a - b`` gets evaluated as ``a[:, None, :] - a[None, :, :]``.
+
+    A two argument operator can declare a ``symmetry``, in which case the
+    comparator only evaluates it on the upper triangle of pairs (``i < j``,
+    plus ``i == j`` if ``diagonal`` is True), and fills in the lower
+    triangle by mirroring. ``symmetry`` is one of ``"symmetric"``
+    (``op(b, a) == op(a, b)``), ``"antisymmetric"``
+    (``op(b, a) == -op(a, b)``), ``"conjugate"``
+    (``op(b, a) == conj(op(a, b))``), or a callable that maps ``op(a, b)``
+    to ``op(b, a)``. A time domain cross correlation, for example, is
+    mirrored by ``lambda a: np.conj(a[..., ::-1])``. When ``diagonal`` is
+    False, the ``i == j`` results are None.
+
+    .. code-block:: python
+
+        >>> comp.operators["diff"] = Operator(
+                lambda a, b: a - b, symmetry="antisymmetric", diagonal=False)
+    """
+    def __init__(self,
+                 func: typing.Callable,
+                 broadcast: bool = False,
+                 symmetry: typing.Union[str, typing.Callable] = None,
+                 diagonal: bool = True):
+        self._func = func
+        self._broadcast = broadcast
+        self._symmetry = symmetry
+        self._diagonal = diagonal
+        if symmetry is not None and not callable(symmetry):
+            if symmetry not in symmetries:
+                msg = (f"Operator: unknown symmetry {symmetry}, "
+                       f"expected one of {list(symmetries.keys())}")
+                module_logger.error(msg)
+                raise RuntimeError(msg)
+        # lets inspect.signature see through the wrapper
+        try:
+            self.__signature__ = inspect.signature(func)
+        except (TypeError, ValueError):
+            self.__signature__ = None
+
+    def __call__(self, *args, **kwargs):
+        return self._func(*args, **kwargs)
+
+    @property
+    def func(self) -> typing.Callable:
+        return self._func
+
+    @property
+    def broadcast(self) -> bool:
+        return self._broadcast
+
+    @property
+    def symmetry(self) -> typing.Union[str, typing.Callable]:
+        return self._symmetry
+
+    @property
+    def diagonal(self) -> bool:
+        return self._diagonal
+
+    @property
+    def mirror(self) -> typing.Callable:
+        """
+        The callable that maps ``op(a, b)`` to ``op(b, a)``, or None if the
+        operator doesn't have a symmetry.
+        """
+        if self._symmetry is None or callable(self._symmetry):
+            return self._symmetry
+        return symmetries[self._symmetry]
+
+    @property
+    def arity(self) -> int:
+        """
+        The number of arrays the wrapped callable takes, or None if it can't
+        be determined.
+        """
+        if self.__signature__ is None and \
+                not isinstance(self._func, np.ufunc):
+            return None
+        return count_args(self._func, self.__signature__)
+
+
+class Product(Operator):
+    """
+    Wraps a callable that gets registered in a comparator's ``products``.
+
+    A product that declares itself ``broadcast`` capable gets called once
+    with the stacked output of an operator, and has to reduce over the last
+    axis:
+
+    .. code-block:: python
+
+        >>> comp.products["mean"] = Product(
+                lambda a: np.mean(a, axis=-1), broadcast=True)
+    """
+    def __init__(self, func: typing.Callable, broadcast: bool = False):
+        super(Product, self).__init__(func, broadcast=broadcast)
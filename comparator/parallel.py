@@ -0,0 +1,54 @@
+import logging
+import typing
+import threading
+import contextlib
+import concurrent.futures
+
+__all__ = [
+    "get_executor",
+    "check_cancel"
+]
+
+module_logger = logging.getLogger(__name__)
+
+
+@contextlib.contextmanager
+def get_executor(
+    executor: concurrent.futures.Executor = None,
+    n_workers: int = None
+) -> typing.Iterator[typing.Optional[concurrent.futures.Executor]]:
+    """
+    Get the executor to run work items on. An ``executor`` is used as is,
+    and left running. Otherwise, if ``n_workers`` is given, a thread pool
+    with that many threads is created, and shut down on exit. If neither
+    is given, this yields None, and work items get run serially.
+
+    Threads are enough to keep every core busy: numpy and the FFT backends
+    release the GIL while they work on large arrays.
+
+    Examples:
+
+    .. code-block:: python
+
+        >>> with get_executor(n_workers=8) as executor:
+                res_op, res_prod = plan(arrays, executor=executor)
+    """
+    if executor is not None:
+        yield executor
+    elif n_workers is not None and n_workers > 1:
+        module_logger.debug(
+            f"get_executor: creating thread pool with {n_workers} workers")
+        with concurrent.futures.ThreadPoolExecutor(n_workers) as pool:
+            yield pool
+    else:
+        yield None
+
+
+def check_cancel(cancel: threading.Event = None) -> None:
+    """
+    Raise ``concurrent.futures.CancelledError`` if ``cancel`` is set. Long
+    running computations call this between work items.
+    """
+    if cancel is not None and cancel.is_set():
+        module_logger.debug("check_cancel: cancelled")
+        raise concurrent.futures.CancelledError()
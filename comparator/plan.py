@@ -0,0 +1,679 @@
+import typing
+import logging
+import itertools
+import threading
+import concurrent.futures
+
+import numpy as np
+
+from .product_result import ComparatorProductResult
+from .operator_result import ComparatorOperatorResult, LazyResult
+from .store import SpillStore
+from .reducers import as_reducer
+from .operators import count_args
+from .parallel import check_cancel
+
+__all__ = [
+    "OperatorStep",
+    "OperatorPlan",
+    "get_arity"
+]
+
+module_logger = logging.getLogger(__name__)
+
+modes = ("full", "star")
+
+
+def get_arity(op: typing.Callable) -> int:
+    """
+    Get the number of arrays an operator takes.
+    """
+    arity = getattr(op, "arity", None)
+    if arity is None:
+        arity = count_args(op)
+    return arity
+
+
+def _nest(flat: list, n_arrays: int, n_args: int) -> list:
+    """
+    Turn a flat list of ``n_arrays**n_args`` elements into ``n_args``
+    levels of nested lists.
+    """
+    for _ in range(n_args - 1):
+        flat = [flat[i:i + n_arrays] for i in range(0, len(flat), n_arrays)]
+    return flat
+
+
+def _stack(arrays: typing.Sequence[np.ndarray]) -> np.ndarray:
+    # some transforms already return a stack
+    if isinstance(arrays, np.ndarray):
+        return arrays
+    return np.stack(arrays)
+
+
+def _flatten(nested: list, depth: int) -> list:
+    """
+    The inverse of ``_nest``.
+    """
+    for _ in range(depth - 1):
+        nested = [elem for sub in nested for elem in sub]
+    return list(nested)
+
+
+def _pack(nested: list, shape: tuple) -> typing.Optional[np.ndarray]:
+    """
+    Copy nested lists of operator results into a single contiguous array of
+    shape ``shape + result_shape``. Returns None if some results are
+    missing, or they don't all have the same shape.
+    """
+    flat = _flatten(nested, len(shape))
+    if len(flat) == 0 or any(res is None for res in flat):
+        return None
+    if len(set(np.shape(res) for res in flat)) != 1:
+        return None
+    block = np.stack(flat)
+    return block.reshape(shape + block.shape[1:])
+
+
+def _mirror_products(step: "OperatorStep", mode: str, keep: bool) -> bool:
+    """
+    Whether work items have to get products of mirrored results themselves.
+    """
+    return not keep and mode != "star" and \
+        step.symmetry not in (None, "symmetric")
+
+
+class OperatorStep:
+    """
+    A single operator, compiled for execution. Compiling an operator means
+    finding out once how many arguments it takes, whether it is broadcast
+    capable and whether it has a symmetry, instead of every time it gets
+    applied.
+    """
+    def __init__(self, name: str, op: typing.Callable):
+        self.name = name
+        self.op = op
+        self.arity = get_arity(op)
+        self.broadcast = getattr(op, "broadcast", False)
+        self.symmetry = getattr(op, "symmetry", None)
+        self.mirror = getattr(op, "mirror", None)
+        self.diagonal = getattr(op, "diagonal", True)
+        if self.symmetry is not None and self.arity != 2:
+            msg = (f"OperatorStep: {name} has symmetry {self.symmetry}, "
+                   "but only two argument operators can have a symmetry")
+            module_logger.error(msg)
+            raise RuntimeError(msg)
+
+
+class OperatorPlan:
+    """
+    The compiled form of a comparator's operators and products.
+
+    A SingleDomainComparator keeps its plan up to date by listening to its
+    ``operators`` and ``products`` TrackableDicts, so the plan only gets
+    recompiled when an operator or product changes, not on every call.
+    The index tuples an operator gets evaluated on only depend on the number
+    of input arrays, so they get cached as well.
+    """
+    def __init__(self, operators: dict = None, products: dict = None):
+        self._steps = {}
+        self._products = []
+        self._indices = {}
+        if operators is not None:
+            for name in operators:
+                self.set_operator(name, dict.__getitem__(operators, name))
+        if products is not None:
+            self.set_products(products)
+
+    def set_operator(self, name: str, op: typing.Callable) -> None:
+        module_logger.debug(f"OperatorPlan.set_operator: {name}")
+        self._steps[name] = OperatorStep(name, op)
+
+    def remove_operator(self, name: str) -> None:
+        self._steps.pop(name, None)
+
+    def set_products(self, products: dict) -> None:
+        module_logger.debug(
+            f"OperatorPlan.set_products: {list(products.keys())}")
+        self._products = [
+            (name, prod, getattr(prod, "broadcast", False))
+            for name, prod in dict.items(products)
+        ]
+
+    def with_products(self, products: dict) -> "OperatorPlan":
+        """
+        Get a plan that shares this plan's compiled operators, but has
+        different products.
+        """
+        plan = OperatorPlan(products=products)
+        plan._steps = self._steps
+        plan._indices = self._indices
+        return plan
+
+    def indices(self,
+                n_args: int,
+                n_arrays: int,
+                triangle: bool = False,
+                diagonal: bool = True) -> list:
+        """
+        Get the index tuples an operator that takes ``n_args`` arrays gets
+        evaluated on. If ``triangle`` is True, only get the upper triangle
+        of pairs, including the diagonal if ``diagonal`` is True.
+        """
+        key = (n_args, n_arrays, triangle, diagonal)
+        if key not in self._indices:
+            indices = itertools.product(range(n_arrays), repeat=n_args)
+            if triangle:
+                indices = [(i, j) for i, j in indices
+                           if i < j or (diagonal and i == j)]
+            self._indices[key] = list(indices)
+        return self._indices[key]
+
+    def __call__(self,
+                 arrays: typing.Sequence[np.ndarray],
+                 labels: list = None,
+                 mode: str = "full",
+                 executor: concurrent.futures.Executor = None,
+                 cancel: threading.Event = None,
+                 lazy: bool = False,
+                 lazy_cache_size: int = 0,
+                 store: SpillStore = None,
+                 contiguous: bool = False) -> typing.Tuple[dict]:
+        """
+        Run every operator on ``arrays``.
+
+        In ``"full"`` mode, each operator gets evaluated on every combination
+        of arrays. In ``"star"`` mode, ``arrays[0]`` is a reference: two
+        argument operators only get evaluated on ``(arrays[0], arrays[i])``,
+        and their results are labeled with ``labels[1:]``. One argument
+        operators get evaluated on every array in either mode.
+
+        If an ``executor`` is given, every work item is submitted to it
+        before any result is collected. A work item is a single operator
+        evaluation along with its products, or a whole broadcast capable
+        operator. Results are assembled in the same order as when running
+        serially, so they don't depend on which item finishes first.
+
+        If ``cancel`` gets set while operators are running, work items that
+        haven't started yet are skipped, and
+        ``concurrent.futures.CancelledError`` is raised.
+
+        If ``lazy`` is True, products are computed as usual, but operator
+        results are dropped as soon as their products are computed. The
+        ComparatorOperatorResult objects recompute an operator result when
+        it gets indexed, keeping the last ``lazy_cache_size`` of them.
+
+        If a ``store`` is given, every operator result gets added to it as
+        soon as its products are computed, so that results over the store's
+        memory budget get spilled to disk.
+
+        If ``contiguous`` is True, the results of each operator get copied
+        into a single ``(n, [n, ]L)`` array, unless some are missing or
+        they have different shapes. With a ``store``, that array gets added
+        to the store, instead of each result.
+        """
+        if mode not in modes:
+            msg = (f"OperatorPlan.__call__: unknown mode {mode}, "
+                   f"expected one of {modes}")
+            module_logger.error(msg)
+            raise RuntimeError(msg)
+        keep = not lazy
+        contiguous = contiguous and keep
+        run_store = None if contiguous else store
+        if executor is None:
+            results = self._run_serial(arrays, mode, cancel, keep, run_store)
+        else:
+            results = self._run_executor(
+                arrays, mode, executor, cancel, keep, run_store)
+
+        res_op = {}
+        res_prod = {}
+        for name, step in self._steps.items():
+            _res_op, _res_prod = results[name]
+            if lazy:
+                _res_op = LazyResult(
+                    self.entry(step, arrays, mode),
+                    self.result_shape(step, len(arrays), mode),
+                    cache_size=lazy_cache_size)
+            elif contiguous:
+                _res_op = self._pack(
+                    step, _res_op, len(arrays), mode, store)
+            _labels = labels
+            if mode == "star" and step.arity == 2 and labels is not None:
+                _labels = labels[1:]
+            res_op[name] = ComparatorOperatorResult(
+                result=_res_op, labels=_labels, name=name, store=store)
+            res_prod[name] = ComparatorProductResult(
+                products=_res_prod, labels=_labels)
+        return res_op, res_prod
+
+    def _pack(self,
+              step: OperatorStep,
+              res_op: list,
+              n_arrays: int,
+              mode: str,
+              store: SpillStore = None) -> typing.Any:
+        shape = self.result_shape(step, n_arrays, mode)
+        block = _pack(res_op, shape)
+        if block is None:
+            module_logger.debug(
+                f"OperatorPlan._pack: can't pack {step.name} results")
+            if store is None:
+                return res_op
+            flat = [store.add(res) for res in _flatten(res_op, len(shape))]
+            return _nest(flat, shape[0], len(shape))
+        if store is not None:
+            block = store.add(block)
+        return block
+
+    def _run_serial(self,
+                    arrays: typing.Sequence[np.ndarray],
+                    mode: str,
+                    cancel: threading.Event = None,
+                    keep: bool = True,
+                    store: SpillStore = None) -> dict:
+        stack = None
+        results = {}
+        for name, step in self._steps.items():
+            if step.broadcast:
+                check_cancel(cancel)
+                if stack is None:
+                    stack = _stack(arrays)
+                results[name] = self.run_batched(
+                    step, stack, mode, store=store)
+            else:
+                results[name] = self.run(step, arrays, mode, cancel=cancel,
+                                         keep=keep, store=store)
+        return results
+
+    def _run_executor(self,
+                      arrays: typing.Sequence[np.ndarray],
+                      mode: str,
+                      executor: concurrent.futures.Executor,
+                      cancel: threading.Event = None,
+                      keep: bool = True,
+                      store: SpillStore = None) -> dict:
+        stack = None
+        pending = {}
+        submitted = []
+        for name, step in self._steps.items():
+            if step.broadcast:
+                if stack is None:
+                    stack = _stack(arrays)
+                future = executor.submit(self._run_batched_unless_cancelled,
+                                         step, stack, mode, cancel, store)
+                pending[name] = future
+                submitted.append(future)
+            else:
+                indices, assemble = self.work_items(
+                    step, len(arrays), mode, store)
+                mirror = _mirror_products(step, mode, keep)
+                futures = [executor.submit(self.apply, step, arrays, idx,
+                                           cancel, keep, mirror, store)
+                           for idx in indices]
+                pending[name] = (futures, assemble)
+                submitted.extend(futures)
+
+        results = {}
+        try:
+            for name, step in self._steps.items():
+                if step.broadcast:
+                    results[name] = pending[name].result()
+                else:
+                    futures, assemble = pending[name]
+                    results[name] = assemble(
+                        [future.result() for future in futures])
+        except BaseException:
+            # don't leave work items queued up behind a failure
+            for future in submitted:
+                future.cancel()
+            raise
+        return results
+
+    def _run_batched_unless_cancelled(self, step, stack, mode, cancel,
+                                      store):
+        check_cancel(cancel)
+        return self.run_batched(step, stack, mode, store=store)
+
+    def stream(self,
+               chunks: typing.Iterable[typing.Sequence[np.ndarray]],
+               labels: list = None,
+               mode: str = "full") -> dict:
+        """
+        Run every operator on a sequence of chunks of arrays, folding the
+        results into a running state for each product. Only one chunk of
+        operator results is held in memory at a time, so every product has
+        to be a Reducer (or a numpy function with a Reducer equivalent).
+
+        Args:
+            chunks (iterable): Each element is a sequence of aligned chunks,
+                one for each input array.
+            labels (list): optional labels for input arrays
+            mode (str): see ``OperatorPlan.__call__``
+        Returns:
+            dict: ComparatorProductResult objects, keyed by operator name.
+        """
+        reducers = [(name, as_reducer(prod, name))
+                    for name, prod, _ in self._products]
+        operators_only = self.with_products({})
+        states = {}
+        depths = {}
+        for arrays in chunks:
+            res_op, _ = operators_only(arrays, mode=mode)
+            for name in res_op:
+                depth = 1 if mode == "star" else self._steps[name].arity
+                flat = _flatten(res_op[name].result, depth)
+                if name not in states:
+                    depths[name] = (len(arrays), depth)
+                    states[name] = [
+                        {r_name: r.init() for r_name, r in reducers}
+                        for _ in flat
+                    ]
+                for state, res in zip(states[name], flat):
+                    if res is None:
+                        continue
+                    for r_name, r in reducers:
+                        state[r_name] = r.update(state[r_name], res)
+
+        res_prod = {}
+        for name in states:
+            n_arrays, depth = depths[name]
+            flat = [{r_name: r.finalize(state[r_name])
+                     for r_name, r in reducers}
+                    for state in states[name]]
+            _labels = labels
+            if mode == "star" and self._steps[name].arity == 2:
+                n_arrays -= 1
+                if labels is not None:
+                    _labels = labels[1:]
+            res_prod[name] = ComparatorProductResult(
+                products=_nest(flat, n_arrays, depth), labels=_labels)
+        return res_prod
+
+    def _check_star(self, step: OperatorStep) -> None:
+        if step.arity > 2:
+            msg = (f"OperatorPlan: {step.name} takes {step.arity} arguments, "
+                   "but star mode only supports operators that take one "
+                   "or two arguments")
+            module_logger.error(msg)
+            raise RuntimeError(msg)
+
+    def run(self,
+            step: OperatorStep,
+            arrays: typing.Sequence[np.ndarray],
+            mode: str = "full",
+            cancel: threading.Event = None,
+            keep: bool = True,
+            store: SpillStore = None) -> typing.Tuple[list]:
+        """
+        Apply an operator to every combination of ``arrays``, getting
+        products from each result. If ``keep`` is False, operator results
+        are None; only products are kept. If a ``store`` is given,
+        operator results get added to it.
+        """
+        indices, assemble = self.work_items(step, len(arrays), mode, store)
+        mirror = _mirror_products(step, mode, keep)
+        return assemble([
+            self.apply(step, arrays, idx, cancel, keep, mirror, store)
+            for idx in indices
+        ])
+
+    def apply(self,
+              step: OperatorStep,
+              arrays: typing.Sequence[np.ndarray],
+              idx: tuple,
+              cancel: threading.Event = None,
+              keep: bool = True,
+              mirror: bool = False,
+              store: SpillStore = None) -> tuple:
+        """
+        Apply an operator to the arrays at ``idx``, and get products from
+        the result. This is a single work item of ``run``.
+
+        If ``keep`` is False, the operator result isn't returned. As it
+        can't be mirrored later then, ``mirror`` gets the products of the
+        mirrored result of off diagonal pairs right away.
+        """
+        check_cancel(cancel)
+        res = step.op(*[arrays[i] for i in idx])
+        if keep:
+            prods = self.get_products(res)
+            if store is not None:
+                res = store.add(res)
+            return res, prods
+        mirrored = None
+        if mirror and idx[0] != idx[1]:
+            mirrored = self.get_products(step.mirror(res))
+        return None, self.get_products(res), mirrored
+
+    def entry(self,
+              step: OperatorStep,
+              arrays: typing.Sequence[np.ndarray],
+              mode: str = "full") -> typing.Callable:
+        """
+        Get a function that computes a single operator result, given its
+        index in the nested lists ``run`` returns.
+        """
+        op = step.op
+        if step.broadcast:
+            # broadcast capable operators get arguments with one dimension
+            # per argument in front
+            n_args = step.arity
+            broadcast_op = step.op
+
+            def _broadcast_op(*args):
+                shape = (1, )*n_args
+                res = np.asarray(broadcast_op(
+                    *[arr.reshape(shape + arr.shape) for arr in args]))
+                return res.reshape(res.shape[n_args:])
+
+            op = _broadcast_op
+
+        def _entry(idx):
+            if mode == "star" and step.arity > 1:
+                return op(arrays[0], arrays[idx[0] + 1])
+            if step.symmetry is not None:
+                i, j = idx
+                if i == j and not step.diagonal:
+                    return None
+                if i > j:
+                    res = op(arrays[j], arrays[i])
+                    if step.symmetry == "symmetric":
+                        return res
+                    return step.mirror(res)
+            return op(*[arrays[i] for i in idx])
+
+        return _entry
+
+    def result_shape(self,
+                     step: OperatorStep,
+                     n_arrays: int,
+                     mode: str = "full") -> tuple:
+        """
+        Get the number of elements at each level of the nested lists
+        ``run`` returns.
+        """
+        if mode == "star" and step.arity > 1:
+            return (n_arrays - 1, )
+        return (n_arrays, )*step.arity
+
+    def work_items(self,
+                   step: OperatorStep,
+                   n_arrays: int,
+                   mode: str = "full",
+                   store: SpillStore = None
+                   ) -> typing.Tuple[list, typing.Callable]:
+        """
+        Split running an operator on ``n_arrays`` arrays into work items.
+
+        Returns:
+            tuple: the index tuples to ``apply`` the operator on, and a
+                function that assembles the results of ``apply``, in the
+                same order as the index tuples, into the nested lists
+                ``run`` returns.
+        """
+        if mode == "star" and step.arity > 1:
+            self._check_star(step)
+
+            def assemble(results):
+                return [r[0] for r in results], [r[1] for r in results]
+
+            return [(0, i) for i in range(1, n_arrays)], assemble
+
+        if step.symmetry is not None:
+            indices = self.indices(2, n_arrays, True, step.diagonal)
+
+            def assemble(results):
+                upper_op = {idx: r[0] for idx, r in zip(indices, results)}
+                upper_prod = {idx: r[1] for idx, r in zip(indices, results)}
+                if len(results) > 0 and len(results[0]) == 3 and \
+                        step.symmetry != "symmetric":
+                    # products of mirrored results were computed by apply
+                    lower_op = {idx: None for idx in indices}
+                    lower_prod = {idx: r[2]
+                                  for idx, r in zip(indices, results)}
+                    return self._mirror(step, n_arrays, upper_op, upper_prod,
+                                        lower_op, lower_prod)
+                return self._mirror(step, n_arrays, upper_op, upper_prod,
+                                    store=store)
+
+            return indices, assemble
+
+        def assemble(results):
+            return (_nest([r[0] for r in results], n_arrays, step.arity),
+                    _nest([r[1] for r in results], n_arrays, step.arity))
+
+        return self.indices(step.arity, n_arrays), assemble
+
+    def _mirror(self,
+                step: OperatorStep,
+                n_arrays: int,
+                upper_op: dict,
+                upper_prod: dict,
+                lower_op: dict = None,
+                lower_prod: dict = None,
+                store: SpillStore = None) -> typing.Tuple[list]:
+        """
+        Fill in the lower triangle of pairs of a symmetric operator from
+        the upper triangle. ``lower_op`` and ``lower_prod`` are already
+        mirrored results, keyed by the upper triangle index they come from.
+        """
+        res_op = []
+        res_prod = []
+        for i, j in self.indices(2, n_arrays):
+            if i <= j:
+                res_op.append(upper_op.get((i, j)))
+                res_prod.append(upper_prod.get((i, j)))
+            elif lower_op is not None:
+                res_op.append(lower_op[j, i])
+                res_prod.append(lower_prod[j, i])
+            elif step.symmetry == "symmetric":
+                res_op.append(upper_op[j, i])
+                res_prod.append(upper_prod[j, i])
+            else:
+                res = step.mirror(upper_op[j, i])
+                res_prod.append(self.get_products(res))
+                res_op.append(res if store is None else store.add(res))
+        return _nest(res_op, n_arrays, 2), _nest(res_prod, n_arrays, 2)
+
+    def run_batched(self,
+                    step: OperatorStep,
+                    stack: np.ndarray,
+                    mode: str = "full",
+                    store: SpillStore = None) -> typing.Tuple[list]:
+        """
+        Apply a broadcast capable operator to every combination of the rows
+        of ``stack`` in a single call, getting products from the result.
+
+        The results have the same nested list layout as the results of
+        ``run``; the operator results are views into the single array the
+        operator returned. If a ``store`` is given, that array gets added
+        to it.
+        """
+        n_arrays, n_args = stack.shape[0], step.arity
+        if mode == "star" and n_args > 1:
+            self._check_star(step)
+            res = np.asarray(step.op(stack[:1], stack[1:]))
+            res = np.broadcast_to(res, (n_arrays - 1, ) + res.shape[1:])
+            prods = self.get_products_batched(res, 1)
+            if store is not None:
+                res = store.add(res)
+            return (list(res), [{name: prods[name][i] for name in prods}
+                                for i in range(n_arrays - 1)])
+        if step.symmetry is not None:
+            return self._run_batched_triangle(step, stack, store)
+        args = []
+        for i in range(n_args):
+            shape = [1]*n_args + list(stack.shape[1:])
+            shape[i] = n_arrays
+            args.append(stack.reshape(shape))
+        res = np.asarray(step.op(*args))
+        res = np.broadcast_to(
+            res, (n_arrays, )*n_args + res.shape[n_args:])
+        prods = self.get_products_batched(res, n_args)
+        if store is not None:
+            res = store.add(res)
+
+        idx = self.indices(n_args, n_arrays)
+        res_op = [res[i] for i in idx]
+        res_prod = [{name: prods[name][i] for name in prods} for i in idx]
+        return (_nest(res_op, n_arrays, n_args),
+                _nest(res_prod, n_arrays, n_args))
+
+    def _run_batched_triangle(self,
+                              step: OperatorStep,
+                              stack: np.ndarray,
+                              store: SpillStore = None
+                              ) -> typing.Tuple[list]:
+        """
+        Apply a broadcast capable, symmetric operator to the upper triangle
+        of pairs of rows of ``stack`` in a single call.
+        """
+        n_arrays = stack.shape[0]
+        indices = self.indices(2, n_arrays, True, step.diagonal)
+        if len(indices) == 0:
+            return self._mirror(step, n_arrays, {}, {})
+        rows, cols = np.array(indices).T
+        res = np.asarray(step.op(stack[rows], stack[cols]))
+        prods = self.get_products_batched(res, 1)
+        upper_res = res if store is None else store.add(res)
+        upper_op = {idx: upper_res[k] for k, idx in enumerate(indices)}
+        upper_prod = {idx: {name: prods[name][k] for name in prods}
+                      for k, idx in enumerate(indices)}
+        if step.symmetry == "symmetric":
+            return self._mirror(step, n_arrays, upper_op, upper_prod)
+
+        res = np.asarray(step.mirror(res))
+        prods = self.get_products_batched(res, 1)
+        if store is not None:
+            res = store.add(res)
+        lower_op = {idx: res[k] for k, idx in enumerate(indices)}
+        lower_prod = {idx: {name: prods[name][k] for name in prods}
+                      for k, idx in enumerate(indices)}
+        return self._mirror(
+            step, n_arrays, upper_op, upper_prod, lower_op, lower_prod)
+
+    def get_products(self, a: np.ndarray) -> dict:
+        return {name: prod(a) for name, prod, _ in self._products}
+
+    def get_products_batched(self, a: np.ndarray, n_args: int) -> dict:
+        """
+        Get products from the stacked result of a broadcast capable operator.
+        The first ``n_args`` dimensions of ``a`` index the input arrays.
+        Products that aren't broadcast capable get applied to each operator
+        result in turn.
+        """
+        res_prod = {}
+        for name, prod, broadcast in self._products:
+            if broadcast:
+                res_prod[name] = np.asarray(prod(a))
+            else:
+                vals = np.empty(a.shape[:n_args], dtype=object)
+                for idx in np.ndindex(*vals.shape):
+                    vals[idx] = prod(a[idx])
+                res_prod[name] = vals
+        return res_prod
+
+    @property
+    def steps(self) -> dict:
+        return self._steps
@@ -1,6 +1,8 @@
 import logging
 import typing
 
+import numpy as np
+
 __all__ = [
     "ComparatorProductResult"
 ]
@@ -25,8 +27,8 @@ class ComparatorProductResult:
         >>> product_result["mean"]
 
 
-    Internally, a ComparatorProductResult is a nest list of dictionaries.
-    For a simple one to one operator, this looks pretty simple:
+    A ComparatorProductResult can be created from nested lists of
+    dictionaries. For a simple one to one operator, this looks pretty simple:
 
 
     ..code-block:: python
@@ -51,55 +53,99 @@ class ComparatorProductResult:
             ]
         ])
 
-
-
+    Internally, products are stored in a single ``(n, n)`` (or ``(n, )``)
+    structured array, with one field per product, so
+    ``product_result["mean"]`` is an ``(n, n)`` array view, and products
+    that are tuples of scalars get a trailing dimension. Entries that
+    weren't computed (``None`` in the nested lists) are NaN in these
+    arrays, and None when indexed on their own; integer products with
+    missing entries become floats. Products that numpy can't store in a
+    fixed size field are kept as objects.
     """
     def __init__(self, products: list = None, labels: list = None):
 
         if products is None:
             products = []
-            product_names = []
-        else:
-            product_names = self.get_product_names(products)
-
-        self._products = products
+        product_names = self.get_product_names(products)
+        self._data, self._valid = _to_array(products, product_names)
         self._product_names = product_names
         self._format_spec = ".4f"
         self._labels = labels
 
+    @classmethod
+    def from_array(cls,
+                   data: np.ndarray,
+                   valid: np.ndarray = None,
+                   labels: list = None) -> "ComparatorProductResult":
+        """
+        Create a ComparatorProductResult from a structured array with a
+        field for each product, like the one ``array`` returns, without
+        copying it.
+
+        Args:
+            data (np.ndarray): structured array of products
+            valid (np.ndarray): boolean array that is False where entries
+                weren't computed. If None, every entry was.
+            labels (list): optional labels for inputs
+        """
+        res = cls(labels=labels)
+        if valid is None:
+            valid = np.ones(data.shape, dtype=bool)
+        res._data = data
+        res._valid = valid
+        res._product_names = list(data.dtype.names or [])
+        return res
+
     def get_product_names(self, products: list) -> list:
-        module_logger.debug(
-            f"ComparatorProductResult.get_product_names: products={products}")
         if hasattr(products, "keys"):
             return list(products.keys())
         else:
-            return self.get_product_names(products[0])
+            for sub_products in products:
+                if sub_products is not None:
+                    names = self.get_product_names(sub_products)
+                    if names:
+                        return names
+            return []
 
     def __getitem__(self, item: typing.Any):
         if hasattr(item, "split"):  # str like
-            res = []
-
-            def _get_item(products, res):
-                if products is None:
-                    res.append(None)
-                elif hasattr(products, "keys"):
-                    res.append(products[item])
-                else:
-                    res.append([])
-                    for i in range(len(self._products)):
-                        _get_item(products[i], res[-1])
-
-            _get_item(self._products, res)
-            return res[0]
+            if item not in self._product_names:
+                msg = ("ComparatorProductResult.__getitem__: "
+                       f"cannot find {item} in products")
+                module_logger.error(msg)
+                raise RuntimeError(msg)
+            return self._data[item]
         elif hasattr(item, "index"):  # tuple object
-            res = self._products[item[0]]
-            for i in item[1:]:
+            ndim = self._data.ndim
+            res = self._get(tuple(item[:ndim]))
+            for i in item[ndim:]:
                 if res is None:
                     break
                 res = res[i]
             return res
         else:
-            return self._products[item]
+            return self._get(item)
+
+    def _get(self, item: typing.Any) -> typing.Any:
+        """
+        Get entries as the nested lists of dictionaries this was created
+        from.
+        """
+        data = self._data[item]
+        valid = self._valid[item]
+        if data.ndim == 0:
+            if not valid:
+                return None
+            return {name: data[name] for name in self._product_names}
+        return [self._get_sub(data, valid, i) for i in range(len(data))]
+
+    def _get_sub(self, data, valid, i):
+        if data.ndim == 1:
+            if not valid[i]:
+                return None
+            return {name: data[i][name] for name in self._product_names}
+        return [self._get_sub(data[i], valid[i], j)
+                for j in range(len(data[i]))]
 
     def __iter__(self):
         for name in self._product_names:
@@ -120,39 +166,102 @@ class ComparatorProductResult:
 
     def __str__(self) -> str:
 
-        def stringify(sub_product):
-            res = []
-
-            def _iter(sub_product):
-                if hasattr(sub_product[0], "__iter__"):
-                    res.append("[")
-                    for l in sub_product[:-1]:
-                        _iter(l)
-                        res.append("\n")
-                    _iter(sub_product[-1])
-                    res.append("]\n")
-                else:
-                    res.append("".join(
-                        ["[",
-                            ", ".join(
-                                [f"{val:{self._format_spec}}"
-                                 for val in sub_product]
-                            ),
-                         "]"]
-                    ))
-            _iter(sub_product)
-            return "".join(res)
+        def format_val(val):
+            if val is None:
+                return str(val)
+            return f"{val:{self._format_spec}}"
 
         res_str = []
         for i, (key, val) in enumerate(self):
             res_str.append(key)
             res_str.append("\n")
-            res_str.append(stringify(val))
+            res_str.append(np.array2string(
+                val, separator=", ", formatter={"all": format_val}))
             if i != len(self) - 1:
                 res_str.append("\n")
 
         return "".join(res_str)
 
+    @property
+    def array(self) -> np.ndarray:
+        """
+        The structured array products are stored in, with a field for
+        each product.
+        """
+        return self._data
+
+    @property
+    def valid(self) -> np.ndarray:
+        """
+        Boolean array that is False where entries weren't computed.
+        """
+        return self._valid
+
     @property
     def products(self) -> list:
-        return self._products
+        return self._get(Ellipsis)
+
+
+def _shape(products: typing.Any) -> tuple:
+    """
+    Get the shape of nested lists of product dictionaries.
+    """
+    if products is None or hasattr(products, "keys"):
+        return ()
+    for sub_products in products:
+        if sub_products is not None:
+            return (len(products), ) + _shape(sub_products)
+    return (len(products), )
+
+
+def _flatten(products: typing.Any, depth: int) -> list:
+    if depth == 0:
+        return [products]
+    flat = []
+    for sub_products in products:
+        flat.extend(_flatten(sub_products, depth - 1))
+    return flat
+
+
+def _column(vals: list, missing: bool) -> np.ndarray:
+    """
+    Stack the values of a product, falling back to an object array if they
+    can't be stored in a fixed size field.
+    """
+    try:
+        arr = np.asarray(vals)
+    except ValueError:  # values with different shapes
+        arr = None
+    if arr is None or arr.dtype.kind in "OUSV" or \
+            (len(vals) == 0 and missing):
+        arr = np.empty(len(vals), dtype=object)
+        for i, val in enumerate(vals):
+            arr[i] = val
+        if len(vals) == 0:
+            arr = arr.astype(np.float64)
+    elif missing and arr.dtype.kind in "biu":
+        arr = arr.astype(np.float64)
+    return arr
+
+
+def _to_array(products: list, names: list) -> typing.Tuple[np.ndarray]:
+    """
+    Convert nested lists of product dictionaries into a structured array,
+    with a field for each product, and a boolean array of which entries
+    aren't None.
+    """
+    shape = _shape(products)
+    flat = _flatten(products, len(shape))
+    valid = np.array([entry is not None for entry in flat], dtype=bool)
+    missing = not valid.all()
+    columns = [_column([entry[name] for entry in flat if entry is not None],
+                       missing)
+               for name in names]
+    data = np.empty(len(flat), dtype=[
+        (name, col.dtype, col.shape[1:]) for name, col in zip(names, columns)
+    ])
+    for name, col in zip(names, columns):
+        if missing:
+            data[name] = None if col.dtype.kind == "O" else np.nan
+        data[name][valid] = col
+    return data.reshape(shape), valid.reshape(shape)
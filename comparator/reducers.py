@@ -0,0 +1,276 @@
+import logging
+import typing
+
+import numpy as np
+
+__all__ = [
+    "Reducer",
+    "Count",
+    "Sum",
+    "Mean",
+    "Var",
+    "Std",
+    "RMS",
+    "Max",
+    "Min",
+    "as_reducer"
+]
+
+module_logger = logging.getLogger(__name__)
+
+
+class Reducer:
+    """
+    A product that can be computed incrementally, one chunk of an operator
+    result at a time, and whose partial results can be combined.
+
+    A reducer doesn't hold any state itself. ``init`` creates an empty state,
+    ``update`` folds a chunk into a state, ``merge`` combines two states, and
+    ``finalize`` turns a state into the value of the product. States computed
+    on different chunks, threads or processes can be merged exactly, in any
+    order.
+
+    Chunks are reduced over their last axis, so a reducer is broadcast
+    capable: updating with an array of shape ``(n, n, size)`` updates ``n*n``
+    states at once.
+
+    Calling a reducer computes the product of a whole array in one go, so
+    reducers can be used anywhere a product can:
+
+    .. code-block:: python
+
+        >>> comp.products["mean"] = Mean()
+
+    Subclasses implement ``reduce``, which gets the state of a single chunk,
+    and ``merge``. Zero-length chunks don't get reduced; updating a state
+    with one returns it unchanged, and updating an empty state gets the
+    state ``empty`` returns. By default that's None, so a reducer called on
+    an empty array returns None, meaning there's no data.
+    """
+    broadcast = True
+
+    def init(self) -> typing.Any:
+        return None
+
+    def reduce(self, a: np.ndarray) -> typing.Any:
+        raise NotImplementedError()
+
+    def merge(self, state0: typing.Any, state1: typing.Any) -> typing.Any:
+        raise NotImplementedError()
+
+    def empty(self, a: np.ndarray) -> typing.Any:
+        """
+        Get the state of a zero-length chunk, for products that are defined
+        on empty arrays.
+        """
+        return None
+
+    def update(self, state: typing.Any, a: np.ndarray) -> typing.Any:
+        if np.ndim(a) and np.shape(a)[-1] == 0:
+            if state is None:
+                return self.empty(a)
+            return state
+        if state is None:
+            return self.reduce(a)
+        return self.merge(state, self.reduce(a))
+
+    def finalize(self, state: typing.Any) -> typing.Any:
+        return state
+
+    def __call__(self, a: np.ndarray) -> typing.Any:
+        return self.finalize(self.update(self.init(), a))
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}()"
+
+
+def _merge_none(merge):
+    # merging with an empty state is a no-op
+    def _merge(self, state0, state1):
+        if state0 is None:
+            return state1
+        if state1 is None:
+            return state0
+        return merge(self, state0, state1)
+    return _merge
+
+
+class Count(Reducer):
+    """
+    The number of elements.
+    """
+    def reduce(self, a):
+        a = np.asarray(a)
+        return np.full(a.shape[:-1], a.shape[-1], dtype=np.int64)[()]
+
+    def empty(self, a):
+        return self.reduce(a)
+
+    @_merge_none
+    def merge(self, state0, state1):
+        return state0 + state1
+
+
+class Sum(Reducer):
+    """
+    Compensated (Kahan-Babuska-Neumaier) sum. Each chunk is summed with
+    numpy's pairwise summation; the error of adding chunk sums together
+    is tracked in a compensation term.
+    """
+    def reduce(self, a):
+        total = np.sum(a, axis=-1)
+        return total, np.zeros_like(total)
+
+    def empty(self, a):
+        return self.reduce(a)
+
+    @_merge_none
+    def merge(self, state0, state1):
+        s0, c0 = state0
+        s1, c1 = state1
+        total = s0 + s1
+        err = np.where(np.abs(s0) >= np.abs(s1),
+                       (s0 - total) + s1,
+                       (s1 - total) + s0)
+        return total, c0 + c1 + err
+
+    def finalize(self, state):
+        if state is None:
+            return None
+        return (state[0] + state[1])[()]
+
+
+class Mean(Reducer):
+    """
+    Mean, stored as a count and a running mean so that merging states doesn't
+    accumulate large sums.
+    """
+    def reduce(self, a):
+        a = np.asarray(a)
+        return a.shape[-1], np.mean(a, axis=-1)
+
+    @_merge_none
+    def merge(self, state0, state1):
+        n0, m0 = state0
+        n1, m1 = state1
+        n = n0 + n1
+        return n, m0 + (m1 - m0) * (n1 / n)
+
+    def finalize(self, state):
+        if state is None:
+            return None
+        return state[1]
+
+
+class Var(Reducer):
+    """
+    Variance, stored as a count, mean and sum of squared deviations. Each
+    chunk is reduced with a two pass algorithm, and states are merged with
+    Chan et al.'s pairwise generalization of Welford's update. For complex
+    data, this is the variance of the magnitude of the deviation from the
+    mean, like ``np.var``.
+    """
+    def __init__(self, ddof: int = 0):
+        self.ddof = ddof
+
+    def reduce(self, a):
+        a = np.asarray(a)
+        mean = np.mean(a, axis=-1)
+        dev = np.abs(a - mean[..., None])
+        return a.shape[-1], mean, np.sum(dev**2, axis=-1)
+
+    @_merge_none
+    def merge(self, state0, state1):
+        n0, m0, m2_0 = state0
+        n1, m1, m2_1 = state1
+        n = n0 + n1
+        delta = m1 - m0
+        mean = m0 + delta * (n1 / n)
+        m2 = m2_0 + m2_1 + np.abs(delta)**2 * (n0 * n1 / n)
+        return n, mean, m2
+
+    def finalize(self, state):
+        if state is None:
+            return None
+        n, _, m2 = state
+        return m2 / (n - self.ddof)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(ddof={self.ddof})"
+
+
+class Std(Var):
+    """
+    Standard deviation; see ``Var``.
+    """
+    def finalize(self, state):
+        if state is None:
+            return None
+        return np.sqrt(super(Std, self).finalize(state))
+
+
+class RMS(Reducer):
+    """
+    Root mean square of the magnitude of the input.
+    """
+    def reduce(self, a):
+        a = np.asarray(a)
+        return a.shape[-1], np.mean(np.abs(a)**2, axis=-1)
+
+    merge = Mean.merge
+
+    def finalize(self, state):
+        if state is None:
+            return None
+        return np.sqrt(state[1])
+
+
+class Max(Reducer):
+
+    def reduce(self, a):
+        return np.amax(a, axis=-1)
+
+    @_merge_none
+    def merge(self, state0, state1):
+        return np.maximum(state0, state1)
+
+
+class Min(Reducer):
+
+    def reduce(self, a):
+        return np.amin(a, axis=-1)
+
+    @_merge_none
+    def merge(self, state0, state1):
+        return np.minimum(state0, state1)
+
+
+_builtin_reducers = {
+    np.mean: Mean,
+    np.sum: Sum,
+    np.var: Var,
+    np.std: Std,
+    np.amax: Max,
+    np.max: Max,
+    np.amin: Min,
+    np.min: Min
+}
+
+
+def as_reducer(prod: typing.Callable, name: str = None) -> Reducer:
+    """
+    Get a reducer for a product. Reducers are returned as is, and some numpy
+    functions get mapped to their reducer equivalent, eg ``np.mean`` maps to
+    ``Mean()``.
+    """
+    if hasattr(prod, "init") and hasattr(prod, "update") and \
+            hasattr(prod, "merge") and hasattr(prod, "finalize"):
+        return prod
+    try:
+        return _builtin_reducers[prod]()
+    except (KeyError, TypeError):
+        pass
+    msg = (f"as_reducer: product {name if name is not None else prod} "
+           "can't be computed incrementally; use a Reducer instead")
+    module_logger.error(msg)
+    raise RuntimeError(msg)
@@ -0,0 +1,450 @@
+import os
+import uuid
+import queue
+import logging
+import typing
+import threading
+import concurrent.futures
+import multiprocessing.connection
+
+import numpy as np
+
+from .plan import OperatorStep, OperatorPlan
+from .product_result import ComparatorProductResult
+
+__all__ = [
+    "Transport",
+    "ExecutorTransport",
+    "SocketTransport",
+    "WorkerServer",
+    "tiles",
+    "run_sharded"
+]
+
+module_logger = logging.getLogger(__name__)
+
+# shared memory blocks a worker process is attached to, most recent last
+_attached = {}
+_max_attached = 4
+
+# arrays sent to a WorkerServer, keyed by handle
+_store = {}
+
+
+class SharedArray:
+    """
+    A picklable handle to an array in shared memory. Worker processes
+    attach to the shared memory block the first time they ``get`` the
+    array, instead of getting a copy of it with every task.
+    """
+    def __init__(self, name: str, shape: tuple, dtype: np.dtype):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+
+    def get(self) -> np.ndarray:
+        from multiprocessing import shared_memory
+        if self.name not in _attached:
+            try:
+                # the process that created the block unlinks it
+                shm = shared_memory.SharedMemory(name=self.name, track=False)
+            except TypeError:
+                shm = shared_memory.SharedMemory(name=self.name)
+            while len(_attached) >= _max_attached:
+                _detach(next(iter(_attached)))
+            _attached[self.name] = shm
+        return np.ndarray(self.shape, dtype=self.dtype,
+                          buffer=_attached[self.name].buf)
+
+
+def _detach(name: str) -> None:
+    shm = _attached.pop(name)
+    try:
+        shm.close()
+    except BufferError:
+        # an array still refers to the block; it gets closed when the
+        # array is garbage collected
+        pass
+
+
+class LocalArray:
+    """
+    A handle that holds an array itself, for Pythons without
+    ``multiprocessing.shared_memory`` (before 3.8). The array gets pickled
+    along with each task.
+    """
+    def __init__(self, arr: np.ndarray):
+        self.arr = arr
+
+    def get(self) -> np.ndarray:
+        return self.arr
+
+
+class RemoteArray:
+    """
+    A picklable handle to an array that was sent to a WorkerServer.
+    """
+    def __init__(self, key: str):
+        self.key = key
+
+    def get(self) -> np.ndarray:
+        return _store[self.key]
+
+
+class Transport:
+    """
+    How tiles get to workers and back. A transport makes an array available
+    to every worker once with ``share``, and runs tasks with ``submit``,
+    which returns a ``concurrent.futures.Future``. Functions and arguments
+    passed to ``submit`` have to be picklable.
+    """
+    def share(self, arr: np.ndarray) -> typing.Any:
+        raise NotImplementedError()
+
+    def release(self, handle: typing.Any) -> None:
+        pass
+
+    def submit(self,
+               func: typing.Callable,
+               *args: tuple) -> concurrent.futures.Future:
+        raise NotImplementedError()
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ExecutorTransport(Transport):
+    """
+    Run tasks on a ``concurrent.futures`` executor on this machine, sharing
+    arrays through shared memory. Before Python 3.8, which added
+    ``multiprocessing.shared_memory``, arrays get sent with each task.
+
+    Args:
+        executor (concurrent.futures.Executor): executor to run tasks on. If
+            None, a ProcessPoolExecutor with ``n_workers`` processes gets
+            created, and shut down when the transport is closed.
+        n_workers (int): number of processes to create.
+    """
+    def __init__(self,
+                 executor: concurrent.futures.Executor = None,
+                 n_workers: int = None):
+        self._owned = executor is None
+        if executor is None:
+            executor = concurrent.futures.ProcessPoolExecutor(n_workers)
+        self._executor = executor
+        self._shared = {}
+
+    def share(self, arr: np.ndarray) -> typing.Any:
+        try:
+            from multiprocessing import shared_memory
+        except ImportError:
+            return LocalArray(arr)
+        arr = np.ascontiguousarray(arr)
+        shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+        self._shared[shm.name] = shm
+        module_logger.debug(
+            f"ExecutorTransport.share: {arr.nbytes} bytes in {shm.name}")
+        return SharedArray(shm.name, arr.shape, arr.dtype)
+
+    def release(self, handle: typing.Any) -> None:
+        if isinstance(handle, LocalArray):
+            return
+        if handle.name in _attached:
+            _detach(handle.name)
+        shm = self._shared.pop(handle.name)
+        shm.close()
+        shm.unlink()
+
+    def submit(self, func, *args):
+        return self._executor.submit(func, *args)
+
+    def close(self):
+        for name in list(self._shared):
+            self.release(SharedArray(name, None, None))
+        if self._owned:
+            self._executor.shutdown()
+
+
+def _check_authkey(authkey: bytes) -> None:
+    """
+    ``multiprocessing.connection`` skips authentication without a key.
+    """
+    if not isinstance(authkey, bytes) or len(authkey) == 0:
+        msg = "_check_authkey: authkey has to be non empty bytes"
+        module_logger.error(msg)
+        raise RuntimeError(msg)
+
+
+class SocketTransport(Transport):
+    """
+    Run tasks on WorkerServers, possibly on other machines, over
+    ``multiprocessing.connection`` sockets. Shared arrays get sent to each
+    worker once. Messages are pickled, so only connect to trusted workers.
+
+    Args:
+        addresses (list): ``(host, port)`` address of each worker
+        authkey (bytes): key to authenticate with workers; the ``authkey``
+            of their WorkerServers.
+    """
+    def __init__(self, addresses: list, authkey: bytes):
+        _check_authkey(authkey)
+        self._connections = [
+            multiprocessing.connection.Client(tuple(address), authkey=authkey)
+            for address in addresses
+        ]
+        self._idle = queue.Queue()
+        for conn in self._connections:
+            self._idle.put(conn)
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            len(self._connections))
+
+    def _request(self, conn, *msg: tuple) -> typing.Any:
+        conn.send(msg)
+        status, val = conn.recv()
+        if status != "ok":
+            msg = f"SocketTransport: worker failed: {val}"
+            module_logger.error(msg)
+            raise RuntimeError(msg)
+        return val
+
+    def share(self, arr: np.ndarray) -> RemoteArray:
+        key = uuid.uuid4().hex
+        for conn in self._connections:
+            self._request(conn, "put", key, np.ascontiguousarray(arr))
+        return RemoteArray(key)
+
+    def release(self, handle: RemoteArray) -> None:
+        for conn in self._connections:
+            self._request(conn, "delete", handle.key)
+
+    def submit(self, func, *args):
+
+        def _call():
+            conn = self._idle.get()
+            try:
+                return self._request(conn, "call", func, args)
+            finally:
+                self._idle.put(conn)
+
+        return self._executor.submit(_call)
+
+    def close(self):
+        self._executor.shutdown()
+        for conn in self._connections:
+            try:
+                conn.send(("close", ))
+            except OSError:
+                pass
+            conn.close()
+
+
+class WorkerServer:
+    """
+    Runs tasks sent by a SocketTransport. Each connection gets handled in
+    its own thread, so a single server can serve several transports.
+
+    Tasks are arbitrary pickled callables, so clients always have to
+    authenticate. If no ``authkey`` is given, a random one is generated;
+    pass ``server.authkey`` to the SocketTransport.
+
+    Examples:
+
+    .. code-block:: python
+
+        # on each worker machine
+        >>> WorkerServer(("0.0.0.0", 6000), authkey=b"secret").serve_forever()
+        # on the machine running the comparison
+        >>> with SocketTransport([("node0", 6000), ("node1", 6000)],
+                                 authkey=b"secret") as transport:
+                res_prod = comp.shard(*arrays, transport=transport)
+
+    Args:
+        address (tuple): ``(host, port)`` to listen on. Port 0 picks a free
+            port; see ``address``.
+        authkey (bytes): key clients have to authenticate with
+    """
+    def __init__(self,
+                 address: tuple = ("localhost", 0),
+                 authkey: bytes = None):
+        if authkey is None:
+            authkey = os.urandom(32)
+        _check_authkey(authkey)
+        self._authkey = authkey
+        self._listener = multiprocessing.connection.Listener(
+            address, authkey=authkey)
+        self._closed = False
+
+    @property
+    def address(self) -> tuple:
+        return self._listener.address
+
+    @property
+    def authkey(self) -> bytes:
+        return self._authkey
+
+    def serve_forever(self) -> None:
+        while not self._closed:
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError,
+                    multiprocessing.AuthenticationError) as err:
+                if self._closed:
+                    break
+                module_logger.error(f"WorkerServer.serve_forever: {err}")
+                continue
+            threading.Thread(
+                target=self._handle, args=(conn, ), daemon=True).start()
+
+    def _handle(self, conn) -> None:
+        keys = set()
+        try:
+            while True:
+                msg = conn.recv()
+                if msg[0] == "close":
+                    break
+                try:
+                    conn.send(("ok", self._dispatch(msg, keys)))
+                except Exception as err:
+                    module_logger.error(f"WorkerServer._handle: {err!r}")
+                    conn.send(("error", repr(err)))
+        except EOFError:
+            pass
+        finally:
+            for key in keys:
+                _store.pop(key, None)
+            conn.close()
+
+    def _dispatch(self, msg: tuple, keys: set) -> typing.Any:
+        if msg[0] == "put":
+            _, key, arr = msg
+            _store[key] = arr
+            keys.add(key)
+        elif msg[0] == "delete":
+            _store.pop(msg[1], None)
+            keys.discard(msg[1])
+        elif msg[0] == "call":
+            _, func, args = msg
+            return func(*args)
+        else:
+            raise ValueError(f"unknown message {msg[0]}")
+
+    def close(self) -> None:
+        self._closed = True
+        self._listener.close()
+
+
+def tiles(n_arrays: int,
+          tile_size: int,
+          triangle: bool = False) -> typing.List[tuple]:
+    """
+    Split the ``(i, j)`` pairs of ``n_arrays`` arrays into square tiles of
+    ``tile_size`` rows and columns. If ``triangle`` is True, only get the
+    tiles that overlap the upper triangle.
+
+    Returns:
+        list: ``((row_start, row_stop), (col_start, col_stop))`` of each tile
+    """
+    starts = range(0, n_arrays, tile_size)
+    return [((r, min(r + tile_size, n_arrays)),
+             (c, min(c + tile_size, n_arrays)))
+            for r in starts for c in starts if not triangle or c >= r]
+
+
+def _run_tile(handle: typing.Any,
+              step: OperatorStep,
+              products: dict,
+              rows: tuple,
+              cols: tuple) -> list:
+    """
+    Apply a two argument operator to every pair in a tile, and get the
+    products of each result. This runs on a worker.
+
+    Returns:
+        list: ``(i, j, products, mirrored_products)`` for each pair. For
+            operators with a symmetry other than ``"symmetric"``,
+            ``mirrored_products`` are the products of ``(j, i)``.
+    """
+    stack = handle.get()
+    plan = OperatorPlan(products=products)
+    if step.broadcast and step.symmetry is None:
+        res = np.asarray(step.op(stack[rows[0]:rows[1], None],
+                                 stack[None, cols[0]:cols[1]]))
+        res = np.broadcast_to(
+            res, (rows[1] - rows[0], cols[1] - cols[0]) + res.shape[2:])
+        prods = plan.get_products_batched(res, 2)
+        return [(i, j, {name: prods[name][i - rows[0], j - cols[0]]
+                        for name in prods}, None)
+                for i in range(*rows) for j in range(*cols)]
+
+    out = []
+    for i in range(*rows):
+        for j in range(*cols):
+            if step.symmetry is not None and \
+                    (i > j or (i == j and not step.diagonal)):
+                continue
+            res = step.op(stack[i], stack[j])
+            mirrored = None
+            if step.symmetry not in (None, "symmetric") and i != j:
+                mirrored = plan.get_products(step.mirror(res))
+            out.append((i, j, plan.get_products(res), mirrored))
+    return out
+
+
+def run_sharded(step: OperatorStep,
+                products: dict,
+                stack: np.ndarray,
+                transport: Transport,
+                tile_size: int = 64,
+                labels: list = None,
+                handle: typing.Any = None) -> ComparatorProductResult:
+    """
+    Get the products of a two argument operator applied to every pair of
+    rows of ``stack``, splitting pairs into tiles that run on ``transport``.
+    For operators with a symmetry, only tiles in the upper triangle run.
+
+    Args:
+        step (OperatorStep): the operator; it has to be picklable.
+        products (dict): products to get; they have to be picklable.
+        stack (np.ndarray): transformed inputs, one per row
+        transport (Transport): where to run tiles
+        tile_size (int): number of rows and columns in a tile
+        labels (list): optional labels for inputs
+        handle: a handle to ``stack`` that ``transport`` already shares.
+            If None, ``stack`` gets shared for the duration of the call.
+    Returns:
+        ComparatorProductResult: products of every pair
+    """
+    if step.arity != 2:
+        msg = (f"run_sharded: {step.name} takes {step.arity} arguments, "
+               "but only two argument operators can be sharded")
+        module_logger.error(msg)
+        raise RuntimeError(msg)
+    n_arrays = stack.shape[0]
+    triangle = step.symmetry is not None
+    owned = handle is None
+    if owned:
+        handle = transport.share(stack)
+    try:
+        futures = [
+            transport.submit(_run_tile, handle, step, products, rows, cols)
+            for rows, cols in tiles(n_arrays, tile_size, triangle)
+        ]
+        module_logger.debug(
+            f"run_sharded: {step.name}: {len(futures)} tiles")
+        grid = [[None]*n_arrays for _ in range(n_arrays)]
+        for future in futures:
+            for i, j, prods, mirrored in future.result():
+                grid[i][j] = prods
+                if triangle and i != j:
+                    grid[j][i] = prods if mirrored is None else mirrored
+    finally:
+        if owned:
+            transport.release(handle)
+    return ComparatorProductResult(products=grid, labels=labels)
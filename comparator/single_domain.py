@@ -1,20 +1,29 @@
+import copy
 import typing
 import logging
-import inspect
-import functools
+import threading
+import collections
+import concurrent.futures
 
 import numpy as np
-import scipy.signal
-import scipy.fftpack
 
-from .trackable import TrackableDict
+from .trackable import TrackableDict, deleted
+from .plan import OperatorPlan, OperatorStep, _stack
+from .fft import FFTBackend, get_backend
+from .cache import TransformCache
+from .align import get_time_delays
+from .parallel import get_executor, check_cancel
+from .store import SpillStore
+from .shard import Transport, ExecutorTransport, run_sharded
+from .operators import _identity
 from .product_result import ComparatorProductResult
-from .operator_result import ComparatorOperatorResult
+from .spec import encode_callable, decode_callable, from_spec, _path
 
 vector_function = typing.Callable[[np.ndarray], np.ndarray]
 domain_type = typing.Union[slice, list, tuple]
 
 __all__ = [
+    "Domain",
     "SingleDomainComparator",
     "TimeDomainComparator",
     "FrequencyDomainComparator"
@@ -23,6 +32,82 @@ __all__ = [
 module_logger = logging.getLogger(__name__)
 
 
+def _roll_slice(arr: np.ndarray,
+                shift: int,
+                size: int,
+                domain: typing.Any) -> np.ndarray:
+    """
+    Get ``np.roll(arr, shift)[:size][domain]`` without rolling ``arr``.
+    When the domain doesn't wrap around the end of ``arr``, this is a view;
+    otherwise only the samples in the domain get copied.
+    """
+    n = arr.shape[0]
+    shift = shift % n if n > 0 else 0
+    if shift == 0:
+        return arr[:size][domain]
+    if isinstance(domain, slice):
+        start, stop, step = domain.indices(size)
+        if step > 0:
+            # rolled[j] is arr[j - shift] for j >= shift, and
+            # arr[j - shift + n] for j < shift
+            if start >= shift or start >= stop:
+                return arr[start - shift:max(stop - shift, 0):step]
+            if stop <= shift:
+                return arr[start - shift + n:stop - shift + n:step]
+            first = start + -(-(shift - start) // step) * step
+            return np.concatenate([
+                arr[start - shift + n::step],
+                arr[first - shift:stop - shift:step]
+            ])
+    idx = (np.arange(size)[domain] - shift) % n
+    return arr[idx]
+
+
+def _shifts_key(shifts: typing.Optional[list]) -> typing.Optional[tuple]:
+    if shifts is None:
+        return None
+    return tuple(shifts)
+
+
+class Domain:
+    """
+    An operation domain: gets the slice of an array of a given size that
+    operators get applied to. If any of ``start``, ``stop`` or ``step`` is
+    a float, they are fractions of the size of the array.
+
+    Unlike a lambda, a Domain can be pickled.
+    """
+    def __init__(self,
+                 start: typing.Union[int, float] = None,
+                 stop: typing.Union[int, float] = None,
+                 step: typing.Union[int, float] = None):
+        self.start = start
+        self.stop = stop
+        self.step = step
+
+    @property
+    def fractional(self) -> bool:
+        return any([isinstance(v, float)
+                    for v in (self.start, self.stop, self.step)])
+
+    def __call__(self, size: int) -> slice:
+        vals = (self.start, self.stop, self.step)
+        if self.fractional:
+            vals = [v if v is None else int(v*size) for v in vals]
+        return slice(*vals)
+
+    def __eq__(self, other):
+        if not isinstance(other, Domain):
+            return NotImplemented
+        return self.to_spec() == other.to_spec()
+
+    def to_spec(self) -> list:
+        return [self.start, self.stop, self.step]
+
+    def __repr__(self):
+        return f"Domain({self.start}, {self.stop}, {self.step})"
+
+
 class SingleDomainComparator:
 
     def __init__(self, name: str,
@@ -33,41 +118,355 @@ class SingleDomainComparator:
             "forward": forward_transform,
             "inverse": inverse_transform
         }
-        self._operation_domain = lambda size: slice(0, None)  # get whole array
+        self._operation_domain = Domain(0, None)  # get whole array
         self._operators = TrackableDict({})
         self._products = TrackableDict({})
+        self._plan = OperatorPlan()
+        self._operators.on(self._on_operators_change)
+        self._products.on(self._on_products_change)
 
     def __call__(self,
                  *arrays: typing.Tuple[np.ndarray],
-                 labels=None) -> typing.Tuple[list]:
+                 labels=None,
+                 mode: str = "full",
+                 cache: TransformCache = None,
+                 executor: concurrent.futures.Executor = None,
+                 n_workers: int = None,
+                 cancel: threading.Event = None,
+                 lazy: bool = False,
+                 lazy_cache_size: int = 8,
+                 memory_budget: int = None,
+                 spill_dir: str = None,
+                 contiguous: bool = False) -> typing.Tuple[list]:
+        """
+        Apply operators to arrays, and get products from the results.
+
+        Operators and products can be evaluated in parallel, on an
+        ``executor`` or on a thread pool of ``n_workers`` threads created
+        for the call. Each evaluation of an operator on one combination of
+        arrays, along with its products, is a separate work item; broadcast
+        capable operators are a single work item. Results are the same as
+        when running serially.
+
+        Args:
+            arrays (tuple): arrays to compare
+            labels (list): optional labels for arrays
+            mode (str): ``"full"`` evaluates two argument operators on every
+                pair of arrays. ``"star"`` treats the first array as a
+                reference, and only evaluates two argument operators on
+                ``(arrays[0], arrays[i])``; results are labeled with
+                ``labels[1:]``.
+            cache (TransformCache): cache of transform results to share with
+                other comparators operating on the same arrays.
+            executor (concurrent.futures.Executor): executor to run work
+                items on.
+            n_workers (int): if no ``executor`` is given, the number of
+                threads to run work items on.
+            cancel (threading.Event): if set from another thread, the
+                comparison stops before the next work item, and raises
+                ``concurrent.futures.CancelledError``.
+            lazy (bool): compute products, but don't hold on to operator
+                results. Indexing a ComparatorOperatorResult, eg
+                ``res_op["xcorr"]["a"]``, recomputes the operator results
+                it needs from the transformed arrays.
+            lazy_cache_size (int): number of recomputed operator results
+                each lazy ComparatorOperatorResult keeps.
+            memory_budget (int): number of bytes of operator results to keep
+                in memory. Once it's used up, operator results get written
+                to ``.npy`` files as they're computed, and come back as read
+                only ``np.memmap`` arrays. Labels and indexing work the same
+                way. Ignored if ``lazy`` is True.
+            spill_dir (str): directory to write operator results over the
+                ``memory_budget`` to. If None, a temporary directory is
+                used, and removed once the operator results are garbage
+                collected.
+            contiguous (bool): copy the results of each operator into a
+                single ``(n, [n, ]L)`` array, so ``res_op["diff"][:, j]``
+                is a view of every result with ``j`` as second argument.
+                Operators with missing results, or results of different
+                shapes, keep nested lists. Ignored if ``lazy`` is True.
+        Returns:
+            tuple: dicts of ComparatorOperatorResult and
+                ComparatorProductResult objects, keyed by operator name.
+        """
         module_logger.debug(
             f"SingleDomainComparator.__call__: len(arrays): {len(arrays)}")
-        arrays = self.transform(*arrays)
-        res_op = {}
+        arrays = self.transform(*arrays, cache=cache)
+        check_cancel(cancel)
+        store = None
+        if memory_budget is not None and not lazy:
+            store = SpillStore(memory_budget, spill_dir)
+        with get_executor(executor, n_workers) as _executor:
+            return self._plan(arrays, labels=labels, mode=mode,
+                              executor=_executor, cancel=cancel, lazy=lazy,
+                              lazy_cache_size=lazy_cache_size, store=store,
+                              contiguous=contiguous)
+
+    async def acall(self,
+                    *arrays: typing.Tuple[np.ndarray],
+                    loop_executor: concurrent.futures.Executor = None,
+                    **kwargs: dict) -> typing.Any:
+        """
+        Like ``__call__``, but runs on ``loop_executor`` (the event loop's
+        default executor if None), so that the event loop isn't blocked
+        while arrays are being compared. Cancelling the awaiting task stops
+        the comparison at the next work item. Keyword arguments are passed
+        to ``__call__``.
+
+        Examples:
+
+        .. code-block:: python
+
+            >>> res_op, res_prod = await comp.acall(a, b, n_workers=8)
+        """
+        from .aio import run_cancellable
+        return await run_cancellable(
+            self, *arrays, loop_executor=loop_executor, **kwargs)
+
+    async def astream(self,
+                      *iterables: typing.Tuple[typing.Any],
+                      max_pending: int = 1,
+                      loop_executor: concurrent.futures.Executor = None,
+                      **kwargs: dict) -> typing.AsyncIterator:
+        """
+        Compare blocks of arrays as they arrive. Each of ``iterables`` is an
+        async (or plain) iterable that yields blocks of one input; every
+        set of blocks gets compared with ``acall``, and the results are
+        yielded in the order the blocks arrived.
+
+        At most ``max_pending`` comparisons run at once. When that many are
+        running, no more blocks are taken from ``iterables`` until the
+        oldest one is done, so producers feel backpressure instead of
+        blocks piling up in memory. If iteration stops early, or the
+        consuming task is cancelled, running comparisons get cancelled.
+
+        Examples:
+
+        .. code-block:: python
+
+            >>> async for res_op, res_prod in comp.astream(
+                    instrument_a.blocks(), instrument_b.blocks(),
+                    max_pending=4):
+                    publish(res_prod)
+        """
+        # asyncio is only imported when it's used, as it is slow to import
+        import asyncio
+        from .aio import azip
+        pending = collections.deque()
+        try:
+            async for arrays in azip(*iterables):
+                pending.append(asyncio.ensure_future(self.acall(
+                    *arrays, loop_executor=loop_executor, **kwargs)))
+                if len(pending) >= max_pending:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stream(self,
+               *iterables: typing.Tuple[typing.Iterable[np.ndarray]],
+               labels=None,
+               mode: str = "full") -> dict:
+        """
+        Compare arrays that are too big to fit in memory, one chunk at a
+        time. Each of ``iterables`` yields consecutive chunks of one of the
+        input arrays; the chunks have to be aligned across iterables.
+        Operators get applied to each chunk in turn, and products get folded
+        into running accumulators, so every product has to be a
+        ``reducers.Reducer`` (``np.mean``, ``np.sum``, ``np.amax`` and
+        ``np.amin`` are converted automatically).
+
+        The operation domain doesn't get applied when streaming, as the
+        total size of the inputs isn't known in advance. The forward
+        transform gets applied to each chunk.
+
+        Examples:
+
+        .. code-block:: python
+
+            >>> comp.products["mean"] = np.mean
+            >>> res_prod = comp.stream(
+                    (a[i:i+1024] for i in range(0, a.shape[0], 1024)),
+                    (b[i:i+1024] for i in range(0, b.shape[0], 1024)))
+
+        Args:
+            iterables (tuple): iterables of chunks, one for each input
+            labels (list): optional labels for inputs
+            mode (str): see ``SingleDomainComparator.__call__``
+        Returns:
+            dict: ComparatorProductResult objects, keyed by operator name.
+        """
+        module_logger.debug(
+            f"SingleDomainComparator.stream: len(iterables): {len(iterables)}")
+        chunks = (self.transform_chunk(*chunk) for chunk in zip(*iterables))
+        return self._plan.stream(chunks, labels=labels, mode=mode)
+
+    def shard(self,
+              *arrays: typing.Tuple[np.ndarray],
+              labels=None,
+              tile_size: int = 64,
+              transport: Transport = None,
+              n_workers: int = None,
+              cache: TransformCache = None) -> dict:
+        """
+        Compare many arrays, splitting the pairs two argument operators get
+        evaluated on into tiles of ``tile_size`` by ``tile_size`` pairs that
+        run on worker processes or remote workers. Arrays are transformed
+        here, and the transformed arrays are shared with workers once.
+        Only products are sent back, so the ``N**2`` operator results never
+        have to fit in one process. Operators that don't take two arguments
+        run here.
+
+        Operators and products have to be picklable: use module level
+        functions, or built in numpy functions, rather than lambdas.
+
+        Examples:
+
+        .. code-block:: python
+
+            >>> comp.operators["diff"] = np.subtract
+            >>> comp.products["mean"] = np.mean
+            >>> res_prod = comp.shard(*arrays, n_workers=8)
+            >>> res_prod["diff"][3, 250]["mean"]
+
+        Args:
+            arrays (tuple): arrays to compare
+            labels (list): optional labels for arrays
+            tile_size (int): number of rows and columns of pairs in a tile
+            transport (shard.Transport): where to run tiles, eg a
+                ``shard.SocketTransport`` connected to remote workers. If
+                None, tiles run on a process pool of ``n_workers``
+                processes, with inputs in shared memory.
+            n_workers (int): number of processes, if no ``transport`` is
+                given
+            cache (TransformCache): see ``__call__``
+        Returns:
+            dict: ComparatorProductResult objects, keyed by operator name.
+        """
+        stack = _stack(self.transform(*arrays, cache=cache))
+        products = dict(self._products)
+        local = OperatorPlan(products=products)
+        owned = transport is None
+        if owned:
+            transport = ExecutorTransport(n_workers=n_workers)
         res_prod = {}
-        for op_name in self._operators:
-            op = self._operators[op_name]
-            _res_op, _res_prod = self.get_operator_products(op, arrays)
-            res_op[op_name] = ComparatorOperatorResult(
-                result=_res_op, labels=labels, name=op_name)
-            res_prod[op_name] = ComparatorProductResult(
-                products=_res_prod, labels=labels)
+        handle = None
+        try:
+            handle = transport.share(stack)
+            for name, step in self._plan.steps.items():
+                if step.arity == 2:
+                    res_prod[name] = run_sharded(
+                        step, products, stack, transport,
+                        tile_size=tile_size, labels=labels, handle=handle)
+                else:
+                    _, _res_prod = local.run(step, stack)
+                    res_prod[name] = ComparatorProductResult(
+                        products=_res_prod, labels=labels)
+        finally:
+            if handle is not None:
+                transport.release(handle)
+            if owned:
+                transport.close()
+        return res_prod
 
-        return res_op, res_prod
+    def transform_chunk(self, *chunks: typing.Tuple[np.ndarray]) -> list:
+        """
+        Transform one chunk of each input when streaming. Unlike
+        ``transform``, this doesn't apply the operation domain.
+        """
+        min_size = min([c.shape[0] for c in chunks])
+        forward = self._transforms["forward"]
+        if forward is None:
+            return [c[:min_size] for c in chunks]
+        return [forward(c[:min_size]) for c in chunks]
 
-    def transform(self, *arrays: typing.Tuple[np.ndarray]) -> list:
+    def _on_operators_change(self, item, *args):
+        if not args:  # means we're getting
+            return
+        val, = args
+        if val is deleted:
+            self._plan.remove_operator(item)
+        else:
+            self._plan.set_operator(item, val)
+
+    def _on_products_change(self, item, *args):
+        if not args:
+            return
+        val, = args
+        # the new product only gets added to the dict after listeners are
+        # notified
+        products = dict(self._products)
+        if val is deleted:
+            products.pop(item, None)
+        else:
+            products[item] = val
+        self._plan.set_products(products)
+
+    def transform(self,
+                  *arrays: typing.Tuple[np.ndarray],
+                  cache: TransformCache = None) -> list:
         module_logger.debug(
             f"SingleDomainComparator.transform")
+        forward = self._transforms["forward"]
+        shifts = self.get_shifts(*arrays, cache=cache)
+        sliced = self.slice_domain(*arrays, shifts=shifts)
+        if forward is None:
+            return sliced
+
+        def _transform():
+            return [forward(arr) for arr in sliced]
+
+        domain_key = self.domain_key(*arrays)
+        if cache is None or domain_key is None:
+            return _transform()
+        return cache.get(
+            cache.key("forward", arrays, domain_key, forward,
+                      _shifts_key(shifts)), _transform)
+
+    def get_shifts(self,
+                   *arrays: typing.Tuple[np.ndarray],
+                   cache: TransformCache = None) -> typing.Optional[list]:
+        """
+        Get the number of samples each of ``arrays`` should be circularly
+        shifted by before slicing it by the operation domain, or None if
+        inputs don't get shifted.
+        """
+        return None
+
+    def domain_key(self, *arrays: typing.Tuple[np.ndarray]) -> tuple:
+        """
+        Get a hashable representation of the part of ``arrays`` that
+        ``slice_domain`` selects, or None if the operation domain isn't a
+        slice.
+        """
         min_size = min([a.shape[0] for a in arrays])
-        transformed = []
-        for arr in arrays:
-            arr = arr[:min_size][self._operation_domain(min_size)]
-            if self._transforms["forward"] is not None:
-                transformed.append(self._transforms["forward"](arr))
-            else:
-                transformed.append(arr)
+        domain = self._operation_domain(min_size)
+        if not isinstance(domain, slice):
+            return None
+        return (min_size, domain.start, domain.stop, domain.step)
+
+    def slice_domain(self,
+                     *arrays: typing.Tuple[np.ndarray],
+                     shifts: typing.Sequence[int] = None) -> list:
+        """
+        Truncate arrays to the size of the smallest one, and slice them by
+        the operation domain.
 
-        return transformed
+        If ``shifts`` are given, each array is first circularly shifted, as
+        with ``np.roll(arr, shift)``. The shift is folded into the slice, so
+        arrays don't get copied unless the domain wraps around their end,
+        and then only the samples in the domain get copied.
+        """
+        min_size = min([a.shape[0] for a in arrays])
+        domain = self._operation_domain(min_size)
+        # slicing memory mapped arrays doesn't read anything from disk,
+        # so only the operation domain gets read.
+        if shifts is None:
+            return [arr[:min_size][domain] for arr in arrays]
+        return [_roll_slice(arr, shift, min_size, domain)
+                for arr, shift in zip(arrays, shifts)]
 
     def get_operator_products(
         self,
@@ -78,33 +477,22 @@ class SingleDomainComparator:
         Apply an operator to arrays. Get products from the result of the
         operator.
         """
-        res_op = []
-        res_prod = []
-
-        def _get_operator_products(op, arrays, res_op, res_prod):
-            for arr in arrays:
-                sig_op = inspect.signature(op)
-                if len(sig_op.parameters) > 1:
-                    res_op.append([])
-                    res_prod.append([])
-                    new_op = functools.partial(op, arr)
-                    _get_operator_products(
-                        new_op, arrays, res_op[-1], res_prod[-1])
-                else:
-                    res_op.append(op(arr))
-                    res_prod.append(self.get_products(res_op[-1]))
-
-        _get_operator_products(
-            op, arrays, res_op, res_prod)
+        return self._plan.run(OperatorStep(None, op), arrays)
 
-        return res_op, res_prod
+    def get_operator_products_batched(
+        self,
+        op: typing.Callable,
+        stack: np.ndarray
+    ) -> typing.Tuple[list]:
+        """
+        Apply a broadcast capable operator to every combination of the rows
+        of ``stack`` in a single call. Get products from the result of the
+        operator.
+        """
+        return self._plan.run_batched(OperatorStep(None, op), stack)
 
     def get_products(self, a: np.ndarray) -> dict:
-        res_prod = {}
-        for prod_name in self._products:
-            prod = self._products[prod_name]
-            res_prod[prod_name] = prod(a)
-        return res_prod
+        return self._plan.get_products(a)
 
     @property
     def name(self):
@@ -118,6 +506,10 @@ class SingleDomainComparator:
     def products(self):
         return self._products
 
+    @property
+    def plan(self) -> OperatorPlan:
+        return self._plan
+
     @property
     def domain(self):
         return self._operation_domain
@@ -125,31 +517,182 @@ class SingleDomainComparator:
     @domain.setter
     def domain(self, new_domain: domain_type):
         if hasattr(new_domain, "__iter__"):  # means we're passing a list
-            if any([isinstance(v, float) for v in new_domain]):
-                self._operation_domain = \
-                    lambda a: slice(*[int(v*a) for v in new_domain])
-            else:
-                self._operation_domain = lambda a: slice(*new_domain)
-        elif hasattr(new_domain, 'start'):  # means we're passing a slice
-            self._operation_domain = lambda a: new_domain
+            self._operation_domain = Domain(*new_domain)
+        elif isinstance(new_domain, slice):
+            self._operation_domain = Domain(
+                new_domain.start, new_domain.stop, new_domain.step)
         elif callable(new_domain):
             self._operation_domain = new_domain
 
+    _callable_params = ("forward_transform", "inverse_transform")
+
+    def spec_params(self) -> dict:
+        """
+        Get the arguments to pass to the constructor when rebuilding this
+        comparator from a spec.
+        """
+        return {
+            "name": self._name,
+            "forward_transform": self._transforms["forward"],
+            "inverse_transform": self._transforms["inverse"]
+        }
+
+    def to_spec(self,
+                encode: typing.Callable = encode_callable) -> dict:
+        """
+        Describe this comparator: its type, constructor arguments, operation
+        domain, operators and products. The spec is made of JSON
+        serializable types, so it can be saved, or sent to another process
+        or machine, where ``spec.from_spec`` rebuilds the comparator.
+        Pickling a comparator pickles its spec.
+
+        Operators, products, transforms and callable domains have to be
+        described by name; see ``spec.encode_callable``. ``encode`` is
+        called on each of them.
+        """
+        domain = self._operation_domain
+        if isinstance(domain, Domain):
+            domain = domain.to_spec()
+        else:
+            domain = encode(domain)
+        params = self.spec_params()
+        for key in self._callable_params:
+            if key in params:
+                params[key] = encode(params[key])
+        return {
+            "type": _path(type(self)),
+            "params": params,
+            "domain": domain,
+            "operators": {name: encode(op)
+                          for name, op in dict.items(self._operators)},
+            "products": {name: encode(prod)
+                         for name, prod in dict.items(self._products)}
+        }
+
+    @classmethod
+    def from_spec(cls,
+                  spec: dict,
+                  decode: typing.Callable = decode_callable
+                  ) -> "SingleDomainComparator":
+        """
+        Build a comparator from the spec ``to_spec`` returned.
+        """
+        params = dict(spec["params"])
+        for key in cls._callable_params:
+            if key in params:
+                params[key] = decode(params[key])
+        comp = cls(**params)
+        comp.load_spec(spec, decode=decode)
+        return comp
+
+    def load_spec(self,
+                  spec: dict,
+                  decode: typing.Callable = decode_callable) -> None:
+        """
+        Set the operation domain, operators and products from a spec.
+        """
+        domain = spec["domain"]
+        if isinstance(domain, list):
+            self.domain = Domain(*domain)
+        else:
+            self.domain = decode(domain)
+        for name, op in spec["operators"].items():
+            self._operators[name] = decode(op)
+        for name, prod in spec["products"].items():
+            self._products[name] = decode(prod)
+
+    def __reduce__(self):
+        return from_spec, (self.to_spec(), )
+
+    def __copy__(self):
+        comp = self.__class__.__new__(self.__class__)
+        comp.__dict__.update(self.__dict__)
+        return comp
+
+    def __deepcopy__(self, memo: dict):
+        # rebuilt like a pickled comparator, but callables are kept as they
+        # are instead of being described by name, so comparators with
+        # lambda operators can be copied
+        spec = copy.deepcopy(self.to_spec(encode=_identity), memo)
+        return self.from_spec(spec, decode=_identity)
+
 
 class TimeDomainComparator(SingleDomainComparator):
+    """
+    Compares inputs in the time domain, after lining them up with the first
+    input.
 
-    def __init__(self, name="time"):
+    Args:
+        name (str): name of the domain
+        backend (str, FFTBackend): FFT backend used to cross correlate
+            inputs when estimating delays.
+        workers (int): number of threads the FFT backend can use.
+        max_lag (int): maximum absolute delay to search for. Setting this
+            when inputs are known to be nearly aligned makes estimating
+            delays of long inputs much cheaper.
+        decimate (int): estimate delays on inputs averaged over blocks of
+            ``decimate`` samples first, then refine them at full rate.
+        method (str): how to cross correlate inputs; one of
+            ``align.methods``.
+    """
+    def __init__(self,
+                 name: str = "time",
+                 backend: typing.Union[str, FFTBackend] = "scipy",
+                 workers: int = None,
+                 max_lag: int = None,
+                 decimate: int = None,
+                 method: str = "auto"):
         super(TimeDomainComparator, self).__init__(name)
+        self._backend = get_backend(backend, workers)
+        self.max_lag = max_lag
+        self.decimate = decimate
+        self.method = method
 
-    def transform(self, *arrays: typing.Tuple[np.ndarray]) -> list:
-        transformed = [arrays[0]]
-        for i, arr in enumerate(arrays[1:]):
-            offset = self.get_time_delay(transformed[0], arr)
+    def spec_params(self) -> dict:
+        return {
+            "name": self._name,
+            "backend": self._backend.name,
+            "workers": self._backend.workers,
+            "max_lag": self.max_lag,
+            "decimate": self.decimate,
+            "method": self.method
+        }
+
+    def get_shifts(self,
+                   *arrays: typing.Tuple[np.ndarray],
+                   cache: TransformCache = None) -> list:
+        """
+        Get the circular shift that lines each array up with the first one.
+        ``transform`` folds these into the operation domain, so aligning
+        inputs doesn't copy them.
+        """
+        def _get_shifts():
+            offsets = self.get_time_delays(arrays[0], arrays[1:])
             module_logger.debug(
-                (f"TimeDomainComparator.transform: "
-                 f"offset for arr[{i}]: {offset}"))
-            transformed.append(np.roll(arr, abs(offset)))
-        return super(TimeDomainComparator, self).transform(*transformed)
+                f"TimeDomainComparator.get_shifts: offsets: {offsets}")
+            return [0] + [abs(int(offset)) for offset in offsets]
+
+        if cache is None:
+            return _get_shifts()
+        return cache.get(cache.key("align", arrays, self.max_lag,
+                                   self.decimate, self.method), _get_shifts)
+
+    def align(self,
+              *arrays: typing.Tuple[np.ndarray],
+              cache: TransformCache = None) -> list:
+        """
+        Line arrays up with the first one. Unlike ``transform``, this
+        returns whole, shifted copies of the arrays.
+        """
+        shifts = self.get_shifts(*arrays, cache=cache)
+        return [arrays[0]] + [np.roll(arr, shift)
+                              for arr, shift in zip(arrays[1:], shifts[1:])]
+
+    def stream(self, *iterables, **kwargs):
+        msg = ("TimeDomainComparator.stream: streaming isn't supported "
+               "for time domain comparisons yet")
+        module_logger.error(msg)
+        raise RuntimeError(msg)
 
     def get_time_delay(self,
                        a: np.ndarray,
@@ -157,27 +700,151 @@ class TimeDomainComparator(SingleDomainComparator):
         """
         Get the number of units of delay between a and b
         """
-        a = a / np.amax(np.abs(a))
-        b = b / np.amax(np.abs(b))
-        xcorr = scipy.signal.fftconvolve(a, np.conj(b)[::-1], mode="full")
-        mid_idx = int(xcorr.shape[0] // 2)
-        max_arg = np.argmax(xcorr)
-        offset = max_arg - mid_idx
-        return offset
-        # return a, np.roll(b, abs(offset))
+        return self.get_time_delays(a, [b])[0]
+
+    def get_time_delays(self,
+                        ref: np.ndarray,
+                        arrays: typing.Sequence[np.ndarray]) -> np.ndarray:
+        """
+        Get the number of units of delay between ref and each of arrays,
+        in a single batched pass. See ``align.get_time_delays``.
+        """
+        return get_time_delays(ref, arrays, backend=self._backend,
+                               max_lag=self.max_lag, decimate=self.decimate,
+                               method=self.method)
 
 
 class FrequencyDomainComparator(SingleDomainComparator):
+    """
+    Compares inputs in the frequency domain. The operation domain selects
+    the samples that get transformed, so it sets the size of the FFT.
 
-    def __init__(self, name: str = "frequency", fft_size: int = 1024):
+    Args:
+        name (str): name of the domain
+        fft_size (int): number of samples to transform
+        backend (str, FFTBackend): FFT library to use; one of
+            ``fft.backends``, or an ``FFTBackend`` object.
+        workers (int): number of threads the FFT backend can use, if it
+            supports multithreading. ``-1`` uses every CPU.
+        fast_len (bool): zero pad inputs to the next size the FFT backend
+            can transform quickly.
+        real (bool): whether inputs are real. Real inputs are transformed
+            with a real FFT, which only computes the ``n//2 + 1``
+            non-negative frequency bins; operators and products only see
+            that half of the spectrum, so products like sums and means
+            differ from those of the full spectrum. If None, real inputs
+            are detected on each call. Defaults to False, which transforms
+            every input with a full complex FFT.
+        align (bool): time align inputs, like TimeDomainComparator, before
+            transforming them. When part of a MultiDomainComparator, the
+            aligned inputs are shared with its time domain.
+    """
+    def __init__(self,
+                 name: str = "frequency",
+                 fft_size: int = 1024,
+                 backend: typing.Union[str, FFTBackend] = "scipy",
+                 workers: int = None,
+                 fast_len: bool = False,
+                 real: bool = False,
+                 align: bool = False):
         super(FrequencyDomainComparator, self).__init__(
             name=name,
         )
-        self._transforms = {
-            "forward": scipy.fftpack.fft,
-            "inverse": scipy.fftpack.ifft
-        }
+        self._fast_len = fast_len
+        self._real = real
+        self._aligner = TimeDomainComparator() if align else None
+        self.backend = get_backend(backend, workers)
         self.domain = slice(0, fft_size)
 
+    def spec_params(self) -> dict:
+        return {
+            "name": self._name,
+            "backend": self._backend.name,
+            "workers": self._backend.workers,
+            "fast_len": self._fast_len,
+            "real": self._real,
+            "align": self._aligner is not None
+        }
+
+    def transform(self,
+                  *arrays: typing.Tuple[np.ndarray],
+                  cache: TransformCache = None) -> np.ndarray:
+        """
+        Transform every input with a single batched FFT.
+
+        Returns:
+            np.ndarray: 2-D array with the spectrum of each input as a row.
+        """
+        module_logger.debug(
+            f"FrequencyDomainComparator.transform: backend={self._backend}")
+        shifts = self.get_shifts(*arrays, cache=cache)
+
+        def _transform():
+            return self._fft(np.stack(self.slice_domain(
+                *arrays, shifts=shifts)))
+
+        domain_key = self.domain_key(*arrays)
+        if cache is None or domain_key is None:
+            return _transform()
+        key = cache.key("fft", arrays, domain_key, self._backend.name,
+                        self._fast_len, self._real, _shifts_key(shifts))
+        return cache.get(key, _transform)
+
+    def get_shifts(self,
+                   *arrays: typing.Tuple[np.ndarray],
+                   cache: TransformCache = None) -> typing.Optional[list]:
+        if self._aligner is None:
+            return None
+        return self._aligner.get_shifts(*arrays, cache=cache)
+
+    def transform_chunk(self,
+                        *chunks: typing.Tuple[np.ndarray]) -> np.ndarray:
+        min_size = min([c.shape[0] for c in chunks])
+        return self._fft(np.stack([c[:min_size] for c in chunks]))
+
+    def _fft(self, stack: np.ndarray) -> np.ndarray:
+        n = None
+        if self._fast_len:
+            n = self._backend.next_fast_len(stack.shape[-1])
+        if self.is_real(stack):
+            return self._backend.rfft(stack, n=n, axis=-1)
+        return self._backend.fft(stack, n=n, axis=-1)
+
+    def is_real(self, stack: np.ndarray) -> bool:
+        """
+        Determine whether inputs should be transformed with a real FFT.
+        """
+        if self._real is None:
+            return not np.iscomplexobj(stack)
+        if self._real and np.iscomplexobj(stack):
+            msg = ("FrequencyDomainComparator.is_real: real is set, "
+                   "but inputs are complex")
+            module_logger.error(msg)
+            raise RuntimeError(msg)
+        return self._real
+
     def set_fft_size(self, fft_size: int):
         self.domain = slice(0, fft_size)
+
+    @property
+    def backend(self) -> FFTBackend:
+        return self._backend
+
+    @property
+    def real(self) -> bool:
+        return self._real
+
+    @real.setter
+    def real(self, real: bool):
+        self._real = real
+
+    @backend.setter
+    def backend(self, backend: typing.Union[str, FFTBackend]):
+        workers = None
+        if hasattr(self, "_backend"):
+            workers = self._backend.workers
+        self._backend = get_backend(backend, workers)
+        self._transforms = {
+            "forward": self._backend.fft,
+            "inverse": self._backend.ifft
+        }
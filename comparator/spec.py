@@ -0,0 +1,179 @@
+import logging
+import typing
+import functools
+import importlib
+
+import numpy as np
+
+from .operators import Operator, Product
+from .reducers import Reducer
+
+__all__ = [
+    "functions",
+    "register",
+    "encode_callable",
+    "decode_callable",
+    "from_spec"
+]
+
+module_logger = logging.getLogger(__name__)
+
+# operators, products and transforms that can be referred to by name in a
+# spec
+functions = {
+    "subtract": np.subtract,
+    "add": np.add,
+    "multiply": np.multiply,
+    "divide": np.divide,
+    "abs": np.abs,
+    "angle": np.angle,
+    "conj": np.conj,
+    "real": np.real,
+    "imag": np.imag,
+    "mean": np.mean,
+    "sum": np.sum,
+    "var": np.var,
+    "std": np.std,
+    "max": np.amax,
+    "min": np.amin,
+    "fft": np.fft.fft,
+    "ifft": np.fft.ifft
+}
+
+
+def register(name: str, func: typing.Callable) -> None:
+    """
+    Register a function, so that specs can refer to it by name. Workers
+    rebuilding a comparator from a spec have to register it too.
+    """
+    functions[name] = func
+
+
+def _import(path: str) -> typing.Any:
+    module_name, qualname = path.split(":")
+    obj = importlib.import_module(module_name)
+    for attr in qualname.split("."):
+        obj = getattr(obj, attr)
+    return obj
+
+
+def _path(obj: typing.Any) -> typing.Optional[str]:
+    """
+    Get the ``module:qualname`` path of ``obj``, or None if ``obj`` can't be
+    imported from it.
+    """
+    module_name = getattr(obj, "__module__", None)
+    qualname = getattr(obj, "__qualname__", None)
+    if module_name is None or qualname is None or "<" in qualname:
+        return None
+    path = f"{module_name}:{qualname}"
+    try:
+        if _import(path) is obj:
+            return path
+    except (ImportError, AttributeError, ValueError):
+        pass
+    return None
+
+
+def encode_callable(func: typing.Callable) -> typing.Any:
+    """
+    Describe an operator, product or transform in a JSON serializable way.
+
+    Registered functions are referred to by name, module level functions
+    and classes by their ``module:qualname`` path, and ``Operator``,
+    ``Product``, ``Reducer`` and ``functools.partial`` objects by what they
+    wrap. Lambdas and nested functions can't be described; use a module
+    level function or a partial instead, or ``register`` them:
+
+    .. code-block:: python
+
+        >>> comp.products["mean"] = Product(
+                functools.partial(np.mean, axis=-1), broadcast=True)
+    """
+    if func is None:
+        return None
+    for name, registered in functions.items():
+        if registered is func:
+            return name
+    if isinstance(func, Product):
+        return {
+            "product": encode_callable(func.func),
+            "broadcast": func.broadcast
+        }
+    if isinstance(func, functools.partial):
+        return {
+            "partial": encode_callable(func.func),
+            "args": list(func.args),
+            "keywords": dict(func.keywords)
+        }
+    if isinstance(func, Operator):
+        return {
+            "operator": encode_callable(func.func),
+            "broadcast": func.broadcast,
+            "symmetry": encode_callable(func.symmetry)
+            if callable(func.symmetry) else func.symmetry,
+            "diagonal": func.diagonal
+        }
+    if isinstance(func, Reducer):
+        return {
+            "reducer": _path(type(func)),
+            "params": dict(vars(func))
+        }
+    path = _path(func)
+    if path is None:
+        msg = (f"encode_callable: can't describe {func!r}; use a module "
+               "level function, or register it with spec.register")
+        module_logger.error(msg)
+        raise RuntimeError(msg)
+    return path
+
+
+def decode_callable(spec: typing.Any) -> typing.Callable:
+    """
+    The inverse of ``encode_callable``.
+    """
+    if spec is None:
+        return None
+    if isinstance(spec, dict):
+        if "operator" in spec:
+            symmetry = spec["symmetry"]
+            if symmetry is not None and symmetry not in \
+                    ("symmetric", "antisymmetric", "conjugate"):
+                symmetry = decode_callable(symmetry)
+            return Operator(decode_callable(spec["operator"]),
+                            broadcast=spec["broadcast"],
+                            symmetry=symmetry,
+                            diagonal=spec["diagonal"])
+        if "product" in spec:
+            return Product(decode_callable(spec["product"]),
+                           broadcast=spec["broadcast"])
+        if "partial" in spec:
+            return functools.partial(decode_callable(spec["partial"]),
+                                     *spec["args"], **spec["keywords"])
+        if "reducer" in spec:
+            return _import(spec["reducer"])(**spec["params"])
+    if spec in functions:
+        return functions[spec]
+    try:
+        return _import(spec)
+    except (ImportError, AttributeError, ValueError) as err:
+        msg = f"decode_callable: can't find {spec}: {err}"
+        module_logger.error(msg)
+        raise RuntimeError(msg)
+
+
+def from_spec(spec: dict,
+              decode: typing.Callable = decode_callable) -> typing.Any:
+    """
+    Build a comparator from the spec ``to_spec`` returned.
+
+    Examples:
+
+    .. code-block:: python
+
+        >>> spec = comp.to_spec()
+        >>> with open("comp.json", "w") as f:
+                json.dump(spec, f)
+        >>> comp = from_spec(spec)
+    """
+    return _import(spec["type"]).from_spec(spec, decode=decode)
@@ -0,0 +1,87 @@
+import os
+import shutil
+import logging
+import typing
+import tempfile
+import threading
+import weakref
+
+import numpy as np
+
+__all__ = [
+    "SpillStore"
+]
+
+module_logger = logging.getLogger(__name__)
+
+
+class SpillStore:
+    """
+    Keeps operator results in memory up to a budget, and spills the rest to
+    ``.npy`` files in a scratch directory. Spilled results are returned as
+    read only memory mapped arrays, so they can be indexed like any other
+    array, and only get read from disk when they're used.
+
+    Args:
+        budget (int): number of bytes of results to keep in memory
+        directory (str): directory to spill results to. Each store writes
+            to a new subdirectory of it, so stores sharing a directory
+            don't overwrite each other's results. If None, a temporary
+            directory is created, and removed along with the store.
+    """
+    def __init__(self, budget: int, directory: str = None):
+        self._budget = budget
+        self._in_memory = 0
+        self._spilled = 0
+        self._count = 0
+        self._lock = threading.Lock()
+        if directory is None:
+            directory = tempfile.mkdtemp(prefix="comparator-")
+            # memory maps of spilled results stay valid after their files
+            # are removed
+            self._finalizer = weakref.finalize(
+                self, shutil.rmtree, directory, ignore_errors=True)
+        else:
+            os.makedirs(directory, exist_ok=True)
+            directory = tempfile.mkdtemp(prefix="spill-", dir=directory)
+            self._finalizer = None
+        self._directory = directory
+
+    def add(self, a: typing.Any) -> typing.Any:
+        """
+        Store an operator result. Arrays that fit in the budget are returned
+        as is; the others get written to disk, and memory mapped.
+        """
+        if not isinstance(a, np.ndarray) or isinstance(a, np.memmap):
+            return a
+        with self._lock:
+            if self._in_memory + a.nbytes <= self._budget:
+                self._in_memory += a.nbytes
+                return a
+            file_path = os.path.join(
+                self._directory, f"{self._count:08d}.npy")
+            self._count += 1
+            self._spilled += a.nbytes
+        module_logger.debug(
+            f"SpillStore.add: spilling {a.nbytes} bytes to {file_path}")
+        np.save(file_path, a)
+        return np.load(file_path, mmap_mode="r")
+
+    def close(self) -> None:
+        """
+        Remove the scratch directory, if the store created it.
+        """
+        if self._finalizer is not None:
+            self._finalizer()
+
+    @property
+    def directory(self) -> str:
+        return self._directory
+
+    @property
+    def in_memory(self) -> int:
+        return self._in_memory
+
+    @property
+    def spilled(self) -> int:
+        return self._spilled
@@ -1,47 +1,118 @@
 
+import inspect
+
 __all__ = [
     "TrackableDict",
-    "TrackableList"
+    "TrackableList",
+    "deleted"
 ]
 
 
+class _Deleted:
+
+    def __repr__(self):
+        return "deleted"
+
+
+# passed to callbacks as the value of an item that was deleted
+deleted = _Deleted()
+
+
+def _accepts(callback, *args) -> bool:
+    """
+    Whether ``callback`` can be called with ``args``. Listeners don't have
+    to take both the arguments passed on get and on set.
+    """
+    try:
+        signature = inspect.signature(callback)
+    except (TypeError, ValueError):  # can't inspect some builtins
+        return True
+    try:
+        signature.bind(*args)
+    except TypeError:
+        return False
+    return True
+
+
 def trackable(super_cls):
     def _trackable(cls):
-        class Trackable(super_cls):
+        class Trackable(cls, super_cls):
 
             def __init__(self, *args, **kwargs):
 
                 super(Trackable, self).__init__(*args, **kwargs)
                 self._listeners = []
 
-            def __getitem__(self, item):
-
+            def _notify(self, *args):
                 for callback in self._listeners:
-                    try:
-                        callback(item)
-                    except TypeError:
-                        pass
+                    if _accepts(callback, *args):
+                        callback(*args)
 
+            def __getitem__(self, item):
+                self._notify(item)
                 return super(Trackable, self).__getitem__(item)
 
             def __setitem__(self, item, val):
-                for callback in self._listeners:
-                    try:
-                        callback(item, val)
-                    except TypeError:
-                        pass
-
+                self._notify(item, val)
                 return super(Trackable, self).__setitem__(item, val)
 
+            def __delitem__(self, item):
+                self._notify(item, deleted)
+                return super(Trackable, self).__delitem__(item)
+
             def on(self, callback):
                 self._listeners.append(callback)
+
+            def __reduce__(self):
+                # listeners are usually bound to the object that created
+                # the Trackable, so they don't get pickled
+                return self.__class__, (super_cls(self), )
+
+        # lets pickle find the class under the name it gets decorated with
+        Trackable.__name__ = cls.__name__
+        Trackable.__qualname__ = cls.__qualname__
+        Trackable.__module__ = cls.__module__
         return Trackable
     return _trackable
 
 
 @trackable(dict)
 class TrackableDict:
-    pass
+    """
+    Listeners get notified of changes made through any of the methods that
+    change a dict, as a set or delete of each key that changes.
+    """
+    def update(self, *args, **kwargs):
+        for key, val in dict(*args, **kwargs).items():
+            self[key] = val
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def pop(self, key, *default):
+        if key not in self:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        val = dict.__getitem__(self, key)
+        del self[key]
+        return val
+
+    def popitem(self):
+        if not self:
+            raise KeyError("popitem(): dictionary is empty")
+        key = list(self)[-1]
+        return key, self.pop(key)
+
+    def clear(self):
+        for key in list(self):
+            del self[key]
 
 
 @trackable(list)
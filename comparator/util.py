@@ -1,13 +1,19 @@
 import json
+import base64
 import typing
 import logging
 
 import numpy as np
-import matplotlib.pyplot as plt
+
+from .operator_result import ComparatorOperatorResult, LazyResult
+from .product_result import ComparatorProductResult
 
 __all__ = [
     "plot_operator_result",
-    "NumpyEncoder"
+    "NumpyEncoder",
+    "StreamingEncoder",
+    "dump_results",
+    "decode_array"
 ]
 
 module_logger = logging.getLogger(__name__)
@@ -33,6 +39,12 @@ def _ensure_ndarray(l):
         return l
 
 
+def _rep_or_none(rep: typing.Callable, a: typing.Any) -> typing.Any:
+    if a is None:
+        return None
+    return rep(a)
+
+
 def plot_operator_result(
     comparator_result: typing.Any,
     complex_rep: _complex_rep_type = "cartesian",
@@ -63,6 +75,9 @@ def plot_operator_result(
     Returns:
         tuple: list of figures and list of axes
     """
+    # matplotlib takes a while to import, so only import it when plotting
+    import matplotlib.pyplot as plt
+
     fig_objs, axes_objs = {}, {}
 
     if hasattr(complex_rep, "format"):
@@ -79,17 +94,20 @@ def plot_operator_result(
     def get_subplot_dims(arr: list, res: list = None) -> list:
         if res is None:
             res = []
-        if isinstance(arr[0], np.ndarray):
+        # results of operators that skip the diagonal contain None
+        first = next(a for a in arr if a is not None)
+        # results can be a single array, rather than nested lists
+        if isinstance(first, np.ndarray) and first.ndim <= 1:
             res.append(len(arr))
             z_dim = 1
-            if np.iscomplexobj(arr[0]):
+            if np.iscomplexobj(first):
                 z_dim = 2
             res.append(z_dim)
 
             return res
         else:
             res.append(len(arr))
-            return get_subplot_dims(arr[0], res)
+            return get_subplot_dims(first, res)
 
     def create_subplots(subplot_dims: list) -> tuple:
         if len(subplot_dims) == 2:
@@ -154,7 +172,7 @@ def plot_operator_result(
         if len(subplot_dims) == 2:
             rows, n_z = subplot_dims
             for i in range(rows):
-                sub_res_op = rep(res_op[i])
+                sub_res_op = _rep_or_none(rep, res_op[i])
                 for z in range(n_z):
                     ax = axes[z*rows + i]
                     if res_op.labels is not None:
@@ -177,12 +195,12 @@ def plot_operator_result(
                         row_idx, col_idx = (z*rows) + j, i
                         ax = axes[row_idx][col_idx]
                         if corner_plot:
-                            sub_res_op = rep(res_op[i][j+1])
+                            sub_res_op = _rep_or_none(rep, res_op[i][j+1])
                             if i > j:
                                 ax.set_axis_off()
                                 continue
                         else:
-                            sub_res_op = rep(res_op[i][j])
+                            sub_res_op = _rep_or_none(rep, res_op[i][j])
                         if res_op.labels is not None and i == 0:
                             ax.set_ylabel(res_op.labels[j])
                         if not (j == rows - 1 and z == n_z-1):
@@ -209,17 +227,262 @@ def plot_operator_result(
 
 class NumpyEncoder(json.JSONEncoder):
 
-    int_types = (np.int64, np.int32, np.int16, np.int8)
-    float_types = (np.float64, np.float32, np.float16)
+    int_types = (np.integer, )
+    float_types = (np.floating, )
+    complex_types = (complex, np.complexfloating)
 
     def default(self, obj):
-        if any([isinstance(obj, i) for i in self.int_types]):
+        if isinstance(obj, self.int_types):
             return int(obj)
 
-        if any([isinstance(obj, f) for f in self.float_types]):
+        if isinstance(obj, self.float_types):
             return float(obj)
 
+        if isinstance(obj, self.complex_types):
+            return [float(obj.real), float(obj.imag)]
+
+        if isinstance(obj, np.bool_):
+            return bool(obj)
+
         if isinstance(obj, np.ndarray):
+            if np.iscomplexobj(obj):
+                return np.stack((obj.real, obj.imag), axis=-1).tolist()
             return obj.tolist()
 
         return super(NumpyEncoder, self).default(obj)
+
+
+def _float_str(val: float) -> str:
+    if val != val:
+        return "NaN"
+    if val == float("inf"):
+        return "Infinity"
+    if val == -float("inf"):
+        return "-Infinity"
+    return float.__repr__(val)
+
+
+def _complex_str(val: complex) -> str:
+    return f"[{_float_str(val.real)}, {_float_str(val.imag)}]"
+
+
+def _bool_str(val: bool) -> str:
+    return "true" if val else "false"
+
+
+# how to format the elements of arrays, by dtype kind
+_element_formatters = {
+    "f": _float_str,
+    "i": str,
+    "u": str,
+    "b": _bool_str,
+    "c": _complex_str,
+    "U": json.dumps,
+    "S": lambda val: json.dumps(val.decode()),
+}
+
+
+class StreamingEncoder:
+    """
+    Encode comparator results as JSON, writing the output to a file like
+    object in chunks, instead of building it as a single string.
+
+    Arrays get formatted a block of elements at a time, so memory use is
+    bounded by ``block_size`` and ``chunk_size``, not by the size of the
+    results. The encoder for each type is looked up in ``dispatch``, by the
+    first class in the type's method resolution order that is in it.
+    Complex values are ``[real, imag]`` pairs. If ``base64_arrays`` is True,
+    arrays are written as ``{"dtype": ..., "shape": ..., "data": ...}``
+    objects, with their raw buffer base64 encoded in ``data``; see
+    ``decode_array``.
+
+    Examples:
+
+    .. code-block:: python
+
+        >>> with open("results.json", "w") as f:
+                StreamingEncoder().dump({"products": res_prod}, f)
+
+    Args:
+        base64_arrays (bool): base64 encode the buffers of arrays
+        chunk_size (int): number of characters to collect before writing
+        block_size (int): number of array elements to format at once
+    """
+    def __init__(self,
+                 base64_arrays: bool = False,
+                 chunk_size: int = 2**16,
+                 block_size: int = 2**12):
+        self._base64_arrays = base64_arrays
+        self._chunk_size = chunk_size
+        self._block_size = block_size
+        self.dispatch = {
+            type(None): lambda obj: iter(("null", )),
+            bool: lambda obj: iter((_bool_str(obj), )),
+            int: lambda obj: iter((int.__repr__(obj), )),
+            float: lambda obj: iter((_float_str(obj), )),
+            complex: lambda obj: iter((_complex_str(obj), )),
+            str: lambda obj: iter((json.dumps(obj), )),
+            np.bool_: lambda obj: iter((_bool_str(obj), )),
+            np.integer: lambda obj: iter((str(int(obj)), )),
+            np.floating: lambda obj: iter((_float_str(float(obj)), )),
+            np.complexfloating: lambda obj: iter(
+                (_complex_str(complex(obj)), )),
+            dict: self._encode_dict,
+            list: self._encode_list,
+            tuple: self._encode_list,
+            LazyResult: self._encode_list,
+            np.ndarray: self._encode_array,
+            ComparatorOperatorResult: self._encode_operator_result,
+            ComparatorProductResult: self._encode_product_result
+        }
+
+    def iterencode(self, obj: typing.Any) -> typing.Iterator[str]:
+        """
+        Yield the JSON encoding of ``obj`` in pieces.
+        """
+        cls = type(obj)
+        encoder = self.dispatch.get(cls)
+        if encoder is None:
+            for base in cls.__mro__:
+                if base in self.dispatch:
+                    encoder = self.dispatch[cls] = self.dispatch[base]
+                    break
+            else:
+                msg = (f"StreamingEncoder.iterencode: can't encode objects "
+                       f"of type {cls.__name__}")
+                module_logger.error(msg)
+                raise RuntimeError(msg)
+        return encoder(obj)
+
+    def dump(self, obj: typing.Any, fp: typing.Any) -> None:
+        """
+        Write the JSON encoding of ``obj`` to ``fp``, ``chunk_size``
+        characters at a time.
+        """
+        chunk = []
+        size = 0
+        for piece in self.iterencode(obj):
+            chunk.append(piece)
+            size += len(piece)
+            if size >= self._chunk_size:
+                fp.write("".join(chunk))
+                chunk.clear()
+                size = 0
+        fp.write("".join(chunk))
+
+    def _encode_dict(self, obj: dict) -> typing.Iterator[str]:
+        yield "{"
+        for i, (key, val) in enumerate(obj.items()):
+            if i > 0:
+                yield ", "
+            yield json.dumps(str(key))
+            yield ": "
+            yield from self.iterencode(val)
+        yield "}"
+
+    def _encode_list(self, obj: typing.Iterable) -> typing.Iterator[str]:
+        yield "["
+        for i, val in enumerate(obj):
+            if i > 0:
+                yield ", "
+            yield from self.iterencode(val)
+        yield "]"
+
+    def _encode_array(self, arr: np.ndarray) -> typing.Iterator[str]:
+        if arr.dtype.names is not None:
+            yield from self._encode_dict(
+                {name: arr[name] for name in arr.dtype.names})
+        elif self._base64_arrays and not arr.dtype.hasobject:
+            yield from self._encode_base64(arr)
+        elif arr.ndim == 0:
+            yield from self.iterencode(arr[()])
+        elif arr.ndim > 1:
+            yield from self._encode_list(arr)
+        else:
+            formatter = _element_formatters.get(arr.dtype.kind)
+            if formatter is None:
+                yield from self._encode_list(arr)
+                return
+            yield "["
+            for i in range(0, arr.shape[0], self._block_size):
+                if i > 0:
+                    yield ", "
+                yield ", ".join(
+                    map(formatter, arr[i:i + self._block_size].tolist()))
+            yield "]"
+
+    def _encode_base64(self, arr: np.ndarray) -> typing.Iterator[str]:
+        yield (f'{{"dtype": {json.dumps(arr.dtype.str)}, '
+               f'"shape": {json.dumps(list(arr.shape))}, "data": "')
+        flat = arr.reshape(-1) if arr.flags.c_contiguous else arr.flat
+        step = self._block_size
+        # base64 encodes groups of 3 bytes, so carry the bytes that are
+        # left over to the next block
+        carry = b""
+        for i in range(0, arr.size, step):
+            data = carry + np.ascontiguousarray(flat[i:i + step]).tobytes()
+            end = len(data) - len(data) % 3
+            yield base64.b64encode(data[:end]).decode("ascii")
+            carry = data[end:]
+        yield base64.b64encode(carry).decode("ascii")
+        yield '"}'
+
+    def _encode_operator_result(
+        self, res: ComparatorOperatorResult
+    ) -> typing.Iterator[str]:
+        yield from self._encode_dict({
+            "name": res.name,
+            "labels": res.labels,
+            "result": res.result
+        })
+
+    def _encode_product_result(
+        self, res: ComparatorProductResult
+    ) -> typing.Iterator[str]:
+        yield from self._encode_dict({
+            "labels": res._labels,
+            "products": {name: val for name, val in res}
+        })
+
+
+def dump_results(fp: typing.Any,
+                 res_op: dict = None,
+                 res_prod: dict = None,
+                 products_only: bool = False,
+                 **kwargs) -> None:
+    """
+    Write comparator results to ``fp`` as JSON, with a StreamingEncoder.
+    The output is an object with ``"operators"`` and ``"products"`` keys,
+    mapping operator names to the encoded results.
+
+    Examples:
+
+    .. code-block:: python
+
+        >>> res_op, res_prod = comp(*arrays, labels=labels)
+        >>> with open("results.json", "w") as f:
+                dump_results(f, res_op, res_prod, products_only=True)
+
+    Args:
+        fp: file like object to write to
+        res_op (dict): ComparatorOperatorResult objects, keyed by operator
+            name
+        res_prod (dict): ComparatorProductResult objects, keyed by operator
+            name
+        products_only (bool): leave out operator results
+        kwargs (dict): passed to StreamingEncoder
+    """
+    obj = {}
+    if res_op is not None and not products_only:
+        obj["operators"] = res_op
+    if res_prod is not None:
+        obj["products"] = res_prod
+    StreamingEncoder(**kwargs).dump(obj, fp)
+
+
+def decode_array(obj: dict) -> np.ndarray:
+    """
+    Decode an array written by a StreamingEncoder with ``base64_arrays``.
+    """
+    return np.frombuffer(base64.b64decode(obj["data"]),
+                         dtype=np.dtype(obj["dtype"])).reshape(obj["shape"])
@@ -0,0 +1,106 @@
+import time
+import asyncio
+import unittest
+import threading
+import concurrent.futures
+
+import numpy as np
+
+from comparator import SingleDomainComparator, TimeFreqDomainComparator
+from comparator.aio import azip, check_cancel
+
+
+def run(coro):
+    # asyncio.run needs Python 3.7
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+class TestAio(unittest.TestCase):
+
+    def setUp(self):
+        self.comp = SingleDomainComparator("aio")
+        self.comp.operators["diff"] = lambda a, b: a - b
+        self.comp.products["mean"] = np.mean
+        self.arrays = [np.random.rand(10) for i in range(3)]
+
+    def test_acall(self):
+        res_op, res_prod = run(self.comp.acall(*self.arrays))
+        _, expected = self.comp(*self.arrays)
+        self.assertTrue(np.allclose(
+            res_prod["diff"]["mean"], expected["diff"]["mean"]))
+
+        comp = TimeFreqDomainComparator()
+        comp.operators["diff"] = lambda a, b: a - b
+        ret = run(comp.acall(*self.arrays, n_workers=2))
+        self.assertTrue(len(ret) == 2)
+
+    def test_acall_cancel(self):
+        calls = []
+
+        def slow(a, b):
+            calls.append(None)
+            time.sleep(0.02)
+            return a - b
+
+        self.comp.operators["diff"] = slow
+        arrays = [np.random.rand(10) for i in range(10)]
+
+        async def main():
+            task = asyncio.ensure_future(self.comp.acall(*arrays))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            # let the worker thread notice
+            await asyncio.sleep(0.1)
+
+        run(main())
+        self.assertTrue(len(calls) < 100)
+
+    def test_cancel_executor(self):
+        cancel = threading.Event()
+        cancel.set()
+        with self.assertRaises(concurrent.futures.CancelledError):
+            self.comp(*self.arrays, n_workers=2, cancel=cancel)
+        with self.assertRaises(concurrent.futures.CancelledError):
+            check_cancel(cancel)
+        check_cancel(None)
+
+    def test_astream(self):
+        blocks = [[np.random.rand(10) for i in range(5)] for j in range(2)]
+        pulled = []
+
+        async def source(i):
+            for k, block in enumerate(blocks[i]):
+                pulled.append(k)
+                yield block
+
+        async def main():
+            ret = []
+            async for res_op, res_prod in self.comp.astream(
+                    source(0), source(1), max_pending=2):
+                # with at most two comparisons running, at most two blocks
+                # of each input get taken ahead of the ones consumed here
+                self.assertTrue(len(pulled) <= 2*(len(ret) + 2))
+                ret.append(res_prod["diff"][0, 1]["mean"])
+            return ret
+
+        ret = run(main())
+        expected = [np.mean(a - b) for a, b in zip(*blocks)]
+        self.assertTrue(np.allclose(ret, expected))
+
+    def test_azip(self):
+
+        async def main():
+            return [item async for item in azip([0, 1, 2], range(2))]
+
+        self.assertTrue(run(main()) == [(0, 0), (1, 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
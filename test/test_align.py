@@ -0,0 +1,88 @@
+import unittest
+
+import numpy as np
+import scipy.signal
+
+from comparator.align import get_time_delays
+
+
+def get_time_delay(a, b):
+    """
+    Reference implementation: the full cross correlation of a and b.
+    """
+    xcorr = scipy.signal.fftconvolve(a, np.conj(b)[::-1], mode="full")
+    return np.argmax(xcorr) - xcorr.shape[0] // 2
+
+
+class TestGetTimeDelays(unittest.TestCase):
+
+    def setUp(self):
+        x = np.arange(0, 200)
+        self.ref = np.sin(0.3*x) * np.exp(-((x - 100)/30)**2)
+        self.offsets = [0, 2, -5, 17]
+        self.arrays = [np.roll(self.ref, -offset) for offset in self.offsets]
+
+    def test_get_time_delays(self):
+        delays = get_time_delays(self.ref, self.arrays)
+        self.assertTrue(list(delays) == self.offsets)
+        delays = get_time_delays(self.ref, self.arrays, backend="numpy")
+        self.assertTrue(list(delays) == self.offsets)
+
+    def test_matches_full_cross_correlation(self):
+        rng = np.random.RandomState(0)
+        for cplx in [False, True]:
+            ref = rng.randn(50) + 1j*cplx*rng.randn(50)
+            arrays = [rng.randn(size) + 1j*cplx*rng.randn(size)
+                      for size in [50, 31, 64]]
+            delays = get_time_delays(ref, arrays)
+            expected = [get_time_delay(ref, arr) for arr in arrays]
+            self.assertTrue(list(delays) == expected)
+
+    def test_max_lag(self):
+        for method in ["auto", "direct", "fft"]:
+            delays = get_time_delays(
+                self.ref, self.arrays, max_lag=20, method=method)
+            self.assertTrue(list(delays) == self.offsets)
+        # with the true delay out of the window, the best delay in the
+        # window is found
+        delays = get_time_delays(self.ref, self.arrays[-1:], max_lag=10,
+                                 method="direct")
+        self.assertTrue(abs(delays[0]) <= 10)
+        delays_fft = get_time_delays(self.ref, self.arrays[-1:], max_lag=10,
+                                     method="fft")
+        self.assertTrue(delays[0] == delays_fft[0])
+
+    def test_max_lag_unequal_sizes(self):
+        rng = np.random.RandomState(1)
+        ref = rng.randn(80)
+        arrays = [rng.randn(size) for size in [80, 51, 97]]
+        for arr in arrays:
+            expected = get_time_delay(ref, arr)
+            max_lag = abs(expected) + 3
+            for method in ["direct", "fft"]:
+                delays = get_time_delays(
+                    ref, [arr], max_lag=max_lag, method=method)
+                self.assertTrue(delays[0] == expected)
+
+    def test_decimate(self):
+        rng = np.random.RandomState(2)
+        size = 2**14
+        x = np.convolve(rng.randn(size + 1000), np.ones(8)/8, mode="same")
+        ref = x[500:500 + size]
+        offsets = [-123, 0, 250]
+        arrays = [x[500 + offset:500 + offset + size] for offset in offsets]
+        delays = get_time_delays(ref, arrays, decimate=8)
+        self.assertTrue(list(delays) == offsets)
+        delays = get_time_delays(ref, arrays, decimate=8, max_lag=300)
+        self.assertTrue(list(delays) == offsets)
+
+    def test_unknown_method(self):
+        with self.assertRaises(RuntimeError):
+            get_time_delays(self.ref, self.arrays, method="bogus")
+
+    def test_empty(self):
+        self.assertTrue(get_time_delays(self.ref, []).shape == (0, ))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import time
+import unittest
+import concurrent.futures
+
+import numpy as np
+
+from comparator.cache import TransformCache
+from comparator.single_domain import FrequencyDomainComparator
+
+
+class TestTransformCache(unittest.TestCase):
+
+    def test_get(self):
+        cache = TransformCache()
+        a, b = np.arange(4), np.arange(4)
+        calls = []
+
+        def func():
+            calls.append(None)
+            return a + b
+
+        key = cache.key("sum", [a, b], 0, 4)
+        self.assertFalse(key in cache)
+        val = cache.get(key, func)
+        self.assertTrue(key in cache)
+        self.assertTrue(cache.get(key, func) is val)
+        self.assertTrue(len(calls) == 1)
+        self.assertTrue(cache.hits == 1)
+
+        cache.get(cache.key("sum", [b, a], 0, 4), func)
+        self.assertTrue(len(calls) == 2)
+        self.assertTrue(len(cache) == 2)
+
+    def test_get_threads(self):
+        cache = TransformCache()
+        a = np.arange(4)
+        calls = []
+
+        def func():
+            calls.append(None)
+            time.sleep(0.05)
+            return a * 2
+
+        key = cache.key("double", [a])
+        with concurrent.futures.ThreadPoolExecutor(4) as executor:
+            futures = [executor.submit(cache.get, key, func)
+                       for i in range(4)]
+            vals = [future.result() for future in futures]
+        self.assertTrue(len(calls) == 1)
+        self.assertTrue(all([val is vals[0] for val in vals]))
+        self.assertTrue(cache.hits == 3)
+
+    def test_get_freed_inputs(self):
+        cache = TransformCache()
+        comp = FrequencyDomainComparator(fft_size=8)
+        comp.operators["this"] = lambda a: a
+        for k in range(200):
+            arr = np.full(8, float(k))
+            res_op, res_prod = comp(arr, cache=cache)
+            self.assertTrue(np.abs(res_op["this"][0]).max() == 8 * k)
+            del arr, res_op, res_prod
+        self.assertTrue(cache.hits == 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,20 @@
+import os
+import sys
 import unittest
+import subprocess
+
+test_dir = os.path.dirname(os.path.abspath(__file__))
+# seconds importing comparator may take, not counting numpy
+import_budget = float(os.environ.get("COMPARATOR_IMPORT_BUDGET", 0.5))
+
+
+def _import_in_subprocess(code: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [os.path.dirname(test_dir), env.get("PYTHONPATH", "")])
+    return subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          universal_newlines=True, env=env, check=True)
 
 
 class TestComparatorImport(unittest.TestCase):
@@ -14,6 +30,39 @@ class TestComparatorImport(unittest.TestCase):
             NumpyEncoder
         )
 
+    def test_lazy_imports(self):
+        proc = _import_in_subprocess(
+            "import sys, comparator; "
+            "print(sorted(m for m in sys.modules if "
+            "m.split('.')[0] in ('matplotlib', 'scipy')))")
+        self.assertTrue(proc.stdout.strip() == "[]")
+
+        # asyncio only gets imported by the async interface
+        proc = _import_in_subprocess(
+            "import sys, comparator; print('asyncio' in sys.modules)")
+        self.assertTrue(proc.stdout.strip() == "False")
+
+        # matplotlib only gets imported when plotting
+        proc = _import_in_subprocess(
+            "import sys, comparator; comparator.plot_operator_result; "
+            "print('comparator.util' in sys.modules, "
+            "'matplotlib' in sys.modules)")
+        self.assertTrue(proc.stdout.strip() == "True False")
+
+    @unittest.skipIf(sys.version_info < (3, 7), "-X importtime needs 3.7")
+    def test_import_time(self):
+        proc = _import_in_subprocess("import comparator")
+        cumulative = {}
+        for line in proc.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            fields = line.split("|")
+            if len(fields) == 3 and fields[1].strip().isdigit():
+                cumulative[fields[2].strip()] = int(fields[1])
+        import_time = (cumulative["comparator"] -
+                       cumulative.get("numpy", 0)) * 1e-6
+        self.assertTrue(import_time < import_budget,
+                        f"importing comparator took {import_time:.3f} s")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import concurrent.futures
+
+import numpy as np
+
+from comparator.fft import (
+    _FFTPack,
+    NumpyFFTBackend,
+    ScipyFFTBackend,
+    PyFFTWBackend,
+    get_backend
+)
+
+
+class TestFFTBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.a = np.random.rand(3, 100) + 1j*np.random.rand(3, 100)
+
+    def _test_backend(self, backend):
+        self.assertTrue(np.allclose(
+            backend.fft(self.a, axis=-1), np.fft.fft(self.a, axis=-1)))
+        self.assertTrue(np.allclose(
+            backend.ifft(backend.fft(self.a)), self.a))
+        self.assertTrue(np.allclose(
+            backend.fft(self.a, n=128), np.fft.fft(self.a, n=128)))
+        self.assertTrue(np.allclose(
+            backend.rfft(self.a.real), np.fft.rfft(self.a.real)))
+        self.assertTrue(np.allclose(
+            backend.irfft(backend.rfft(self.a.real), n=100), self.a.real))
+
+        # backends get shared by the threads comparisons run on
+        arrays = [np.random.rand(4, 1024) + 1j*np.random.rand(4, 1024)
+                  for i in range(32)]
+        with concurrent.futures.ThreadPoolExecutor(8) as executor:
+            spectra = list(executor.map(backend.fft, arrays))
+        self.assertTrue(all([np.allclose(spectrum, np.fft.fft(arr))
+                             for spectrum, arr in zip(spectra, arrays)]))
+
+    def test_numpy(self):
+        self._test_backend(NumpyFFTBackend())
+
+    def test_scipy(self):
+        self._test_backend(ScipyFFTBackend())
+        self._test_backend(ScipyFFTBackend(workers=-1))
+
+    def test_scipy_fftpack(self):
+        # what ScipyFFTBackend uses with scipy before 1.4
+        backend = ScipyFFTBackend(workers=2)
+        backend._fft = _FFTPack()
+        self._test_backend(backend)
+        self.assertTrue(backend.next_fast_len(1021) >= 1021)
+
+    def test_pyfftw(self):
+        try:
+            import pyfftw  # noqa: F401
+        except ImportError:
+            with self.assertRaises(RuntimeError):
+                PyFFTWBackend()
+            return
+        self._test_backend(PyFFTWBackend(workers=2))
+
+    def test_get_backend(self):
+        self.assertTrue(isinstance(get_backend("numpy"), NumpyFFTBackend))
+        backend = ScipyFFTBackend(workers=2)
+        self.assertTrue(get_backend(backend) is backend)
+        self.assertTrue(get_backend("scipy", workers=4).workers == 4)
+        with self.assertRaises(RuntimeError):
+            get_backend("foo")
+
+    def test_next_fast_len(self):
+        self.assertTrue(ScipyFFTBackend().next_fast_len(1021) >= 1021)
+        self.assertTrue(NumpyFFTBackend().next_fast_len(1024) == 1024)
+
+
+if __name__ == "__main__":
+    unittest.main()
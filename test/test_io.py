@@ -0,0 +1,161 @@
+import unittest
+import tempfile
+import os
+
+import numpy as np
+
+from comparator.io import (
+    load_array,
+    array_from_buffer,
+    save_results,
+    load_results
+)
+from comparator.single_domain import SingleDomainComparator
+from comparator.operators import Operator
+from comparator.spec import from_spec
+
+
+class TestLoadArray(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.data = (np.random.rand(1000) +
+                     1j*np.random.rand(1000)).astype(np.complex64)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_load_npy(self):
+        file_path = os.path.join(self.tmp_dir.name, "data.npy")
+        np.save(file_path, self.data)
+        arr = load_array(file_path)
+        self.assertTrue(isinstance(arr, np.memmap))
+        self.assertTrue(np.allclose(arr, self.data))
+
+    def test_load_raw(self):
+        file_path = os.path.join(self.tmp_dir.name, "data.dump")
+        header = b"\x00" * 16
+        with open(file_path, "wb") as f:
+            f.write(header)
+            f.write(self.data.view(np.float32).tobytes())
+        arr = load_array(file_path, dtype=np.float32, offset=len(header),
+                         complex_interleaved=True)
+        self.assertTrue(isinstance(arr, np.memmap))
+        self.assertTrue(arr.dtype == np.complex64)
+        self.assertTrue(np.allclose(arr, self.data))
+
+        arr = load_array(file_path, dtype=np.float32, offset=len(header),
+                         n_channels=2)
+        self.assertTrue(np.allclose(arr[:, 1], self.data.imag))
+
+        with self.assertRaises(RuntimeError):
+            load_array(file_path)
+        with self.assertRaises(RuntimeError):
+            load_array(file_path, dtype=np.int16, complex_interleaved=True)
+
+    def test_array_from_buffer(self):
+        buffer = self.data.view(np.float32).tobytes()
+        arr = array_from_buffer(buffer, np.float32, complex_interleaved=True)
+        self.assertTrue(np.allclose(arr, self.data))
+
+    def test_compare(self):
+        file_path = os.path.join(self.tmp_dir.name, "data.npy")
+        np.save(file_path, self.data)
+        comp = SingleDomainComparator("io")
+        comp.operators["diff"] = lambda a, b: a - b
+        comp.domain = [100, 200]
+        res_op, res_prod = comp(load_array(file_path), self.data[::-1])
+        self.assertTrue(res_op["diff"][0][1].shape[0] == 100)
+        self.assertTrue(np.allclose(
+            res_op["diff"][0][1],
+            self.data[100:200] - self.data[::-1][100:200]))
+
+
+class TestSaveResults(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.arrays = [np.random.rand(50) + 1j*np.random.rand(50)
+                       for i in range(3)]
+        self.labels = ["a", "b", "c"]
+        self.comp = SingleDomainComparator("io")
+        self.comp.operators["diff"] = np.subtract
+        self.comp.operators["sum"] = Operator(
+            np.add, symmetry="symmetric", diagonal=False)
+        self.comp.operators["this"] = Operator(
+            np.conj, broadcast=True)
+        self.comp.products["mean"] = np.mean
+        self.comp.products["max"] = np.amax
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def check(self, res_op, res_prod, loaded_op, loaded_prod):
+        self.assertTrue(list(loaded_op) == list(res_op))
+        self.assertTrue(list(loaded_prod) == list(res_prod))
+        for name in res_op:
+            self.assertTrue(loaded_op[name].name == name)
+            self.assertTrue(loaded_op[name].labels == self.labels)
+            self.assertTrue(loaded_prod[name]._labels == self.labels)
+            for label in self.labels:
+                for expected, val in zip(res_op[name][label],
+                                         loaded_op[name][label]):
+                    if expected is None:
+                        self.assertTrue(val is None)
+                    else:
+                        self.assertTrue(np.array_equal(expected, val))
+            for prod in ["mean", "max"]:
+                # NaN entries compare equal
+                np.testing.assert_array_equal(
+                    loaded_prod[name][prod], res_prod[name][prod])
+        self.assertTrue(loaded_prod["sum"][0, 0] is None)
+
+    def test_save_dir(self):
+        path = os.path.join(self.tmp_dir.name, "results")
+        for contiguous in [False, True]:
+            res_op, res_prod = self.comp(
+                *self.arrays, labels=self.labels, contiguous=contiguous)
+            save_results(path, res_op, res_prod, comparator=self.comp)
+            loaded_op, loaded_prod, spec = load_results(path)
+            self.check(res_op, res_prod, loaded_op, loaded_prod)
+            self.assertTrue(isinstance(loaded_op["diff"].result, np.memmap))
+            self.assertTrue(isinstance(loaded_prod["diff"].array, np.memmap))
+            self.assertTrue(isinstance(loaded_op["sum"][0][1], np.memmap))
+            self.assertTrue(from_spec(spec).to_spec() == self.comp.to_spec())
+
+    def test_save_npz(self):
+        path = os.path.join(self.tmp_dir.name, "results.npz")
+        res_op, res_prod = self.comp(*self.arrays, labels=self.labels)
+        save_results(path, res_op, res_prod)
+        loaded_op, loaded_prod, spec = load_results(path)
+        self.check(res_op, res_prod, loaded_op, loaded_prod)
+        self.assertTrue(spec is None)
+
+    def test_save_partial_spec(self):
+        path = os.path.join(self.tmp_dir.name, "results")
+        self.comp.operators["lambda"] = lambda a, b: a * b
+        self.comp.domain = [10, 40]
+        res_op, res_prod = self.comp(*self.arrays, labels=self.labels)
+        with self.assertLogs("comparator.io", level="WARNING"):
+            save_results(path, res_op, res_prod, comparator=self.comp)
+        loaded_op, loaded_prod, spec = load_results(path)
+        self.check(res_op, res_prod, loaded_op, loaded_prod)
+        self.assertTrue(spec["partial"])
+        self.assertTrue(spec["type"] ==
+                        "comparator.single_domain:SingleDomainComparator")
+        self.assertTrue(spec["name"] == "io")
+        self.assertTrue(spec["domain"] == self.comp.domain.to_spec())
+        self.assertTrue(spec["operators"] == list(self.comp.operators))
+        self.assertTrue(spec["products"] == ["mean", "max"])
+
+    def test_save_object_products(self):
+        self.comp.products["shape"] = np.shape
+        self.comp.products["str"] = str
+        res_op, res_prod = self.comp(*self.arrays)
+        with self.assertRaises(RuntimeError):
+            save_results(os.path.join(self.tmp_dir.name, "results"),
+                         res_prod=res_prod)
+
+
+if __name__ == "__main__":
+    unittest.main()
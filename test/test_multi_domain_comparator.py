@@ -1,9 +1,17 @@
 import unittest
+import concurrent.futures
 
 import numpy as np
 
-from comparator.multi_domain import MultiDomainComparator
-from comparator.single_domain import SingleDomainComparator
+from comparator.multi_domain import (
+    MultiDomainComparator,
+    TimeFreqDomainComparator
+)
+from comparator.single_domain import (
+    SingleDomainComparator,
+    FrequencyDomainComparator
+)
+from comparator.cache import TransformCache
 
 
 class TestMultiDomainComparator(unittest.TestCase):
@@ -25,6 +33,22 @@ class TestMultiDomainComparator(unittest.TestCase):
         self.assertTrue("diff" in
                         self.multi_domain_comparator.domain1.operators)
 
+    def test_remove_operator(self):
+        self.multi_domain_comparator.operators["diff"] = lambda a, b: a - b
+        del self.multi_domain_comparator.operators["diff"]
+        self.assertFalse("diff" in
+                         self.multi_domain_comparator.domain0.operators)
+        self.assertFalse("diff" in
+                         self.multi_domain_comparator.domain1.operators)
+        self.multi_domain_comparator.operators["this"] = lambda a: a
+        self.multi_domain_comparator.products["mean"] = np.mean
+        self.multi_domain_comparator.products["max"] = np.amax
+        del self.multi_domain_comparator.products["mean"]
+        for res_op, res_prod in self.multi_domain_comparator(
+                np.random.rand(10), np.random.rand(10)):
+            self.assertTrue(list(res_op) == ["this"])
+            self.assertTrue([name for name, _ in res_prod["this"]] == ["max"])
+
     def test_add_product(self):
         self.multi_domain_comparator.products["mean"] = np.mean
         self.assertTrue("mean" in
@@ -37,6 +61,50 @@ class TestMultiDomainComparator(unittest.TestCase):
         self.multi_domain_comparator.operators["diff"] = lambda a, b: a - b
         ret = self.multi_domain_comparator(a, b, c)
         self.assertTrue(len(ret) == 2)
+        ret_par = self.multi_domain_comparator(a, b, c, n_workers=2)
+        for (res_op, _), (res_op_par, _) in zip(ret, ret_par):
+            self.assertTrue(np.allclose(
+                res_op["diff"][1][2], res_op_par["diff"][1][2]))
+
+    def test_call_shared_cache(self):
+        x = np.arange(200)
+        a, b = np.sin(0.1*x), np.sin(0.1*(x + 3))
+
+        comp = TimeFreqDomainComparator(align_freq=True)
+        comp.operators["diff"] = lambda a, b: a - b
+        cache = TransformCache()
+        ret = comp(a, b, cache=cache)
+        self.assertTrue(len(ret) == 2)
+        # the frequency domain reuses the time domain's alignment
+        self.assertTrue(cache.hits == 1)
+
+        # comparators with picklable operators can run domains in processes
+        comp_proc = TimeFreqDomainComparator(align_freq=True)
+        comp_proc.operators["diff"] = np.subtract
+        with concurrent.futures.ProcessPoolExecutor(2) as executor:
+            ret_proc = comp_proc(a, b, domain_executor=executor)
+        for (res_op, _), (res_op_proc, _) in zip(ret, ret_proc):
+            self.assertTrue(np.allclose(
+                res_op["diff"][0][1], res_op_proc["diff"][0][1]))
+
+        # domains running concurrently still share the alignment
+        cache = TransformCache()
+        ret_par = comp(a, b, cache=cache, n_domain_workers=2)
+        self.assertTrue(cache.hits == 1)
+        for (res_op, _), (res_op_par, _) in zip(ret, ret_par):
+            self.assertTrue(np.allclose(
+                res_op["diff"][0][1], res_op_par["diff"][0][1]))
+
+        comp = MultiDomainComparator(domains={
+            "freq0": FrequencyDomainComparator("freq0", fft_size=64),
+            "freq1": FrequencyDomainComparator("freq1", fft_size=64)
+        })
+        comp.operators["diff"] = lambda a, b: a - b
+        cache = TransformCache()
+        (res_op0, _), (res_op1, _) = comp(a, b, cache=cache)
+        self.assertTrue(cache.hits == 1)
+        self.assertTrue(np.allclose(res_op0["diff"][0][1],
+                                    res_op1["diff"][0][1]))
 
     def test_domain(self):
         comp = self.multi_domain_comparator
@@ -3,8 +3,11 @@ import logging
 import json
 import os
 
+import numpy as np
+
 from comparator.operator_result import (
-    ComparatorOperatorResult
+    ComparatorOperatorResult,
+    LazyResult
 )
 
 test_dir = os.path.dirname(os.path.abspath(__file__))
@@ -42,6 +45,20 @@ class TestComparatorOperatorResult(unittest.TestCase):
         self.assertTrue(self.result_one_arg["one"] == self.result_one_arg[0])
         self.result_one_arg.labels = None
 
+    def test_getitem_array(self):
+        arr = np.arange(3*3*4).reshape((3, 3, 4))
+        res = ComparatorOperatorResult(
+            result=arr, labels=["one", "two", "three"])
+        self.assertTrue(np.array_equal(res["two"], arr[1]))
+        self.assertTrue(np.array_equal(res[2, 1], arr[2, 1]))
+        self.assertTrue(np.shares_memory(res[:, 1], arr))
+        self.assertTrue(len(res) == 3)
+        self.assertTrue(len(list(res)) == 3)
+        res.labels = ["a", "b", "c"]
+        self.assertTrue(np.array_equal(res["c"], arr[2]))
+        with self.assertRaises(RuntimeError):
+            res["one"]
+
     def test_len(self):
         self.assertTrue(len(self.result_one_arg) == 3)
         self.assertTrue(len(self.result_two_arg) == 3)
@@ -65,6 +82,44 @@ class TestComparatorOperatorResult(unittest.TestCase):
                  in zip(test_val, self.result_one_arg.labels)]))
 
 
+class TestLazyResult(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+        def compute(idx):
+            self.calls.append(idx)
+            return list(idx)
+
+        self.compute = compute
+
+    def test_getitem(self):
+        res = ComparatorOperatorResult(
+            result=LazyResult(self.compute, (3, 3)),
+            labels=["one", "two", "three"])
+        self.assertTrue(len(self.calls) == 0)
+        self.assertTrue(len(res) == 3)
+        self.assertTrue(res["two"][2] == [1, 2])
+        self.assertTrue(res[2, -1] == [2, 2])
+        self.assertTrue(res[1, 0, 1] == 0)
+        self.assertTrue([len(row) for row in res] == [3, 3, 3])
+        with self.assertRaises(IndexError):
+            res[3]
+        # nothing is cached by default
+        res[1, 2]
+        self.assertTrue(self.calls.count((1, 2)) == 2)
+
+    def test_cache(self):
+        res = LazyResult(self.compute, (4, ), cache_size=2)
+        res[0], res[1], res[0], res[2]
+        self.assertTrue(self.calls == [(0, ), (1, ), (2, )])
+        # (1, ) was least recently used
+        res[1]
+        self.assertTrue(self.calls[-1] == (1, ))
+        res[2]
+        self.assertTrue(len(self.calls) == 4)
+
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.DEBUG)
     unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+import inspect
+
+import numpy as np
+
+from comparator.operators import Operator, Product
+
+
+class TestOperator(unittest.TestCase):
+
+    def test_call(self):
+        op = Operator(lambda a, b: a - b)
+        self.assertTrue(op(3, 1) == 2)
+        self.assertFalse(op.broadcast)
+
+    def test_signature(self):
+        op = Operator(lambda a, b: a - b, broadcast=True)
+        self.assertTrue(len(inspect.signature(op).parameters) == 2)
+        self.assertTrue(op.broadcast)
+
+    def test_symmetry(self):
+        op = Operator(lambda a, b: a - b, symmetry="antisymmetric")
+        self.assertTrue(op.mirror(np.ones(2))[0] == -1)
+        self.assertTrue(op.diagonal)
+        op = Operator(lambda a, b: a - b, symmetry=lambda a: a[::-1])
+        self.assertTrue(op.mirror([0, 1]) == [1, 0])
+        self.assertTrue(Operator(lambda a, b: a).mirror is None)
+        with self.assertRaises(RuntimeError):
+            Operator(lambda a, b: a - b, symmetry="foo")
+
+
+class TestProduct(unittest.TestCase):
+
+    def test_call(self):
+        prod = Product(lambda a: np.mean(a, axis=-1), broadcast=True)
+        a = np.arange(6).reshape((2, 3))
+        self.assertTrue(np.allclose(prod(a), [1, 4]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,26 @@
+import unittest
+import concurrent.futures
+
+from comparator.parallel import get_executor
+
+
+class TestGetExecutor(unittest.TestCase):
+
+    def test_get_executor(self):
+        with get_executor() as executor:
+            self.assertTrue(executor is None)
+        with get_executor(n_workers=1) as executor:
+            self.assertTrue(executor is None)
+        with get_executor(n_workers=2) as executor:
+            self.assertTrue(
+                isinstance(executor, concurrent.futures.ThreadPoolExecutor))
+            self.assertTrue(executor.submit(sum, [1, 2]).result() == 3)
+        # executors that get passed in are left running
+        with concurrent.futures.ThreadPoolExecutor(2) as pool:
+            with get_executor(pool, n_workers=4) as executor:
+                self.assertTrue(executor is pool)
+            self.assertTrue(pool.submit(sum, [1, 2]).result() == 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
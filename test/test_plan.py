@@ -0,0 +1,161 @@
+import unittest
+import concurrent.futures
+
+import numpy as np
+
+from comparator.plan import OperatorPlan, get_arity
+from comparator.operators import Operator
+from comparator.single_domain import SingleDomainComparator
+
+
+class TestOperatorPlan(unittest.TestCase):
+
+    def test_get_arity(self):
+        self.assertTrue(get_arity(lambda a: a) == 1)
+        self.assertTrue(get_arity(lambda a, b: a) == 2)
+        self.assertTrue(get_arity(Operator(lambda a, b, c: a)) == 3)
+        self.assertTrue(get_arity(np.subtract) == 2)
+        self.assertTrue(get_arity(Operator(np.positive)) == 1)
+        self.assertTrue(get_arity(lambda a, b=None: a) == 2)
+        self.assertTrue(get_arity(lambda *x: x) == 1)
+        self.assertTrue(get_arity(Operator(lambda *x: x)) == 1)
+        with self.assertRaises(RuntimeError):
+            get_arity(lambda: None)
+
+    def test_variadic_operator(self):
+        plan = OperatorPlan({"sum": lambda *x: np.sum(x, axis=0)})
+        arrays = [np.arange(3) + i for i in range(3)]
+        res_op, _ = plan(arrays)
+        self.assertTrue(len(res_op["sum"]) == 3)
+        for i in range(3):
+            self.assertTrue(np.array_equal(res_op["sum"][i], arrays[i]))
+
+    def test_indices(self):
+        plan = OperatorPlan()
+        indices = plan.indices(2, 3)
+        self.assertTrue(len(indices) == 9)
+        self.assertTrue(indices[1] == (0, 1))
+        self.assertTrue(plan.indices(2, 3) is indices)
+
+    def test_indices_triangle(self):
+        plan = OperatorPlan()
+        self.assertTrue(plan.indices(2, 3, True, False) ==
+                        [(0, 1), (0, 2), (1, 2)])
+        self.assertTrue(len(plan.indices(2, 3, True, True)) == 6)
+
+    def test_call_symmetry(self):
+        arrays = [np.random.rand(4) + 1j*np.random.rand(4)
+                  for i in range(3)]
+        for broadcast in [False, True]:
+            calls = []
+
+            def diff(a, b):
+                calls.append(None)
+                return a - b
+
+            plan = OperatorPlan(
+                operators={
+                    "diff": Operator(diff, broadcast=broadcast,
+                                     symmetry="antisymmetric"),
+                    "cross": Operator(lambda a, b: a * np.conj(b),
+                                      broadcast=broadcast,
+                                      symmetry="conjugate",
+                                      diagonal=False),
+                    "sum": Operator(lambda a, b: a + b,
+                                    broadcast=broadcast,
+                                    symmetry="symmetric")
+                },
+                products={"mean": np.mean}
+            )
+            res_op, res_prod = plan(arrays)
+            if not broadcast:
+                self.assertTrue(len(calls) == 6)
+            for i in range(3):
+                for j in range(3):
+                    a, b = arrays[i], arrays[j]
+                    self.assertTrue(np.allclose(res_op["diff"][i][j], a - b))
+                    self.assertTrue(np.allclose(res_op["sum"][i][j], a + b))
+                    self.assertTrue(np.isclose(
+                        res_prod["diff"][i, j]["mean"], np.mean(a - b)))
+                    if i == j:
+                        self.assertTrue(res_op["cross"][i][j] is None)
+                        self.assertTrue(res_prod["cross"][i, j] is None)
+                    else:
+                        self.assertTrue(np.allclose(
+                            res_op["cross"][i][j], a * np.conj(b)))
+            str(res_prod["cross"])
+
+    def test_symmetry_arity(self):
+        plan = OperatorPlan()
+        with self.assertRaises(RuntimeError):
+            plan.set_operator("this", Operator(lambda a: a,
+                                               symmetry="symmetric"))
+
+    def test_call(self):
+        plan = OperatorPlan(
+            operators={"diff": lambda a, b: a - b},
+            products={"mean": np.mean}
+        )
+        arrays = [np.random.rand(4) for i in range(3)]
+        res_op, res_prod = plan(arrays)
+        self.assertTrue(np.allclose(res_op["diff"][0][2],
+                                    arrays[0] - arrays[2]))
+        self.assertTrue(np.isclose(res_prod["diff"][2, 1]["mean"],
+                                   np.mean(arrays[2] - arrays[1])))
+
+    def test_call_executor(self):
+        arrays = [np.random.rand(8) + 1j*np.random.rand(8)
+                  for i in range(4)]
+        plan = OperatorPlan(
+            operators={
+                "diff": lambda a, b: a - b,
+                "this": lambda a: a,
+                "cross": Operator(lambda a, b: a * np.conj(b),
+                                  symmetry="conjugate"),
+                "sum": Operator(lambda a, b: a + b, broadcast=True)
+            },
+            products={"mean": np.mean, "max": lambda a: np.amax(np.abs(a))}
+        )
+        with concurrent.futures.ThreadPoolExecutor(4) as executor:
+            for mode in ["full", "star"]:
+                res_op, res_prod = plan(arrays, mode=mode)
+                res_op_par, res_prod_par = plan(
+                    arrays, mode=mode, executor=executor)
+                self.assertTrue(list(res_op_par) == list(res_op))
+                for name in res_op:
+                    self.assertTrue(np.array_equal(
+                        np.asarray(res_op_par[name].result),
+                        np.asarray(res_op[name].result)))
+                    for prod in ["mean", "max"]:
+                        self.assertTrue(np.array_equal(
+                            np.asarray(res_prod_par[name][prod]),
+                            np.asarray(res_prod[name][prod])))
+
+
+class TestComparatorPlan(unittest.TestCase):
+
+    def setUp(self):
+        self.comp = SingleDomainComparator("plan")
+
+    def test_operators_change(self):
+        self.comp.operators["diff"] = lambda a, b: a - b
+        self.comp.operators["this"] = lambda a: a
+        self.assertTrue(list(self.comp.plan.steps) == ["diff", "this"])
+        self.assertTrue(self.comp.plan.steps["diff"].arity == 2)
+        del self.comp.operators["diff"]
+        self.assertTrue(list(self.comp.plan.steps) == ["this"])
+        res_op, res_prod = self.comp(np.arange(3), np.arange(3))
+        self.assertTrue(list(res_op) == ["this"])
+
+    def test_products_change(self):
+        self.comp.operators["this"] = lambda a: a
+        self.comp.products["mean"] = np.mean
+        self.comp.products["max"] = np.amax
+        del self.comp.products["mean"]
+        res_op, res_prod = self.comp(np.arange(3), np.arange(3))
+        self.assertTrue("max" in res_prod["this"])
+        self.assertFalse("mean" in res_prod["this"])
+
+
+if __name__ == "__main__":
+    unittest.main()
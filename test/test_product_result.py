@@ -3,6 +3,8 @@ import json
 import os
 import logging
 
+import numpy as np
+
 from comparator.product_result import (
     ComparatorProductResult
 )
@@ -42,7 +44,10 @@ class TestComparatorProductResult(unittest.TestCase):
             ("total_power",
              [4194552.109111571, 1072557111.8342557, 4498630584394866])
         ]
-        self.assertTrue(json.dumps(val) == json.dumps(expected_val))
+        self.assertTrue([name for name, _ in val] ==
+                        [name for name, _ in expected_val])
+        for (_, vals), (_, expected_vals) in zip(val, expected_val):
+            self.assertTrue(np.array_equal(vals, expected_vals))
 
     def test_getitem_str(self):
         print("test_getitem_str")
@@ -52,7 +57,33 @@ class TestComparatorProductResult(unittest.TestCase):
             [2027, 0, 2027],
             [2027, 2027, 0]
         ]
-        self.assertTrue(val == expected_val)
+        self.assertTrue(isinstance(val, np.ndarray))
+        self.assertTrue(np.array_equal(val, expected_val))
+        self.assertTrue(val.base is not None)  # a view
+
+    def test_getitem_missing(self):
+        res = ComparatorProductResult([
+            [None, {"argmax": 1, "mean": (1.0, 2.0)}],
+            [{"argmax": 2, "mean": (3.0, 4.0)}, None]
+        ])
+        self.assertTrue(res[0, 0] is None)
+        self.assertTrue(res[0][1]["argmax"] == 1)
+        self.assertTrue(res[1, 0, "argmax"] == 2)
+        self.assertTrue(res["mean"].shape == (2, 2, 2))
+        # NaN entries compare equal
+        np.testing.assert_array_equal(
+            res["argmax"], [[np.nan, 1], [2, np.nan]])
+        self.assertTrue(res.valid.tolist() == [[False, True], [True, False]])
+        self.assertTrue(res.products[1][0]["argmax"] == 2)
+        with self.assertRaises(RuntimeError):
+            res["foo"]
+
+    def test_getitem_object(self):
+        res = ComparatorProductResult([
+            {"peaks": [1, 2]}, {"peaks": [3]}
+        ])
+        self.assertTrue(res["peaks"].dtype == object)
+        self.assertTrue(res[1]["peaks"] == [3])
 
     def test_getitem_tuple_int(self):
         val = self.res_double[0, 0]
@@ -0,0 +1,106 @@
+import unittest
+import math
+
+import numpy as np
+
+from comparator.reducers import (
+    Count,
+    Mean,
+    Sum,
+    Var,
+    Std,
+    RMS,
+    Max,
+    Min,
+    as_reducer
+)
+
+
+class TestReducers(unittest.TestCase):
+
+    def setUp(self):
+        self.a = np.random.rand(3, 100)
+        self.chunks = np.split(self.a, [10, 55], axis=-1)
+
+    def _update(self, reducer):
+        state = reducer.init()
+        for chunk in self.chunks:
+            state = reducer.update(state, chunk)
+        return reducer.finalize(state)
+
+    def _rms(self, a, axis=-1):
+        return np.sqrt(np.mean(np.abs(a)**2, axis=axis))
+
+    def test_update(self):
+        for reducer, func in [(Mean(), np.mean), (Sum(), np.sum),
+                              (Var(), np.var), (Std(), np.std),
+                              (RMS(), self._rms),
+                              (Max(), np.amax), (Min(), np.amin)]:
+            self.assertTrue(np.allclose(
+                self._update(reducer), func(self.a, axis=-1)))
+        self.assertTrue(np.all(self._update(Count()) == 100))
+
+    def test_merge(self):
+        a = np.random.rand(1000) + 1j*np.random.rand(1000)
+        for reducer, func in [(Mean(), np.mean), (Sum(), np.sum),
+                              (Var(ddof=1), lambda a: np.var(a, ddof=1)),
+                              (RMS(), self._rms), (Count(), len)]:
+            states = [reducer.update(reducer.init(), chunk)
+                      for chunk in np.array_split(a, 7)]
+            state = reducer.init()
+            for other in states[::-1]:
+                state = reducer.merge(state, other)
+            self.assertTrue(np.allclose(reducer.finalize(state), func(a)))
+
+    def test_empty_chunk(self):
+        empty = self.a[:, :0]
+        for reducer, func in [(Mean(), np.mean),
+                              (Var(), np.var), (Std(), np.std),
+                              (RMS(), self._rms),
+                              (Max(), np.amax), (Min(), np.amin)]:
+            self.assertTrue(reducer.update(reducer.init(), empty) is None)
+            self.assertTrue(reducer(empty) is None)
+            self.chunks.insert(1, empty)
+            self.chunks.append(empty)
+            self.assertTrue(np.allclose(
+                self._update(reducer), func(self.a, axis=-1)))
+            state = reducer.update(reducer.init(), self.a)
+            state = reducer.merge(
+                state, reducer.update(reducer.init(), empty))
+            self.assertTrue(np.allclose(
+                reducer.finalize(state), func(self.a, axis=-1)))
+
+    def test_empty_identity(self):
+        self.assertTrue(Count()(np.array([])) == 0)
+        self.assertTrue(Sum()(np.array([])) == 0.0)
+        self.assertTrue(np.all(Count()(self.a[:, :0]) == 0))
+        self.assertTrue(np.all(Sum()(self.a[:, :0]) == 0.0))
+        reducer = Sum()
+        state = reducer.update(reducer.init(), self.a[:, :0])
+        state = reducer.update(state, self.a)
+        self.assertTrue(np.allclose(
+            reducer.finalize(state), np.sum(self.a, axis=-1)))
+
+    def test_sum_compensated(self):
+        reducer = Sum()
+        state = reducer.init()
+        for i in range(10000):
+            state = reducer.update(state, np.array([0.1]))
+        self.assertTrue(reducer.finalize(state) == math.fsum([0.1]*10000))
+
+    def test_call(self):
+        self.assertTrue(np.isclose(Mean()(self.a[0]), np.mean(self.a[0])))
+        self.assertTrue(Mean().finalize(Mean().init()) is None)
+
+    def test_as_reducer(self):
+        self.assertTrue(isinstance(as_reducer(np.mean), Mean))
+        self.assertTrue(isinstance(as_reducer(np.amax), Max))
+        self.assertTrue(isinstance(as_reducer(np.var), Var))
+        reducer = Sum()
+        self.assertTrue(as_reducer(reducer) is reducer)
+        with self.assertRaises(RuntimeError):
+            as_reducer(lambda a: a)
+
+
+if __name__ == "__main__":
+    unittest.main()
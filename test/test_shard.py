@@ -0,0 +1,116 @@
+import unittest
+import threading
+import concurrent.futures
+
+import numpy as np
+
+from comparator.single_domain import SingleDomainComparator
+from comparator.operators import Operator
+from comparator.shard import (
+    LocalArray,
+    ExecutorTransport,
+    SocketTransport,
+    WorkerServer,
+    tiles,
+    run_sharded
+)
+
+
+class TestShard(unittest.TestCase):
+
+    def setUp(self):
+        self.comp = SingleDomainComparator("shard")
+        self.comp.operators["diff"] = np.subtract
+        self.comp.operators["diff_anti"] = Operator(
+            np.subtract, symmetry="antisymmetric", diagonal=False)
+        self.comp.operators["diff_batched"] = Operator(
+            np.subtract, broadcast=True)
+        self.comp.operators["this"] = np.positive
+        self.comp.products["mean"] = np.mean
+        self.comp.products["max"] = np.amax
+        self.arrays = [np.random.rand(16) for i in range(7)]
+        self.labels = [f"a{i}" for i in range(7)]
+
+    def check(self, res_prod):
+        _, expected = self.comp(*self.arrays, labels=self.labels)
+        self.assertTrue(list(res_prod) == list(expected))
+        for name in expected:
+            self.assertTrue(res_prod[name]._labels == self.labels)
+            for prod in ["mean", "max"]:
+                vals = np.asarray(res_prod[name][prod], dtype=float)
+                expected_vals = np.asarray(expected[name][prod], dtype=float)
+                self.assertTrue(np.allclose(
+                    vals, expected_vals, equal_nan=True))
+        self.assertTrue(res_prod["diff_anti"][2, 2] is None)
+
+    def test_tiles(self):
+        self.assertTrue(len(tiles(7, 3)) == 9)
+        self.assertTrue(tiles(7, 3)[-1] == ((6, 7), (6, 7)))
+        self.assertTrue(len(tiles(7, 3, triangle=True)) == 6)
+
+    def test_shard_process_pool(self):
+        self.check(self.comp.shard(
+            *self.arrays, labels=self.labels, tile_size=3, n_workers=2))
+
+    def test_shard_thread_pool(self):
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            with ExecutorTransport(executor) as transport:
+                self.check(self.comp.shard(
+                    *self.arrays, labels=self.labels, tile_size=4,
+                    transport=transport))
+
+    def test_shard_release_on_error(self):
+
+        def fail(a, b):
+            raise ValueError("fail")
+
+        self.comp.operators["fail"] = fail
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            with ExecutorTransport(executor) as transport:
+                with self.assertRaises(ValueError):
+                    self.comp.shard(*self.arrays, transport=transport)
+                self.assertTrue(transport._shared == {})
+
+    def test_shard_local_array(self):
+        # what ExecutorTransport shares without multiprocessing.shared_memory
+        stack = np.stack(self.arrays)
+        with ExecutorTransport(n_workers=2) as transport:
+            handle = LocalArray(stack)
+            res_prod = run_sharded(
+                self.comp.plan.steps["diff"], dict(self.comp.products),
+                stack, transport, tile_size=3, handle=handle)
+            transport.release(handle)
+        _, expected = self.comp(*self.arrays)
+        self.assertTrue(np.allclose(
+            res_prod["mean"], expected["diff"]["mean"]))
+
+    def test_shard_socket(self):
+        server = WorkerServer(authkey=b"test")
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            with SocketTransport([server.address, server.address],
+                                 authkey=b"test") as transport:
+                self.check(self.comp.shard(
+                    *self.arrays, labels=self.labels, tile_size=3,
+                    transport=transport))
+                # errors on workers are raised here
+                with self.assertRaises(RuntimeError):
+                    transport.submit(np.subtract, 1).result()
+        finally:
+            server.close()
+
+    def test_authkey(self):
+        server = WorkerServer()
+        try:
+            self.assertTrue(len(server.authkey) > 0)
+        finally:
+            server.close()
+        with self.assertRaises(RuntimeError):
+            WorkerServer(authkey=b"")
+        with self.assertRaises(RuntimeError):
+            SocketTransport([("localhost", 6000)], authkey=None)
+
+
+if __name__ == "__main__":
+    unittest.main()
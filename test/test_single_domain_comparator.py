@@ -1,4 +1,5 @@
 import unittest
+import tempfile
 
 import numpy as np
 
@@ -7,6 +8,7 @@ from comparator.single_domain import (
     TimeDomainComparator,
     FrequencyDomainComparator
 )
+from comparator.operators import Operator, Product
 
 
 class TestSingleDomainComparator(unittest.TestCase):
@@ -35,6 +37,240 @@ class TestSingleDomainComparator(unittest.TestCase):
                 self.assertTrue(
                     np.allclose(res_op[i][j], arrays[i] + arrays[j]))
 
+    def test_get_operator_products_batched(self):
+
+        n_arrays = 3
+        stack = np.random.rand(n_arrays, 4)
+        self.comp_time.products["mean"] = np.mean
+        self.comp_time.products["max"] = Product(
+            lambda a: np.amax(a, axis=-1), broadcast=True)
+        res_op, res_prod = self.comp_time.get_operator_products_batched(
+            lambda a: a, stack)
+        for i in range(n_arrays):
+            self.assertTrue(np.allclose(res_op[i], stack[i]))
+            self.assertTrue(
+                np.isclose(res_prod[i]["mean"], np.mean(stack[i])))
+        res_op, res_prod = self.comp_time.get_operator_products_batched(
+            lambda a, b: a - b, stack)
+        for i in range(n_arrays):
+            for j in range(n_arrays):
+                self.assertTrue(
+                    np.allclose(res_op[i][j], stack[i] - stack[j]))
+                self.assertTrue(np.isclose(
+                    res_prod[i][j]["max"], np.amax(stack[i] - stack[j])))
+
+    def test_call_batched(self):
+        arrays = [np.random.rand(10) for i in range(4)]
+        self.comp_time.operators["diff"] = lambda a, b: a - b
+        self.comp_time.products["mean"] = np.mean
+        expected_op, expected_prod = self.comp_time(*arrays)
+
+        self.comp_time.operators["diff"] = Operator(
+            lambda a, b: a - b, broadcast=True)
+        self.comp_time.products["mean"] = Product(
+            lambda a: np.mean(a, axis=-1), broadcast=True)
+        res_op, res_prod = self.comp_time(*arrays)
+        self.assertTrue(np.allclose(
+            res_op["diff"][1][2], expected_op["diff"][1][2]))
+        self.assertTrue(np.allclose(
+            res_prod["diff"]["mean"], expected_prod["diff"]["mean"]))
+
+    def test_call_star(self):
+        ref, b, c = [np.random.rand(10) for i in range(3)]
+        labels = ["ref", "b", "c"]
+        self.comp_time.operators["diff"] = lambda a, b: a - b
+        self.comp_time.operators["diff_batched"] = Operator(
+            lambda a, b: a - b, broadcast=True)
+        self.comp_time.operators["this"] = lambda a: a
+        self.comp_time.products["mean"] = np.mean
+        res_op, res_prod = self.comp_time(
+            ref, b, c, labels=labels, mode="star")
+        for name in ["diff", "diff_batched"]:
+            self.assertTrue(len(res_op[name]) == 2)
+            self.assertTrue(np.allclose(res_op[name]["b"], ref - b))
+            self.assertTrue(np.allclose(res_op[name]["c"], ref - c))
+            self.assertTrue(np.allclose(
+                res_prod[name]["mean"], [np.mean(ref - b), np.mean(ref - c)]))
+        self.assertTrue(len(res_op["this"]) == 3)
+        self.assertTrue(np.allclose(res_op["this"]["ref"], ref))
+
+        self.comp_time.operators["three_arg"] = lambda a, b, c: a
+        with self.assertRaises(RuntimeError):
+            self.comp_time(ref, b, c, mode="star")
+        with self.assertRaises(RuntimeError):
+            self.comp_time(ref, b, c, mode="foo")
+
+    def test_dict_methods(self):
+        arrays = [np.random.rand(10) for i in range(2)]
+        self.comp_time.operators.update(
+            {"diff": lambda a, b: a - b, "this": lambda a: a})
+        self.comp_time.products.update(mean=np.mean, max=np.amax)
+        res_op, res_prod = self.comp_time(*arrays)
+        self.assertTrue(list(res_op) == ["diff", "this"])
+        self.assertTrue(
+            [name for name, _ in res_prod["diff"]] == ["mean", "max"])
+
+        self.comp_time.operators.pop("this")
+        self.comp_time.products.pop("max")
+        self.comp_time.operators.setdefault("sum", lambda a, b: a + b)
+        res_op, res_prod = self.comp_time(*arrays)
+        self.assertTrue(list(res_op) == ["diff", "sum"])
+        self.assertTrue([name for name, _ in res_prod["sum"]] == ["mean"])
+
+        self.comp_time.operators.clear()
+        res_op, res_prod = self.comp_time(*arrays)
+        self.assertTrue(res_op == {})
+
+    def test_set_bad_operator(self):
+        with self.assertRaises(TypeError):
+            self.comp_time.operators["bad"] = 5
+        self.assertFalse("bad" in self.comp_time.operators)
+
+    def test_call_lazy(self):
+        arrays = [np.random.rand(10) + 1j*np.random.rand(10)
+                  for i in range(3)]
+        calls = []
+
+        def diff(a, b):
+            calls.append(None)
+            return a - b
+
+        self.comp_time.operators["diff"] = Operator(
+            diff, symmetry="antisymmetric")
+        self.comp_time.operators["cross"] = Operator(
+            lambda a, b: a * np.conj(b), broadcast=True)
+        self.comp_time.products["mean"] = np.mean
+        res_op, res_prod = self.comp_time(*arrays)
+        for n_workers in [None, 2]:
+            calls.clear()
+            res_op_lazy, res_prod_lazy = self.comp_time(
+                *arrays, lazy=True, lazy_cache_size=1, n_workers=n_workers)
+            self.assertTrue(len(calls) == 6)
+            for name in ["diff", "cross"]:
+                self.assertTrue(np.allclose(
+                    res_prod_lazy[name]["mean"], res_prod[name]["mean"]))
+                for i in range(3):
+                    for j in range(3):
+                        self.assertTrue(np.allclose(
+                            res_op_lazy[name][i][j], res_op[name][i][j]))
+            # operator results get recomputed on demand, and cached
+            calls.clear()
+            res_op_lazy["diff"][2][0]
+            res_op_lazy["diff"][2][0]
+            self.assertTrue(len(calls) == 1)
+
+    def test_call_memory_budget(self):
+        arrays = [np.random.rand(10) + 1j*np.random.rand(10)
+                  for i in range(3)]
+        self.comp_time.operators["diff"] = Operator(
+            lambda a, b: a - b, symmetry="antisymmetric")
+        self.comp_time.operators["cross"] = Operator(
+            lambda a, b: a * np.conj(b), broadcast=True)
+        self.comp_time.operators["this"] = lambda a: a
+        self.comp_time.products["mean"] = np.mean
+        labels = ["a", "b", "c"]
+        res_op, res_prod = self.comp_time(*arrays, labels=labels)
+        for n_workers in [None, 2]:
+            res_op_spill, res_prod_spill = self.comp_time(
+                *arrays, labels=labels, memory_budget=160,
+                n_workers=n_workers)
+            self.assertTrue(res_op_spill["diff"].store.spilled > 0)
+            self.assertTrue(isinstance(
+                res_op_spill["diff"]["c"][0], np.memmap))
+            for name in ["diff", "cross", "this"]:
+                self.assertTrue(np.allclose(
+                    res_prod_spill[name]["mean"], res_prod[name]["mean"]))
+                self.assertTrue(np.allclose(
+                    np.asarray(res_op_spill[name].result),
+                    np.asarray(res_op[name].result)))
+                self.assertTrue(np.allclose(
+                    res_op_spill[name]["a"], res_op[name]["a"]))
+
+    def test_call_spill_dir(self):
+        arrays = [np.full(10, i, dtype=float) for i in range(3)]
+        self.comp_time.operators["this"] = lambda a: a
+        with tempfile.TemporaryDirectory() as spill_dir:
+            res_op, _ = self.comp_time(
+                *arrays, memory_budget=0, spill_dir=spill_dir)
+            self.comp_time(*[a + 4 for a in arrays], memory_budget=0,
+                           spill_dir=spill_dir)
+            for i in range(3):
+                self.assertTrue(isinstance(res_op["this"][i], np.memmap))
+                self.assertTrue(np.all(res_op["this"][i] == i))
+
+    def test_call_contiguous(self):
+        arrays = [np.random.rand(10) for i in range(3)]
+        self.comp_time.operators["diff"] = lambda a, b: a - b
+        self.comp_time.operators["cross"] = Operator(
+            lambda a, b: a * b, broadcast=True)
+        self.comp_time.operators["sum"] = Operator(
+            lambda a, b: a + b, symmetry="symmetric", diagonal=False)
+        self.comp_time.operators["this"] = lambda a: a
+        self.comp_time.products["mean"] = np.mean
+        labels = ["a", "b", "c"]
+        res_op, res_prod = self.comp_time(*arrays, labels=labels)
+        for kwargs in [{}, {"n_workers": 2}, {"memory_budget": 0}]:
+            res_op_cont, _ = self.comp_time(
+                *arrays, labels=labels, contiguous=True, **kwargs)
+            for name in ["diff", "cross", "this"]:
+                block = res_op_cont[name].result
+                self.assertTrue(isinstance(block, np.ndarray))
+                self.assertTrue(np.allclose(
+                    block, np.asarray(res_op[name].result)))
+                self.assertTrue(np.allclose(
+                    res_op_cont[name]["b"], res_op[name]["b"]))
+            self.assertTrue(res_op_cont["diff"].result.shape == (3, 3, 10))
+            self.assertTrue(np.allclose(
+                res_op_cont["diff"][:, 1], np.asarray(arrays) - arrays[1]))
+            # missing results on the diagonal
+            self.assertTrue(isinstance(res_op_cont["sum"].result, list))
+        res_op_cont, _ = self.comp_time(
+            *arrays, contiguous=True, memory_budget=0)
+        self.assertTrue(isinstance(res_op_cont["diff"].result, np.memmap))
+
+    def test_call_n_workers(self):
+        arrays = [np.random.rand(10) for i in range(3)]
+        self.comp_time.operators["diff"] = lambda a, b: a - b
+        self.comp_time.operators["this"] = lambda a: a
+        self.comp_time.products["mean"] = np.mean
+        res_op, res_prod = self.comp_time(*arrays)
+        res_op_par, res_prod_par = self.comp_time(*arrays, n_workers=3)
+        for name in ["diff", "this"]:
+            self.assertTrue(np.array_equal(
+                np.asarray(res_op_par[name].result),
+                np.asarray(res_op[name].result)))
+            self.assertTrue(np.array_equal(
+                res_prod_par[name]["mean"], res_prod[name]["mean"]))
+
+    def test_stream(self):
+        arrays = [np.random.rand(100) for i in range(3)]
+        self.comp_time.operators["diff"] = lambda a, b: a - b
+        self.comp_time.operators["this"] = Operator(
+            lambda a: a, broadcast=True)
+        self.comp_time.products["mean"] = np.mean
+        self.comp_time.products["max"] = np.amax
+        expected_op, expected_prod = self.comp_time(*arrays)
+
+        def chunked(a):
+            for i in range(0, a.shape[0], 30):
+                yield a[i:i+30]
+
+        res_prod = self.comp_time.stream(*[chunked(a) for a in arrays])
+        for name in ["diff", "this"]:
+            for prod in ["mean", "max"]:
+                self.assertTrue(np.allclose(
+                    np.array(res_prod[name][prod], dtype=float),
+                    np.array(expected_prod[name][prod], dtype=float)))
+
+        res_prod = self.comp_time.stream(
+            *[chunked(a) for a in arrays], labels=["a", "b", "c"],
+            mode="star")
+        self.assertTrue(len(res_prod["diff"]["mean"]) == 2)
+
+        self.comp_time.products["custom"] = lambda a: a[0]
+        with self.assertRaises(RuntimeError):
+            self.comp_time.stream(*[chunked(a) for a in arrays])
+
     def test_set_operator(self):
         self.comp_time.operators["diff"] = \
             lambda a, b: np.abs(a - b)
@@ -73,6 +309,24 @@ class TestSingleDomainComparator(unittest.TestCase):
         transformed = self.comp_freq.transform(a, b, c)
         self.assertTrue(np.allclose(transformed[0], np.fft.fft(a)))
 
+    def test_slice_domain_shifts(self):
+        a, b = np.arange(10), np.arange(12)
+        for domain in [slice(0, None), slice(2, 8), slice(1, 9, 3),
+                       slice(None, None, -1), [1, 5, 7]]:
+            self.comp_time.domain = lambda size: domain
+            for shift in [0, 3, -4, 11]:
+                sliced = self.comp_time.slice_domain(a, b, shifts=[0, shift])
+                expected = np.roll(b, shift)[:10][domain]
+                self.assertTrue(np.array_equal(sliced[1], expected))
+        # sliced arrays are views unless the domain wraps around
+        self.comp_time.domain = [5, 10]
+        sliced = self.comp_time.slice_domain(a, b, shifts=[0, 3])
+        self.assertTrue(np.shares_memory(sliced[1], b))
+        self.comp_time.domain = [0, 5]
+        sliced = self.comp_time.slice_domain(a, b, shifts=[0, 3])
+        self.assertFalse(np.shares_memory(sliced[1], b))
+        self.assertTrue(sliced[1].shape == (5, ))
+
     def test_call(self):
         comp_time, comp_freq = self.comp_time, \
             self.comp_freq
@@ -116,6 +370,10 @@ class TestTimeDomainComparator(unittest.TestCase):
     def setUp(self):
         self.comp = TimeDomainComparator()
 
+    def test_stream(self):
+        with self.assertRaises(RuntimeError):
+            self.comp.stream(iter([np.arange(4)]))
+
     def test_get_time_delay(self):
         # x = np.linspace(0, 2*pi, 100)
         offset_expected = 2
@@ -124,12 +382,73 @@ class TestTimeDomainComparator(unittest.TestCase):
         offset = self.comp.get_time_delay(a, b)
         self.assertTrue(offset == offset_expected)
 
+    def test_get_time_delay_max_lag(self):
+        offset_expected = 2
+        x = np.arange(0, 100)
+        a, b = np.sin(x), np.sin(x + offset_expected)
+        comp = TimeDomainComparator(max_lag=4, method="direct")
+        self.assertTrue(comp.get_time_delay(a, b) == offset_expected)
+
+    def test_transform(self):
+        x = np.arange(0, 200)
+        a = np.sin(0.3*x) * np.exp(-((x - 100)/30)**2)
+        b = np.roll(a, -7)
+        self.comp.domain = [20, 180]
+        transformed = self.comp.transform(a, b)
+        expected = [arr[20:180] for arr in self.comp.align(a, b)]
+        self.assertTrue(all([np.array_equal(t, e)
+                             for t, e in zip(transformed, expected)]))
+        self.assertTrue(np.shares_memory(transformed[1], b))
+
 
 class TestFrequencyDomainComparator(unittest.TestCase):
 
     def test_init(self):
         FrequencyDomainComparator()
 
+    def test_transform(self):
+        arrays = [np.random.rand(100) for i in range(3)]
+        for backend in ["scipy", "numpy"]:
+            comp = FrequencyDomainComparator(
+                fft_size=50, backend=backend, workers=2)
+            transformed = comp.transform(*arrays)
+            self.assertTrue(transformed.shape == (3, 50))
+            self.assertTrue(np.allclose(
+                transformed[1], np.fft.fft(arrays[1][:50])))
+            comp.real = True
+            transformed = comp.transform(*arrays)
+            self.assertTrue(transformed.shape == (3, 26))
+            self.assertTrue(np.allclose(
+                transformed[1], np.fft.rfft(arrays[1][:50])))
+
+        comp = FrequencyDomainComparator(
+            fft_size=97, fast_len=True, real=True)
+        transformed = comp.transform(*arrays)
+        self.assertTrue(transformed.shape[1] ==
+                        comp.backend.next_fast_len(97)//2 + 1)
+
+    def test_transform_real(self):
+        real = [np.random.rand(100) for i in range(2)]
+        cplx = [a + 1j*np.random.rand(100) for a in real]
+        comp = FrequencyDomainComparator(fft_size=50, real=None)
+        self.assertTrue(comp.transform(*cplx).shape == (2, 50))
+        self.assertTrue(comp.transform(*real).shape == (2, 26))
+        comp.real = False
+        self.assertTrue(np.allclose(
+            comp.transform(*real)[0], np.fft.fft(real[0][:50])))
+        comp.real = True
+        with self.assertRaises(RuntimeError):
+            comp.transform(*cplx)
+
+    def test_call(self):
+        comp = FrequencyDomainComparator(fft_size=64, real=True)
+        comp.operators["diff"] = Operator(lambda a, b: a - b, broadcast=True)
+        comp.products["mean"] = np.mean
+        a, b = [np.random.rand(100) for i in range(2)]
+        res_op, res_prod = comp(a, b)
+        self.assertTrue(np.allclose(
+            res_op["diff"][0][1], np.fft.rfft(a[:64]) - np.fft.rfft(b[:64])))
+
 
 if __name__ == "__main__":
     unittest.main()
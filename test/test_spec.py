@@ -0,0 +1,121 @@
+import copy
+import json
+import pickle
+import unittest
+import functools
+
+import numpy as np
+
+from comparator import (
+    SingleDomainComparator,
+    FrequencyDomainComparator,
+    TimeFreqDomainComparator,
+    Operator,
+    Product,
+    reducers
+)
+from comparator.single_domain import Domain
+from comparator.spec import (
+    from_spec,
+    register,
+    functions,
+    encode_callable,
+    decode_callable
+)
+
+
+def xcorr(a, b):
+    return a * np.conj(b)
+
+
+class TestSpec(unittest.TestCase):
+
+    def setUp(self):
+        self.comp = TimeFreqDomainComparator(align_freq=True)
+        self.comp.operators["diff"] = Operator(
+            np.subtract, symmetry="antisymmetric")
+        self.comp.operators["xcorr"] = xcorr
+        self.comp.products["mean"] = np.mean
+        self.comp.products["var"] = reducers.Var(ddof=1)
+        self.comp.products["mean_batched"] = Product(
+            functools.partial(np.mean, axis=-1), broadcast=True)
+        self.comp.domain = [0.1, 0.9]
+        self.comp.time.max_lag = 10
+        self.arrays = [np.random.rand(100) for i in range(3)]
+
+    def check(self, comp):
+        self.assertTrue(isinstance(comp, TimeFreqDomainComparator))
+        self.assertTrue(comp.time.max_lag == 10)
+        self.assertTrue(comp.domain == self.comp.domain)
+        expected = self.comp(*self.arrays)
+        ret = comp(*self.arrays)
+        for (_, res_prod), (_, expected_prod) in zip(ret, expected):
+            for name in ["diff", "xcorr"]:
+                for prod in ["mean", "var", "mean_batched"]:
+                    self.assertTrue(np.allclose(
+                        res_prod[name][prod], expected_prod[name][prod]))
+
+    def test_pickle(self):
+        self.check(pickle.loads(pickle.dumps(self.comp)))
+
+    def test_json(self):
+        spec = json.loads(json.dumps(self.comp.to_spec()))
+        self.assertTrue(spec["operators"]["diff"]["operator"] == "subtract")
+        self.assertTrue(spec["domains"]["time"]["params"]["max_lag"] == 10)
+        self.check(from_spec(spec))
+
+    def test_single_domain(self):
+        comp = SingleDomainComparator(
+            "freq", forward_transform=np.fft.fft,
+            inverse_transform=np.fft.ifft)
+        comp.domain = slice(0, 50)
+        comp = pickle.loads(pickle.dumps(comp))
+        self.assertTrue(comp.domain(100) == slice(0, 50))
+        a = np.random.rand(100)
+        self.assertTrue(np.allclose(comp.transform(a)[0], np.fft.fft(a[:50])))
+
+        comp = pickle.loads(pickle.dumps(FrequencyDomainComparator(
+            fft_size=64, backend="numpy", real=True)))
+        self.assertTrue(comp.backend.name == "numpy")
+        self.assertTrue(comp.real)
+        self.assertTrue(comp.domain(100) == slice(0, 64))
+
+    def test_lambda(self):
+        self.comp.operators["this"] = lambda a: a
+        with self.assertRaises(RuntimeError):
+            self.comp.to_spec()
+        with self.assertRaises(RuntimeError):
+            decode_callable("not_a_module:func")
+
+    def test_copy(self):
+        self.comp.operators["this"] = lambda a: a
+        self.comp.products["max"] = lambda a: np.amax(np.abs(a))
+        for func in [copy.copy, copy.deepcopy]:
+            comp = func(self.comp)
+            self.check(comp)
+            res_op, res_prod = comp(*self.arrays)[0]
+            self.assertTrue(np.allclose(
+                res_op["this"][0], self.comp(*self.arrays)[0][0]["this"][0]))
+        comp.operators["double"] = lambda a: 2*a
+        self.assertTrue("double" in comp.freq.operators)
+        self.assertTrue("double" not in self.comp.operators)
+
+    def test_register(self):
+        def double(a):
+            return 2*a
+        register("double", double)
+        try:
+            self.assertTrue(encode_callable(double) == "double")
+            self.assertTrue(decode_callable("double") is double)
+        finally:
+            del functions["double"]
+
+    def test_domain(self):
+        self.assertTrue(Domain(10, 20)(100) == slice(10, 20))
+        self.assertTrue(Domain(0.1, 0.5)(100) == slice(10, 50))
+        self.assertTrue(pickle.loads(pickle.dumps(Domain(1, 2))) ==
+                        Domain(1, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from comparator.store import SpillStore
+
+
+class TestSpillStore(unittest.TestCase):
+
+    def test_add(self):
+        store = SpillStore(16)
+        a, b = np.arange(2, dtype=np.float64), np.arange(4, dtype=np.float64)
+        self.assertTrue(store.add(a) is a)
+        self.assertTrue(store.add(1.0) == 1.0)
+        spilled = store.add(b)
+        self.assertTrue(isinstance(spilled, np.memmap))
+        self.assertTrue(np.array_equal(spilled, b))
+        self.assertTrue(store.add(spilled) is spilled)
+        self.assertTrue(store.in_memory == a.nbytes)
+        self.assertTrue(store.spilled == b.nbytes)
+        with self.assertRaises(ValueError):
+            spilled[0] = 1.0
+
+    def test_directory(self):
+        with tempfile.TemporaryDirectory() as dir_path:
+            store = SpillStore(0, os.path.join(dir_path, "spill"))
+            spilled = store.add(np.arange(4))
+            store.close()
+            self.assertTrue(os.path.dirname(store.directory) ==
+                            os.path.join(dir_path, "spill"))
+            self.assertTrue(len(os.listdir(store.directory)) == 1)
+            # another store in the same directory doesn't overwrite results
+            other = SpillStore(0, os.path.join(dir_path, "spill"))
+            other.add(np.arange(4) + 10)
+            self.assertTrue(other.directory != store.directory)
+            self.assertTrue(np.array_equal(spilled, np.arange(4)))
+
+    def test_close(self):
+        store = SpillStore(0)
+        spilled = store.add(np.arange(4))
+        self.assertTrue(os.path.isdir(store.directory))
+        store.close()
+        self.assertFalse(os.path.isdir(store.directory))
+        self.assertTrue(np.array_equal(spilled, np.arange(4)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,10 @@
+import pickle
 import unittest
 
 from comparator.trackable import (
     TrackableDict,
-    TrackableList
+    TrackableList,
+    deleted
 )
 
 
@@ -35,6 +37,55 @@ class TestTrackableDict(unittest.TestCase):
         self.assertTrue(callback.args[0] == ("person", 25))
         self.assertTrue(callback.args[1] == ("person", ))
 
+    def test_on_delete(self):
+        callback = Callback()
+        d = TrackableDict({"person": 23})
+        d.on(callback)
+        del d["person"]
+        self.assertTrue("person" not in d)
+        self.assertTrue(callback.args[0] == ("person", deleted))
+
+    def test_mutators(self):
+        callback = Callback()
+        d = TrackableDict({"a": 1})
+        d.on(callback)
+        d.update({"b": 2}, c=3)
+        d.setdefault("d", 4)
+        d.setdefault("a", 5)
+        self.assertTrue(d.pop("b") == 2)
+        self.assertTrue(d.pop("b", None) is None)
+        self.assertTrue(d.popitem() == ("d", 4))
+        d |= {"e": 5}
+        d.clear()
+        self.assertTrue(d == {})
+        self.assertTrue(callback.args == [
+            ("b", 2), ("c", 3), ("d", 4), ("b", deleted), ("d", deleted),
+            ("e", 5), ("a", deleted), ("c", deleted), ("e", deleted)
+        ])
+        with self.assertRaises(KeyError):
+            d.pop("a")
+        with self.assertRaises(KeyError):
+            d.popitem()
+
+    def test_callback_error(self):
+        d = TrackableDict()
+
+        def callback(item, val):
+            raise TypeError("bad value")
+
+        d.on(callback)
+        with self.assertRaises(TypeError):
+            d["a"] = 1
+        self.assertTrue("a" not in d)
+
+    def test_pickle(self):
+        d = TrackableDict({"person": 23})
+        d.on(lambda *args: None)
+        d = pickle.loads(pickle.dumps(d))
+        self.assertTrue(isinstance(d, TrackableDict))
+        self.assertTrue(d == {"person": 23})
+        d["person"] = 24
+
 
 class TestTrackableList(unittest.TestCase):
 
@@ -1,6 +1,7 @@
 import unittest
 import logging
 import json
+import io
 import os
 
 import numpy as np
@@ -8,6 +9,7 @@ import matplotlib.pyplot as plt
 
 from comparator import util
 from comparator.single_domain import SingleDomainComparator
+from comparator.operators import Operator
 
 test_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -62,6 +64,23 @@ class TestPlotOperatorResult(unittest.TestCase):
         if os.environ.get("COMPARATOR_TEST_PLOT", None):
             plt.show()
 
+    def test_plot_operator_result_no_diagonal(self):
+
+        self.comp.operators["diff"] = Operator(
+            lambda a, b: a - b, symmetry="antisymmetric", diagonal=False)
+
+        res_op, res_prod = self.comp(*self.dat_real, labels=self.labels)
+        figs, axes = util.plot_operator_result(res_op)
+
+    def test_plot_operator_result_contiguous(self):
+
+        self.comp.operators["diff"] = lambda a, b: a - b
+
+        res_op, res_prod = self.comp(
+            *self.dat_complex, labels=self.labels, contiguous=True)
+        figs, axes = util.plot_operator_result(res_op)
+        self.assertTrue(axes["diff"].shape == (2*self.n_plots, self.n_plots))
+
     def test_plot_operator_result_three_argument_operator(self):
 
         self.comp.operators["three_arg"] = lambda a, b, c: a + b + c
@@ -99,6 +118,78 @@ class TestNumpyEncoder(unittest.TestCase):
         test_dumps = json.dumps(test, cls=util.NumpyEncoder)
         self.assertTrue(test_dumps == expected_dumps)
 
+    def test_default_complex(self):
+
+        test = {"obj": [np.complex64(1 + 2j), np.array([1j, 2])]}
+        expected_dumps = "{\"obj\": [[1.0, 2.0], [[0.0, 1.0], [2.0, 0.0]]]}"
+        test_dumps = json.dumps(test, cls=util.NumpyEncoder)
+        self.assertTrue(test_dumps == expected_dumps)
+
+
+class TestStreamingEncoder(unittest.TestCase):
+
+    def setUp(self):
+        self.comp = SingleDomainComparator("json")
+        self.comp.operators["diff"] = Operator(
+            lambda a, b: a - b, symmetry="antisymmetric", diagonal=False)
+        self.comp.operators["this"] = lambda a: a
+        self.comp.products["mean"] = np.mean
+        self.comp.products["argmax"] = np.argmax
+        self.labels = ["a", "b", "c"]
+        self.arrays = [np.random.rand(100) for i in range(3)]
+
+    def test_dump(self):
+        test = {
+            "ints": np.arange(10),
+            "floats": np.random.rand(3, 5).astype(np.float32),
+            "scalars": [np.int8(1), np.float16(0.5), np.bool_(True), None],
+            "str": "foo"
+        }
+        f = io.StringIO()
+        util.StreamingEncoder(chunk_size=16, block_size=4).dump(test, f)
+        self.assertTrue(
+            f.getvalue() == json.dumps(test, cls=util.NumpyEncoder))
+
+    def test_dump_complex(self):
+        test = {"obj": [np.complex64(1 + 2j), np.array([1j, np.nan])]}
+        f = io.StringIO()
+        util.StreamingEncoder().dump(test, f)
+        self.assertTrue(f.getvalue() ==
+                        '{"obj": [[1.0, 2.0], [[0.0, 1.0], [NaN, 0.0]]]}')
+
+    def test_dump_base64(self):
+        arr = np.random.rand(7, 11) + 1j*np.random.rand(7, 11)
+        for test in [arr, arr[:, ::2]]:
+            f = io.StringIO()
+            util.StreamingEncoder(base64_arrays=True, block_size=5).dump(
+                {"obj": test}, f)
+            decoded = util.decode_array(json.loads(f.getvalue())["obj"])
+            self.assertTrue(np.array_equal(decoded, test))
+
+    def test_dump_results(self):
+        res_op, res_prod = self.comp(*self.arrays, labels=self.labels)
+        f = io.StringIO()
+        util.dump_results(f, res_op, res_prod)
+        res = json.loads(f.getvalue())
+        self.assertTrue(res["operators"]["diff"]["labels"] == self.labels)
+        self.assertTrue(res["operators"]["diff"]["result"][0][0] is None)
+        self.assertTrue(np.allclose(res["operators"]["this"]["result"],
+                                    self.arrays))
+        self.assertTrue(np.allclose(
+            np.array(res["products"]["diff"]["products"]["mean"],
+                     dtype=float),
+            res_prod["diff"]["mean"], equal_nan=True))
+        self.assertTrue(res["products"]["this"]["products"]["argmax"] ==
+                        res_prod["this"]["argmax"].tolist())
+
+        f = io.StringIO()
+        util.dump_results(f, res_op, res_prod, products_only=True)
+        self.assertTrue(list(json.loads(f.getvalue())) == ["products"])
+
+    def test_unknown_type(self):
+        with self.assertRaises(RuntimeError):
+            util.StreamingEncoder().dump({"obj": object()}, io.StringIO())
+
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.DEBUG)